@@ -0,0 +1,124 @@
+"""Alertas por calor a partir de la lectura del clima.
+
+Las reglas combinan umbrales de temperatura, sensación térmica, humedad y
+cielo. La alerta (nivel más alto de las reglas que se cumplen, motivos y
+etiquetas de consejos) se evalúa una sola vez cuando llega una lectura
+nueva del API y se guarda con ella en la caché del clima.
+
+Los consejos activos que corresponden a esas etiquetas también se eligen
+al publicar la lectura y se guardan en la alerta con la versión del
+catálogo de la que salieron; una petición solo sirve ese dict. Si después
+cambian los consejos, la alerta se rehace una vez por versión.
+"""
+import threading
+
+NIVELES = ['normal', 'precaucion', 'alerta', 'peligro']
+
+
+class Regla:
+    """Nivel, motivo y etiquetas de consejos que aplican si se cumplen todos los rangos.
+
+    Cada condición es campo=(mínimo, máximo) con extremos incluidos
+    (None = sin límite); `iconos` limita el estado del cielo.
+    """
+
+    def __init__(self, nivel, motivo, etiquetas, iconos=None, **rangos):
+        self.nivel = nivel
+        self.rango = NIVELES.index(nivel)
+        self.motivo = motivo
+        self.etiquetas = etiquetas
+        self.iconos = iconos
+        self.rangos = rangos
+
+    def aplica(self, clima):
+        if self.iconos is not None and clima.get('icon') not in self.iconos:
+            return False
+        for campo, (minimo, maximo) in self.rangos.items():
+            valor = clima.get(campo)
+            if valor is None:
+                return False
+            if minimo is not None and valor < minimo:
+                return False
+            if maximo is not None and valor > maximo:
+                return False
+        return True
+
+
+# De mayor a menor nivel; umbrales de sensación térmica de la escala del índice de calor
+REGLAS = [
+    Regla('peligro', 'Sensación térmica de {feels_like} °C', ['Calor', 'Horario', 'Precaución', 'Ejercicio'],
+          feels_like=(41, None)),
+    Regla('peligro', 'Temperatura de {temperature} °C', ['Calor', 'Horario', 'Precaución', 'Ejercicio'],
+          temperature=(40, None)),
+    Regla('alerta', 'Sensación térmica de {feels_like} °C', ['Calor', 'Horario', 'Precaución'],
+          feels_like=(32, None)),
+    # Clima semiárido: con el aire seco la sensación térmica subestima la deshidratación
+    Regla('alerta', 'Calor seco: {temperature} °C con {humidity}% de humedad', ['Calor', 'Verano', 'Confort'],
+          temperature=(33, None), humidity=(None, 20)),
+    Regla('alerta', 'Calor húmedo: {temperature} °C con {humidity}% de humedad', ['Calor', 'Confort', 'Temperatura'],
+          temperature=(30, None), humidity=(60, None)),
+    Regla('precaucion', 'Sensación térmica de {feels_like} °C', ['Calor', 'Confort', 'Temperatura'],
+          feels_like=(27, None)),
+    Regla('precaucion', 'Sol directo con {temperature} °C', ['Radiación', 'Exterior', 'Protección', 'Visual'],
+          iconos=('01d', '02d'), temperature=(25, None)),
+]
+
+
+class MotorAlertas:
+    """Evalúa las reglas sobre una lectura y elige los consejos que le corresponden"""
+
+    def __init__(self, reglas=REGLAS):
+        self.reglas = reglas
+        self._lock = threading.Lock()
+        # etiquetas -> (lista de consejos de la que se calculó, consejos elegidos)
+        self._consejos = {}
+        self.contadores = {'evaluaciones': 0, 'consejos_calculados': 0, 'consejos_reutilizados': 0}
+
+    def _contar(self, contador):
+        with self._lock:
+            self.contadores[contador] += 1
+
+    def evaluar(self, clima):
+        """{'level', 'rank', 'reasons', 'tags'} de la lectura"""
+        self._contar('evaluaciones')
+        rango = 0
+        motivos = []
+        etiquetas = []
+        for regla in self.reglas:
+            if not regla.aplica(clima):
+                continue
+            rango = max(rango, regla.rango)
+            motivo = regla.motivo.format(**clima)
+            if motivo not in motivos:
+                motivos.append(motivo)
+            etiquetas.extend(etiqueta for etiqueta in regla.etiquetas if etiqueta not in etiquetas)
+        return {'level': NIVELES[rango], 'rank': rango, 'reasons': motivos, 'tags': etiquetas}
+
+    def consejos(self, etiquetas, consejos_activos):
+        """Consejos activos con alguna de las etiquetas, calculados una vez por lista de consejos"""
+        clave = tuple(etiquetas)
+        with self._lock:
+            guardado = self._consejos.get(clave)
+        # La lista del caché del catálogo se reemplaza (no se modifica) cuando cambia la tabla
+        if guardado is not None and guardado[0] is consejos_activos:
+            self._contar('consejos_reutilizados')
+            return guardado[1]
+
+        buscadas = set(etiquetas)
+        elegidos = [
+            {'id': consejo['id'], 'titulo': consejo['titulo'], 'descripcion': consejo['descripcion'],
+             'icono': consejo['icono']}
+            for consejo in consejos_activos
+            if buscadas.intersection(etiqueta.strip() for etiqueta in (consejo.get('etiquetas') or '').split(','))
+        ]
+        with self._lock:
+            self._consejos[clave] = (consejos_activos, elegidos)
+        self._contar('consejos_calculados')
+        return elegidos
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self.contadores)
+            datos['combinaciones_en_memoria'] = len(self._consejos)
+        datos['reglas'] = len(self.reglas)
+        return datos
@@ -1,14 +1,28 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, has_request_context
 import mysql.connector
-from werkzeug.security import generate_password_hash, check_password_hash
-import requests
 import os
-import schedule
 import time
-from threading import Thread
+import itertools
+import queue
+from datetime import datetime, timezone
+from threading import Lock, Thread
+from contextlib import contextmanager
 import psycopg2
 from urllib.parse import urlparse
 from dotenv import load_dotenv
+from pool_conexiones import PoolConexiones, PoolAgotado, reiniciar_pools
+from salud_backends import SaludBackend
+from cache_compartido import CacheArchivo
+from planificador import Planificador
+from difusor import Difusor
+from cache_catalogo import CacheCatalogo, EscuchaNotificaciones
+from ciudades import CIUDADES, CIUDAD_PREDETERMINADA, IndiceCiudades
+from alertas_calor import MotorAlertas
+import servicio_clima
+from servicio_hash import ServicioHash, ServicioSaturado
+from migrador import Migrador
+import repositorio
+from repositorio import Datos, es_postgresql
 
 # Cargar variables de entorno
 load_dotenv()
@@ -18,200 +32,454 @@ app.secret_key = os.environ.get('SECRET_KEY', 'clave-temporal-desarrollo')
 
 GLOBAL_API_KEY = os.environ.get('API_KEY', '3088449fddf506256fc39e7e40d88ec4')
 
+# Caché del clima compartida por todos los workers (clave = ubicación)
+CLAVE_CLIMA = 'aguascalientes,mx'
+cache_clima = CacheArchivo(
+    'clima',
+    ttl=int(os.environ.get('WEATHER_CACHE_TTL', 300)),
+    ttl_obsoleto=int(os.environ.get('WEATHER_CACHE_STALE', 1800))
+)
+
+# Última lectura válida en disco: la leen los workers al arrancar
+snapshot_clima = servicio_clima.SnapshotClima(
+    os.environ.get('WEATHER_SNAPSHOT', os.path.join(app.instance_path, 'clima_snapshot.json'))
+)
+_ultima_lectura = snapshot_clima.leer()
+if _ultima_lectura:
+    cache_clima.sembrar(CLAVE_CLIMA, *_ultima_lectura)
+
+# Segundos máximos para abrir una conexión (un backend caído no bloquea la petición)
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 3))
+
 # Configuración para desarrollo local (MySQL)
 DB_CONFIG = {
     'host': os.environ.get('DB_HOST', 'localhost'),
     'user': os.environ.get('DB_USER', 'root'),
     'password': os.environ.get('DB_PASSWORD', ''),
-    'database': os.environ.get('DB_NAME', 'formulario_bd')
+    'database': os.environ.get('DB_NAME', 'formulario_bd'),
+    'connection_timeout': DB_CONNECT_TIMEOUT
 }
 
-def obtener_conexion():
-    # Si estamos en producción (Render con PostgreSQL)
-    database_url = os.environ.get('DATABASE_URL')
-    
-    if database_url:
+def config_postgresql(url):
+    url = urlparse(url)
+    return {
+        'database': url.path[1:],  # Elimina el / inicial
+        'user': url.username,
+        'password': url.password,
+        'host': url.hostname,
+        'port': url.port,
+        'connect_timeout': DB_CONNECT_TIMEOUT
+    }
+
+# Configuración para producción (PostgreSQL en Render): se lee DATABASE_URL una sola vez
+POSTGRES_CONFIG = config_postgresql(os.environ['DATABASE_URL']) if os.environ.get('DATABASE_URL') else None
+
+# Réplicas de solo lectura de la primaria PostgreSQL (opcional, separadas por comas)
+REPLICAS_CONFIG = [
+    config_postgresql(url.strip())
+    for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+    if url.strip()
+] if POSTGRES_CONFIG else []
+REPLICAS = [f'replica{numero}' for numero in range(1, len(REPLICAS_CONFIG) + 1)]
+
+# Segundos que una sesión que acaba de escribir sigue leyendo de la primaria
+REPLICA_STICKY_SEGUNDOS = int(os.environ.get('REPLICA_STICKY_SEGUNDOS', 15))
+
+# Orden de preferencia: PostgreSQL (si está configurado) y MySQL local como respaldo
+BACKENDS = (['postgresql'] if POSTGRES_CONFIG else []) + ['mysql']
+
+# Tamaño y reciclaje del pool de conexiones (por backend y por proceso)
+POOL_CONFIG = {
+    'tamano_maximo': int(os.environ.get('DB_POOL_MAX', 5)),
+    'espera_maxima': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+    'max_usos': int(os.environ.get('DB_POOL_MAX_USOS', 1000)),
+    'max_edad': int(os.environ.get('DB_POOL_MAX_EDAD', 1800)),
+    'ping_inactividad': int(os.environ.get('DB_POOL_PING', 30))
+}
+
+# Hash de contraseñas en un pool de procesos acotado (uno por worker)
+hash_contrasenas = ServicioHash(
+    metodo=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+    procesos=int(os.environ.get('PASSWORD_HASH_PROCESOS', 2)),
+    max_pendientes=int(os.environ.get('PASSWORD_HASH_COLA', 8)),
+    espera_maxima=float(os.environ.get('PASSWORD_HASH_ESPERA', 1))
+)
+
+def conectar_postgresql():
+    # Para PostgreSQL en producción
+    return psycopg2.connect(**POSTGRES_CONFIG)
+
+def conectar_mysql():
+    # Para MySQL local en desarrollo
+    return mysql.connector.connect(**DB_CONFIG)
+
+def conectar_replica(backend):
+    # Réplica de lectura ('replica1', 'replica2'...)
+    return psycopg2.connect(**REPLICAS_CONFIG[REPLICAS.index(backend)])
+
+_pools = {}
+_pools_lock = Lock()
+
+def obtener_pool(backend):
+    """Devuelve (creándolo la primera vez) el pool del backend indicado"""
+    with _pools_lock:
+        if backend not in _pools:
+            if backend in REPLICAS:
+                crear = lambda: conectar_replica(backend)
+            else:
+                crear = conectar_postgresql if backend == 'postgresql' else conectar_mysql
+            _pools[backend] = PoolConexiones(backend, crear, **POOL_CONFIG)
+        return _pools[backend]
+
+# Un backend que no conecta se salta hasta que vence su backoff
+salud_backends = {
+    backend: SaludBackend(
+        backend,
+        backoff_inicial=float(os.environ.get('DB_BACKOFF_INICIAL', 1)),
+        backoff_max=float(os.environ.get('DB_BACKOFF_MAX', 60))
+    )
+    for backend in BACKENDS + REPLICAS
+}
+
+# Reparto de lecturas: cuántas fueron a réplicas y por qué otras fueron a la primaria
+_turno_replicas = itertools.count()
+lecturas = {'replica': 0, 'primaria_sesion': 0, 'primaria_sin_replica': 0, 'replica_atrasada': 0}
+
+def marcar_escritura():
+    """La sesión que acaba de escribir lee de la primaria un rato (ve sus propios cambios)"""
+    if REPLICAS and has_request_context():
+        session['primaria_hasta'] = time.time() + REPLICA_STICKY_SEGUNDOS
+
+def _leer_de_primaria():
+    return has_request_context() and session.get('primaria_hasta', 0) > time.time()
+
+def _conectar_a(backend):
+    """(pool, conexion) del backend; (pool, None) si no está disponible"""
+    salud = salud_backends[backend]
+    if not salud.permitir():
+        return None, None
+    pool = obtener_pool(backend)
+    try:
+        conexion = pool.obtener()
+    except PoolAgotado:
+        # No dice nada de la salud del backend, pero la prueba debe quedar libre
+        salud.cancelar_prueba()
+        raise
+    except Exception as e:
+        salud.registrar_fallo(e)
+        return None, None
+    salud.registrar_exito()
+    return pool, conexion
+
+def _tomar_replica():
+    """Siguiente réplica disponible por turnos; (None, None) si ninguna responde"""
+    inicio = next(_turno_replicas)
+    for paso in range(len(REPLICAS)):
+        backend = REPLICAS[(inicio + paso) % len(REPLICAS)]
         try:
-            # Para PostgreSQL en producción
-            url = urlparse(database_url)
-            conn = psycopg2.connect(
-                database=url.path[1:],  # Elimina el / inicial
-                user=url.username,
-                password=url.password,
-                host=url.hostname,
-                port=url.port
-            )
-            return conn
-        except Exception as e:
-            print(f"Error conectando a PostgreSQL: {e}")
-            # Fallback a MySQL local
-            try:
-                return mysql.connector.connect(**DB_CONFIG)
-            except Exception as e2:
-                print(f"Error también con MySQL: {e2}")
-                return None
-    else:
-        # Para MySQL local en desarrollo
+            pool, conexion = _conectar_a(backend)
+        except PoolAgotado as e:
+            # Réplica saturada: se prueba la siguiente
+            print(f"⚠ {e}")
+            continue
+        if conexion is not None:
+            return pool, conexion
+    return None, None
+
+def _tomar_conexion(lectura=False):
+    if lectura and REPLICAS:
+        if _leer_de_primaria():
+            lecturas['primaria_sesion'] += 1
+        else:
+            pool, conexion = _tomar_replica()
+            if conexion is not None:
+                lecturas['replica'] += 1
+                return pool, conexion
+            lecturas['primaria_sin_replica'] += 1
+    for backend in BACKENDS:
         try:
-            return mysql.connector.connect(**DB_CONFIG)
-        except Exception as e:
-            print(f"Error conectando a MySQL local: {e}")
-            return None
+            pool, conexion = _conectar_a(backend)
+        except PoolAgotado as e:
+            # El backend responde pero está saturado: no se cambia de base de datos
+            print(f"⚠ {e}")
+            return None, None
+        if conexion is not None:
+            return pool, conexion
+    return None, None
 
-# ----------------------------------------------------
-# FUNCIONES DE INICIALIZACIÓN DE USUARIOS
-# ----------------------------------------------------
-def actualizar_contraseñas():
-    """Actualiza contraseñas de usuarios existentes"""
-    print("🔧 Actualizando contraseñas de usuarios...")
-    
-    conexion = obtener_conexion()
+@contextmanager
+def obtener_conexion(lectura=False):
+    """Toma una conexión del pool y la devuelve al salir del bloque.
+
+    Con lectura=True puede entregar una réplica (si hay configuradas);
+    solo para consultas que no escriben. Entrega None si no hay ninguna
+    base de datos disponible.
+    """
+    pool, conexion = _tomar_conexion(lectura)
     if conexion is None:
-        print("❌ Error: No se pudo conectar a la base de datos")
+        yield None
         return
-        
-    cursor = conexion.cursor(dictionary=True)
-    
-    # Lista de usuarios a actualizar
-    usuarios = [
-        {'username': 'admin', 'password': '123456'},
-        {'username': 'superadmin', 'password': '123456'},
-        {'username': 'demo', 'password': '123456'},
-        {'username': 'usuario1', 'password': '123456'}
-    ]
-    
-    usuarios_actualizados = 0
+    try:
+        yield conexion
+    except Exception:
+        pool.devolver(conexion, descartar=True)
+        raise
+    else:
+        pool.devolver(conexion)
+
+# ----------------------------------------------------
+# CONSULTAS DEL CONTENIDO PÚBLICO
+# ----------------------------------------------------
+def consultar_emergencias(datos):
+    return datos.emergencias.activas()
+
+def consultar_consejos(datos):
+    return datos.consejos.activos()
+
+def consultar_frase_dia(datos):
+    ahora = int(time.time())
+    return armar_frase_dia(datos.frases.publicada(ahora), datos.frases.siguiente(ahora), ahora)
+
+def armar_frase_dia(frase, siguiente, ahora):
+    # La frase del día es la publicada más recientemente mientras no venza;
+    # una frase nueva reemplaza a la anterior sin modificarla
+    if frase and frase['expira'] is not None and frase['expira'] <= ahora:
+        frase = None
     
-    for usuario in usuarios:
+    # La siguiente frase programada (`siguiente`) la reemplaza al llegar su hora
+    limites = [frase['expira'] if frase else None, siguiente]
+    limites = [limite for limite in limites if limite is not None]
+    if not limites:
+        return frase
+    # Hasta cuándo es válida esta respuesta (caché y Cache-Control)
+    frase = dict(frase) if frase else {}
+    frase['vigente_hasta'] = min(limites)
+    return frase
+
+CONSULTAS_CATALOGO = {
+    'numeros_emergencia': consultar_emergencias,
+    'consejos_clima': consultar_consejos,
+    'frases_dia': consultar_frase_dia
+}
+
+# Tablas cuyo contenido también cambia con la hora (vence sin que nadie escriba)
+CATALOGO_CON_VIGENCIA = {'frases_dia'}
+
+# Horas que se muestra una frase nueva si no se indica otra vigencia
+FRASE_VIGENCIA_HORAS = float(os.environ.get('FRASE_VIGENCIA_HORAS', 12))
+
+# ----------------------------------------------------
+# MIGRACIONES DEL ESQUEMA
+# ----------------------------------------------------
+migrador = Migrador(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migraciones'))
+_esquema_listo = False
+
+def migrar_base_de_datos():
+    """Aplica las migraciones pendientes (una vez por proceso).
+
+    Si el esquema ya está al día solo cuesta una consulta.
+    """
+    global _esquema_listo
+    if _esquema_listo:
+        return True
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            return False
+        dialecto = 'postgresql' if es_postgresql(conexion) else 'mysql'
         try:
-            # Generar hash correcto de la contraseña
-            password_hash = generate_password_hash(usuario['password'])
-            
-            # Verificar si el usuario existe
-            cursor.execute('SELECT id FROM usuarios WHERE username = %s', (usuario['username'],))
-            usuario_existente = cursor.fetchone()
-            
-            if usuario_existente:
-                # Actualizar en la base de datos
-                cursor.execute('UPDATE usuarios SET password = %s WHERE username = %s', 
-                              (password_hash, usuario['username']))
-                usuarios_actualizados += 1
-                print(f"✓ Contraseña actualizada para: {usuario['username']} -> {usuario['password']}")
-            else:
-                print(f"⚠ Usuario no encontrado: {usuario['username']}")
-                
+            migrador.migrar(conexion, dialecto)
         except Exception as e:
-            print(f"❌ Error actualizando usuario {usuario['username']}: {e}")
-    
+            print(f"❌ Error migrando la base de datos: {e}")
+            return False
+    _esquema_listo = True
+    return True
+
+# ----------------------------------------------------
+# CACHÉ DEL CONTENIDO PÚBLICO
+# ----------------------------------------------------
+def leer_versiones_catalogo():
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            return None
+        cursor = conexion.cursor()
+        cursor.execute('SELECT tabla, version, actualizado FROM versiones_catalogo')
+        versiones = {tabla: (version, actualizado) for tabla, version, actualizado in cursor.fetchall()}
+        cursor.close()
+    return versiones
+
+cache_catalogo = CacheCatalogo(
+    leer_versiones_catalogo,
+    intervalo_revision=int(os.environ.get('CATALOG_VERSION_CHECK', 5)),
+    ttl=int(os.environ.get('CATALOG_CACHE_TTL', 300))
+)
+if POSTGRES_CONFIG:
+    cache_catalogo.escucha = EscuchaNotificaciones(cache_catalogo, conectar_postgresql)
+
+def confirmar_cambio(conexion, tabla):
+    """Hace commit de un cambio en el catálogo subiendo la versión de la tabla.
+
+    La versión se incrementa en la misma transacción; en PostgreSQL además
+    se avisa a los demás workers con NOTIFY (se entrega al hacer commit).
+    """
+    actualizado = int(time.time())
+    cursor = conexion.cursor()
+    cursor.execute('UPDATE versiones_catalogo SET version = version + 1, actualizado = %s WHERE tabla = %s',
+                   (actualizado, tabla))
+    cursor.execute('SELECT version FROM versiones_catalogo WHERE tabla = %s', (tabla,))
+    fila = cursor.fetchone()
+    version = fila[0] if fila else None
+    if es_postgresql(conexion):
+        cursor.execute('SELECT pg_notify(%s, %s)', ('catalogo', f'{tabla}:{version}:{actualizado}'))
+        cursor.fetchone()
+    cursor.close()
     conexion.commit()
+    cache_catalogo.invalidar(tabla, version, actualizado)
+    marcar_escritura()
+
+def replica_atrasada(conexion, versiones):
+    """True si la conexión aún no tiene la versión del catálogo que ya conoce este proceso"""
+    esperadas = {tabla: version for tabla, version in versiones.items() if version is not None}
+    if not esperadas:
+        return False
+    cursor = conexion.cursor()
+    cursor.execute('SELECT tabla, version FROM versiones_catalogo')
+    en_conexion = dict(cursor.fetchall())
     cursor.close()
-    conexion.close()
+    return any(en_conexion.get(tabla, 0) < version for tabla, version in esperadas.items())
+
+def _leer_tablas(conexion, tablas):
+    repositorios = Datos(conexion)
+    leidas = {}
+    for tabla in tablas:
+        datos = CONSULTAS_CATALOGO[tabla](repositorios)
+        if datos is None:
+            datos = {}
+        leidas[tabla] = datos
+    return leidas
+
+def leer_catalogo(*tablas):
+    """Devuelve {tabla: (datos, json)} desde el caché.
+
+    Las tablas que no estén en caché se leen juntas con una sola conexión.
+    Regresa None si no hay base de datos.
+    """
+    resultado = {}
+    faltantes = []
+    for tabla in tablas:
+        en_cache = cache_catalogo.obtener(tabla)
+        if en_cache is not None:
+            resultado[tabla] = en_cache
+        else:
+            faltantes.append(tabla)
+    if not faltantes:
+        return resultado
     
-    print(f"\n¡Se actualizaron {usuarios_actualizados} contraseñas!")
-    if usuarios_actualizados > 0:
-        print("Ahora puedes iniciar sesión con:")
-        for usuario in usuarios:
-            print(f"Usuario: {usuario['username']} | Contraseña: {usuario['password']}")
-
-def crear_usuarios_iniciales():
-    """Crea usuarios iniciales en el sistema"""
-    print("👥 Creando usuarios iniciales...")
+    # La versión se toma antes de leer: si cambia durante la lectura, la copia se descarta
+    versiones = {tabla: cache_catalogo.version(tabla) for tabla in faltantes}
+    leidas = None
+    with obtener_conexion(lectura=True) as conexion:
+        if conexion is None:
+            return None
+        # Una réplica que no ha recibido el último cambio dejaría en caché datos viejos
+        # con la versión nueva; en ese caso se lee de la primaria
+        if not REPLICAS or not replica_atrasada(conexion, versiones):
+            leidas = _leer_tablas(conexion, faltantes)
+    if leidas is None:
+        lecturas['replica_atrasada'] += 1
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                return None
+            leidas = _leer_tablas(conexion, faltantes)
+    guardar_leidas(leidas, versiones, resultado)
+    return resultado
+
+def guardar_leidas(leidas, versiones, resultado):
+    """Serializa y guarda en caché las tablas recién leídas de la base de datos"""
+    for tabla, datos in leidas.items():
+        serializado = app.json.dumps(datos)
+        vence = datos.get('vigente_hasta') if isinstance(datos, dict) else None
+        cache_catalogo.guardar(tabla, versiones[tabla], datos, serializado, vence)
+        resultado[tabla] = (datos, serializado)
+
+# Tiempo que navegadores y CDN pueden reutilizar las respuestas sin revalidar
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 60))
+WEATHER_MAX_AGE = int(os.environ.get('WEATHER_MAX_AGE', 60))
+
+def respuesta_condicional(respuesta, etag=None, modificado=None, cache_control=None, peticion=None):
+    """Agrega ETag, Last-Modified y Cache-Control; responde 304 si el cliente ya lo tiene.
+
+    `peticion` es la petición de Flask en curso salvo que se indique otra (modo ASGI).
+    """
+    if etag:
+        respuesta.set_etag(etag)
+    else:
+        respuesta.add_etag()
+    if modificado:
+        respuesta.last_modified = int(modificado)
+    if cache_control:
+        respuesta.headers['Cache-Control'] = cache_control
+    return respuesta.make_conditional(request if peticion is None else peticion)
+
+def respuesta_catalogo(tabla, peticion=None, catalogo=None):
+    """Respuesta JSON de una tabla del catálogo; `catalogo` si ya se leyó (modo ASGI)"""
+    if peticion is None:
+        peticion = request
+    cache_control = f'public, max-age={CATALOG_MAX_AGE}'
+    version = cache_catalogo.version(tabla)
+    etag = f'{tabla}-{version}' if version is not None else None
+    modificado = cache_catalogo.modificado(tabla)
     
-    conexion = obtener_conexion()
-    if conexion is None:
-        print("❌ Error: No se pudo conectar a la base de datos")
-        return
-        
-    cursor = conexion.cursor()
+    # Si el cliente ya tiene esta versión se responde 304 sin consultar la tabla
+    # (no aplica si el contenido puede vencer sin un cambio de versión)
+    if etag and tabla not in CATALOGO_CON_VIGENCIA and peticion.if_none_match.contains(etag):
+        return respuesta_condicional(Response(status=304), etag, modificado, cache_control, peticion)
     
-    try:
-        # Verificar si ya existen usuarios para no duplicar
-        cursor.execute('SELECT COUNT(*) as count FROM usuarios')
-        resultado = cursor.fetchone()
-        count_usuarios = resultado[0] if resultado else 0
-        
-        if count_usuarios > 0:
-            print(f"ℹ Ya existen {count_usuarios} usuarios en la base de datos")
-            cursor.close()
-            conexion.close()
-            return
-        
-        # Limpiar tabla primero (solo si está vacía)
-        cursor.execute('DELETE FROM usuarios')
-        
-        # Usuarios con contraseñas REALES
-        usuarios = [
-            # ADMINS
-            ('admin', 'admin@sistema.com', 'admin123', 'admin'),
-            ('superuser', 'super@empresa.com', 'Super2024!', 'admin'),
-            ('administrador', 'admin@aguascalientes.com', 'AdminAgs123', 'admin'),
-            
-            # USUARIOS NORMALES
-            ('juanperez', 'juan@correo.com', 'JuanPassword1', 'user'),
-            ('mariagarcia', 'maria@correo.com', 'MariaSecure2', 'user'),
-            ('carloslopez', 'carlos@correo.com', 'CarlosPass3', 'user'),
-            ('anatorres', 'ana@correo.com', 'AnaClave456', 'user'),
-            ('robertosmith', 'roberto@correo.com', 'Robert789', 'user')
-        ]
-        
-        usuarios_creados = 0
-        
-        for username, email, password, rol in usuarios:
-            try:
-                # Generar hash REAL de la contraseña
-                password_hash = generate_password_hash(password)
-                
-                # Insertar usuario
-                cursor.execute(
-                    'INSERT INTO usuarios (username, email, password, rol) VALUES (%s, %s, %s, %s)',
-                    (username, email, password_hash, rol)
-                )
-                usuarios_creados += 1
-                print(f"✅ Usuario creado: {username} | Contraseña: {password} | Rol: {rol}")
-                
-            except Exception as e:
-                print(f"❌ Error creando usuario {username}: {e}")
-        
-        conexion.commit()
-        
-        print("\n" + "="*50)
-        print(f"🎯 {usuarios_creados} USUARIOS CREADOS EXITOSAMENTE")
-        print("="*50)
-        print("\n🔐 ADMINS (pueden configurar API y ver CRUD):")
-        print("   admin / admin123")
-        print("   superuser / Super2024!")
-        print("   administrador / AdminAgs123")
-        
-        print("\n👥 USUARIOS NORMALES (solo ven clima):")
-        print("   juanperez / JuanPassword1")
-        print("   mariagarcia / MariaSecure2")
-        print("   carloslopez / CarlosPass3")
-        print("   anatorres / AnaClave456")
-        print("   robertosmith / Robert789")
-        
-        print("\n📍 URL: http://localhost:5000/login")
-        
-    except Exception as e:
-        print(f"❌ Error general al crear usuarios: {e}")
-    finally:
-        cursor.close()
-        conexion.close()
+    if catalogo is None:
+        catalogo = leer_catalogo(tabla)
+    if catalogo is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+    datos, serializado = catalogo[tabla]
+    
+    vence = datos.get('vigente_hasta') if isinstance(datos, dict) else None
+    if tabla in CATALOGO_CON_VIGENCIA and etag:
+        etag = f'{etag}-{datos.get("id")}'
+    if vence:
+        # Que ningún caché la siga mostrando después de vencer o de ser reemplazada
+        restante = max(int(vence - time.time()), 0)
+        cache_control = f'public, max-age={min(CATALOG_MAX_AGE, restante)}'
+    respuesta = Response(serializado, mimetype='application/json')
+    return respuesta_condicional(respuesta, etag, modificado, cache_control, peticion)
 
+# ----------------------------------------------------
+# INICIALIZACIÓN
+# ----------------------------------------------------
 def inicializar_sistema():
     """Función que se ejecuta al iniciar la aplicación"""
     print("\n" + "="*60)
     print("🚀 INICIALIZANDO SISTEMA DE CLIMA Y EMERGENCIAS")
     print("="*60)
     
-    # Crear usuarios iniciales
-    crear_usuarios_iniciales()
-    
-    # Actualizar contraseñas existentes
-    actualizar_contraseñas()
+    # Esquema y datos iniciales (solo lo que falte)
+    migrar_base_de_datos()
     
     print("\n✅ Inicialización completada")
     print("="*60 + "\n")
 
+def reiniciar_tras_fork():
+    """Descarta lo heredado del proceso maestro de gunicorn (preload_app).
+
+    Las conexiones y los hilos del maestro no sirven en el worker: cada
+    uno abre los suyos en su primera petición.
+    """
+    reiniciar_pools()
+    servicio_clima.reiniciar()
+
+def cerrar_worker():
+    """Al terminar un worker: deja de planificar y cierra las conexiones libres"""
+    planificador.detener()
+    for pool in list(_pools.values()):
+        pool.cerrar_todo()
+
 # ----------------------------------------------------
 # RUTAS PRINCIPALES MODIFICADAS
 # ----------------------------------------------------
@@ -223,6 +491,32 @@ def inicio():
 # ----------------------------------------------------
 # RUTAS DE AUTENTICACIÓN
 # ----------------------------------------------------
+@app.errorhandler(ServicioSaturado)
+def servicio_saturado(e):
+    """Con la cola de hash llena se responde 503 en lugar de seguir encolando"""
+    encabezados = {'Retry-After': '2'}
+    if request.endpoint in ('login', 'registro'):
+        flash('El servidor está ocupado, intenta de nuevo en unos segundos', 'error')
+        return render_template(f'{request.endpoint}.html'), 503, encabezados
+    return Response('El servidor está ocupado, intenta de nuevo en unos segundos', 503, encabezados)
+
+def rehacer_hash(usuario, password):
+    """Reemplaza el hash guardado si se generó con otros parámetros.
+
+    El nuevo hash se calcula y se guarda en segundo plano: el login no
+    espera ni el hash ni el UPDATE.
+    """
+    def guardar(nuevo):
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                return
+            datos = Datos(conexion)
+            # Solo si nadie cambió la contraseña mientras tanto
+            datos.usuarios.cambiar_hash(usuario['id'], nuevo, usuario['password'])
+            datos.commit()
+
+    hash_contrasenas.rehacer_en_fondo(usuario['password'], password, guardar)
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if 'user_id' in session:
@@ -232,18 +526,15 @@ def login():
         username = request.form['username']
         password = request.form['password']
        
-        conexion = obtener_conexion()
-        if conexion is None:
-            flash('Error de conexión a la base de datos', 'error')
-            return render_template('login.html')
-           
-        cursor = conexion.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM usuarios WHERE username = %s', (username,))
-        usuario = cursor.fetchone()
-        cursor.close()
-        conexion.close()
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                flash('Error de conexión a la base de datos', 'error')
+                return render_template('login.html')
+               
+            usuario = Datos(conexion).usuarios.por_username(username)
        
-        if usuario and check_password_hash(usuario['password'], password):
+        if usuario and hash_contrasenas.verificar(usuario['password'], password):
+            rehacer_hash(usuario, password)
             session['user_id'] = usuario['id']
             session['username'] = usuario['username']
             session['rol'] = usuario['rol']
@@ -280,27 +571,21 @@ def registro():
             flash('El email debe contener @', 'error')
             return render_template('registro.html')
        
-        conexion = obtener_conexion()
-        if conexion is None:
-            flash('Error de conexión a la base de datos', 'error')
-            return render_template('registro.html')
-           
-        cursor = conexion.cursor(dictionary=True)
-        cursor.execute('SELECT id FROM usuarios WHERE username = %s OR email = %s', (username, email))
-        usuario_existente = cursor.fetchone()
-       
-        if usuario_existente:
-            flash('El usuario o email ya están registrados', 'error')
-            cursor.close()
-            conexion.close()
-            return render_template('registro.html')
+        # El hash se calcula antes de tomar una conexión del pool
+        hashed_password = hash_contrasenas.generar(password)
        
-        hashed_password = generate_password_hash(password)
-        cursor.execute('INSERT INTO usuarios (username, email, password, rol) VALUES (%s, %s, %s, %s)',
-                      (username, email, hashed_password, 'user'))
-        conexion.commit()
-        cursor.close()
-        conexion.close()
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                flash('Error de conexión a la base de datos', 'error')
+                return render_template('registro.html')
+               
+            datos = Datos(conexion)
+            if datos.usuarios.existe(username, email):
+                flash('El usuario o email ya están registrados', 'error')
+                return render_template('registro.html')
+           
+            datos.usuarios.agregar(username, email, hashed_password, 'user')
+            confirmar_cambio(conexion, 'usuarios')
        
         flash('¡Registro exitoso! Ahora puedes iniciar sesión.', 'success')
         return redirect(url_for('login'))
@@ -317,104 +602,566 @@ def clima():
         return redirect(url_for('login'))
     return render_template('clima.html', username=session['username'], rol=session.get('rol'))
 
-@app.route('/api/weather')
-def get_weather():
+# Ciudades de la región: cada una tiene su propia entrada en la caché del clima.
+# Se leen de la tabla ciudades (cargar_ciudades); ciudades.CIUDADES es la
+# misma lista y se usa mientras la base de datos no responde
+indice_ciudades = IndiceCiudades(CIUDADES)
+# Coordenadas más lejos que esto de todas las ciudades quedan fuera de la región
+CIUDAD_DISTANCIA_MAX_KM = float(os.environ.get('CIUDAD_DISTANCIA_MAX_KM', 40))
+# Ids de OpenWeatherMap aprendidos por ciudad, compartidos por todos los workers
+CLAVE_IDS_OPENWEATHER = 'ids_openweather'
+
+def cargar_ciudades():
+    """Reconstruye el índice con las ciudades activas de la base de datos"""
+    global indice_ciudades
+    with obtener_conexion(lectura=True) as conexion:
+        if conexion is None:
+            return False
+        ciudades = Datos(conexion).ciudades.activas()
+    if not any(ciudad['id'] == CIUDAD_PREDETERMINADA for ciudad in ciudades):
+        print(f"⚠ La tabla ciudades no tiene '{CIUDAD_PREDETERMINADA}': se usan las ciudades incluidas")
+        return False
+    indice_ciudades = IndiceCiudades(ciudades)
+    return True
+
+def clave_ciudad(ciudad_id):
+    # La ciudad predeterminada conserva la clave de siempre (snapshot y SSE la usan)
+    return CLAVE_CLIMA if ciudad_id == CIUDAD_PREDETERMINADA else f'ciudad_{ciudad_id}'
+
+def ciudad_de_peticion(args):
+    """Ciudad pedida con ?city=<id> o la más cercana a ?lat=&lon=.
+
+    Regresa (ciudad, distancia_km, error) con error = (mensaje, código HTTP).
+    Sin parámetros es la ciudad predeterminada.
+    """
+    if args.get('city'):
+        ciudad = indice_ciudades.obtener(args['city'])
+        if ciudad is None:
+            return None, None, ('Ciudad desconocida', 404)
+        return ciudad, None, None
+
+    if 'lat' in args or 'lon' in args:
+        try:
+            lat, lon = float(args['lat']), float(args['lon'])
+        except (KeyError, ValueError):
+            return None, None, ('Coordenadas inválidas', 400)
+        # Las comparaciones con NaN son falsas: también se rechaza
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return None, None, ('Coordenadas inválidas', 400)
+        ciudad, distancia = indice_ciudades.cercana(lat, lon)
+        if distancia > CIUDAD_DISTANCIA_MAX_KM:
+            return None, None, ('Fuera de la región', 404)
+        return ciudad, distancia, None
+
+    return indice_ciudades.obtener(CIUDAD_PREDETERMINADA), None, None
+
+def consultar_ciudades(ciudades):
+    """Clima de varias ciudades con el menor número de llamadas al API"""
+    lectura = cache_clima.leer(CLAVE_IDS_OPENWEATHER)
+    ids_openweather = dict(lectura[0]) if lectura else {}
+    conocidos = dict(ids_openweather)
+    nuevas = servicio_clima.consultar_ciudades(ciudades, GLOBAL_API_KEY, ids_openweather)
+    if ids_openweather != conocidos:
+        cache_clima.guardar(CLAVE_IDS_OPENWEATHER, ids_openweather)
+    consejos = consejos_vigentes()
+    nuevas = {ciudad_id: con_alerta(weather_data, consejos) for ciudad_id, weather_data in nuevas.items()}
+    if nuevas:
+        registrar_en_fondo(nuevas)
+    return nuevas
+
+def actualizar_clima(ciudad_id=CIUDAD_PREDETERMINADA):
+    """Consulta el API y guarda la lectura como última conocida"""
+    if ciudad_id != CIUDAD_PREDETERMINADA:
+        return consultar_ciudades([indice_ciudades.obtener(ciudad_id)]).get(ciudad_id)
+
+    weather_data = servicio_clima.consultar_openweather(GLOBAL_API_KEY)
+    if weather_data:
+        weather_data = con_alerta(weather_data, consejos_vigentes())
+        snapshot_clima.guardar(weather_data)
+        registrar_en_fondo({CIUDAD_PREDETERMINADA: weather_data})
+    return weather_data
+
+def refrescar_clima():
+    """Tarea programada: publica el clima actual en la caché"""
+    weather_data = actualizar_clima()
+    if not weather_data:
+        return False
+    publicar_en_base_de_datos({CLAVE_CLIMA: (weather_data, cache_clima.guardar(CLAVE_CLIMA, weather_data))})
+
+def refrescar_ciudades():
+    """Tarea programada: publica el clima de las demás ciudades (pocas llamadas a /group)"""
+    lecturas = consultar_ciudades([ciudad for ciudad in indice_ciudades.ciudades.values()
+                                   if ciudad['id'] != CIUDAD_PREDETERMINADA])
+    if not lecturas:
+        return False
+    publicadas = {}
+    for ciudad_id, weather_data in lecturas.items():
+        clave = clave_ciudad(ciudad_id)
+        publicadas[clave] = (weather_data, cache_clima.guardar(clave, weather_data))
+    publicar_en_base_de_datos(publicadas)
+
+# La caché del clima es de cada servidor: el líder del planificador también
+# deja cada lectura en la base de datos y los demás servidores la copian
+# de ahí cuando la suya vence, a lo más una consulta cada tantos segundos
+WEATHER_PUBLICADO_REVISION = int(os.environ.get('WEATHER_PUBLICADO_REVISION', 10))
+_revision_publicado = {}
+_revision_publicado_lock = Lock()
+
+def publicar_en_base_de_datos(lecturas):
+    """Guarda {clave: (weather_data, guardado)} para los servidores donde no corre el planificador"""
+    try:
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                return False
+            datos = Datos(conexion)
+            for clave, (weather_data, guardado) in lecturas.items():
+                datos.publicado.guardar(clave, weather_data, guardado)
+            datos.commit()
+    except Exception as e:
+        print(f"Error publicando el clima en la base de datos: {e}")
+        return False
+    return True
+
+def toca_traer_publicado(clave):
+    """True si la lectura local venció y ya se puede consultar la publicada"""
+    if WEATHER_POLLER_INTERVALO <= 0 or planificador.es_lider():
+        return False
+    edad = cache_clima.edad(clave)
+    if edad is not None and edad < cache_clima.ttl:
+        return False
+    ahora = time.monotonic()
+    with _revision_publicado_lock:
+        if _revision_publicado.get(clave, 0) > ahora:
+            return False
+        _revision_publicado[clave] = ahora + WEATHER_PUBLICADO_REVISION
+    return True
+
+def traer_publicado(clave):
+    """Copia a la caché de este servidor la lectura que publicó el planificador"""
+    try:
+        with obtener_conexion(lectura=True) as conexion:
+            if conexion is None:
+                return
+            lectura = Datos(conexion).publicado.leer(clave)
+    except Exception as e:
+        print(f"Error leyendo el clima publicado: {e}")
+        return
+    if lectura is None:
+        return
+    # Conserva su antigüedad real: si el líder dejó de publicar, sigue vencida
+    cache_clima.sembrar(clave, *lectura)
+    if clave == CLAVE_CLIMA:
+        ultima = snapshot_clima.leer()
+        if ultima is None or ultima[1] < lectura[1]:
+            snapshot_clima.guardar(*lectura)
+
+def lectura_difundida():
+    """Clima que se reparte por SSE (también en los servidores sin el planificador)"""
+    if toca_traer_publicado(CLAVE_CLIMA):
+        traer_publicado(CLAVE_CLIMA)
+    lectura = cache_clima.leer(CLAVE_CLIMA)
+    # Con los mismos consejos que /api/weather
+    return alerta_al_dia(CLAVE_CLIMA, *lectura) if lectura else None
+
+def _lectura_en_cache(weather_data, clave=CLAVE_CLIMA):
+    # Momento en que se guardó el valor que regresó la caché
+    lectura = cache_clima.leer(clave)
+    return weather_data, lectura[1] if lectura else None
+
+def ultima_lectura(ciudad_id):
+    """Última lectura real (weather_data, guardado) aunque esté vencida, o None"""
+    if ciudad_id == CIUDAD_PREDETERMINADA:
+        return snapshot_clima.leer()
+    # Las demás ciudades no tienen snapshot: su archivo de la caché no se borra al vencer
+    return cache_clima.leer(clave_ciudad(ciudad_id))
+
+# Sin ninguna lectura real disponible
+CLIMA_EJEMPLO = {
+    'temperature': 22,
+    'feels_like': 24,
+    'humidity': 45,
+    'pressure': 1013,
+    'wind_speed': 12,
+    'description': 'Despejado',
+    'icon': '01d',
+    'city': 'Aguascalientes',
+    'country': 'MX',
+    'source': 'Datos de ejemplo'
+}
+
+# ----------------------------------------------------
+# ALERTAS POR CALOR
+# ----------------------------------------------------
+# Las reglas y los consejos se evalúan una vez por lectura nueva del API,
+# no por petición: la alerta se guarda con la lectura en la caché
+motor_alertas = MotorAlertas()
+# Lecturas publicadas antes del último cambio de consejos_clima, ya con los
+# consejos nuevos: {clave: (guardado, versión, weather_data)}
+_alertas_rehechas = {}
+
+def consejos_vigentes():
+    """(versión, catálogo) de consejos_clima; la versión se toma antes de leer"""
+    version = cache_catalogo.version('consejos_clima')
+    return version, leer_catalogo('consejos_clima')
+
+def con_alerta(weather_data, consejos):
+    """La lectura con su alerta: nivel, motivos, etiquetas y consejos activos.
+
+    `consejos` es lo que regresa consejos_vigentes(). Sin base de datos la
+    alerta queda sin consejos ni versión y se completa al servirla.
+    """
+    version, catalogo = consejos
+    alerta = motor_alertas.evaluar(weather_data)
+    if catalogo is None:
+        version, elegidos = None, []
+    else:
+        elegidos = motor_alertas.consejos(alerta['tags'], catalogo['consejos_clima'][0])
+    return dict(weather_data, alert=dict(alerta, consejos=elegidos, consejos_version=version))
+
+def _alerta_guardada(clave, weather_data, guardado):
+    # La lectura con consejos de la versión actual, sin rehacer nada (None si hay que rehacerla)
+    version = cache_catalogo.version('consejos_clima')
+    alerta = weather_data.get('alert')
+    if alerta is not None and alerta.get('consejos_version') == version:
+        return weather_data
+    rehecha = _alertas_rehechas.get(clave)
+    if rehecha is not None and rehecha[:2] == (guardado, version):
+        return rehecha[2]
+    return None
+
+def alerta_desactualizada(clave, weather_data, guardado):
+    """True si hay que rehacer la alerta (los consejos cambiaron después de publicar la lectura)"""
+    return _alerta_guardada(clave, weather_data, guardado) is None
+
+def alerta_al_dia(clave, weather_data, guardado, consejos=None):
+    """(weather_data, guardado) tal como se publicó, salvo que los consejos hayan cambiado.
+
+    En ese caso (y con lecturas de antes de las alertas o los datos de
+    ejemplo) la alerta se rehace una sola vez por proceso, lectura y versión.
+    """
+    al_dia = _alerta_guardada(clave, weather_data, guardado)
+    if al_dia is None:
+        if consejos is None:
+            consejos = consejos_vigentes()
+        al_dia = con_alerta(weather_data, consejos)
+        _alertas_rehechas[clave] = (guardado, consejos[0], al_dia)
+    return al_dia, guardado
+
+def clima_actual(ciudad_id=CIUDAD_PREDETERMINADA):
+    """Clima para /api/weather: caché, última lectura guardada o datos de ejemplo.
+
+    Regresa (weather_data, guardado), con guardado=None para los datos de ejemplo.
+    """
+    clave = clave_ciudad(ciudad_id)
+    if toca_traer_publicado(clave):
+        traer_publicado(clave)
+    actualizar = lambda: actualizar_clima(ciudad_id)
+    # Con el refresco programado la petición solo lee lo que ya se publicó
+    calcular = None if WEATHER_POLLER_INTERVALO > 0 else actualizar
+    weather_data = cache_clima.obtener(clave, calcular)
+    if weather_data:
+        return alerta_al_dia(clave, *_lectura_en_cache(weather_data, clave))
+   
+    # Sin API disponible: servir la última lectura real indicando su antigüedad
+    lectura = ultima_lectura(ciudad_id)
+    if lectura:
+        weather_data, guardado = alerta_al_dia(clave, *lectura)
+        return dict(weather_data, stale=True, age_seconds=int(time.time() - guardado)), guardado
+   
+    # Primer arranque sin ninguna lectura previa: consultar directamente una vez
+    if calcular is None:
+        weather_data = cache_clima.obtener(clave, actualizar)
+        if weather_data:
+            return alerta_al_dia(clave, *_lectura_en_cache(weather_data, clave))
+   
+    ciudad = indice_ciudades.obtener(ciudad_id)
+    return alerta_al_dia(clave, dict(CLIMA_EJEMPLO, city=ciudad['nombre'], city_id=ciudad_id), None)
+
+# ----------------------------------------------------
+# HISTORIAL DEL CLIMA
+# ----------------------------------------------------
+# Alcance máximo de una consulta de /api/weather/history por resolución (días)
+HISTORIAL_MAX_DIAS = {'hora': 93, 'dia': 3 * 366}
+# Sin resolución indicada, los rangos de hasta estos días se sirven por hora
+HISTORIAL_DIAS_POR_HORA = 7
+RESOLUCIONES = {'hour': 'hora', 'day': 'dia'}
+
+def registrar_observaciones(lecturas, observado=None):
+    """Guarda en el historial las lecturas nuevas del API ({ciudad_id: weather_data})"""
+    if observado is None:
+        observado = time.time()
+    try:
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                return False
+            datos = Datos(conexion)
+            for ciudad_id, weather_data in lecturas.items():
+                datos.historial.registrar(ciudad_id, observado, weather_data)
+            datos.commit()
+    except Exception as e:
+        # También PoolAgotado: la lectura ya se publicó, solo falta su historial
+        print(f"Error guardando el historial del clima: {e}")
+        return False
+    return True
+
+# Un solo hilo por proceso escribe el historial, en el orden en que llegan
+# las lecturas; con la base de datos caída la cola no crece sin límite
+HISTORIAL_COLA = int(os.environ.get('HISTORIAL_COLA', 100))
+_historial_cola = None
+_historial_pid = None
+_historial_lock = Lock()
+
+def _escribir_historial(cola):
+    while True:
+        lecturas, observado = cola.get()
+        registrar_observaciones(lecturas, observado)
+
+def registrar_en_fondo(lecturas):
+    """Encola las lecturas para el hilo del historial: publicar la lectura no espera a la base de datos"""
+    global _historial_cola, _historial_pid
+    with _historial_lock:
+        if _historial_pid != os.getpid():
+            # Tras un fork el hilo del padre no existe en este proceso
+            _historial_pid = os.getpid()
+            _historial_cola = queue.Queue(maxsize=HISTORIAL_COLA)
+            Thread(target=_escribir_historial, args=(_historial_cola,), name='historial-clima', daemon=True).start()
+        cola = _historial_cola
+    try:
+        # El momento de la observación es el de la lectura, no el de la escritura
+        cola.put_nowait((lecturas, time.time()))
+    except queue.Full:
+        print("⚠ Cola del historial llena: se descarta una lectura")
+
+def _momento(valor):
+    """Segundos desde 1970 de un número o de una fecha AAAA-MM-DD (inicio del día)"""
+    if valor.isdigit():
+        return int(valor)
+    inicio_del_dia = datetime.strptime(valor, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+    return int(inicio_del_dia) - repositorio.HISTORIAL_UTC_OFFSET
+
+def _promedios(fila):
+    muestras = fila['muestras']
+    return {
+        'start': fila['inicio'],
+        'samples': muestras,
+        'temperature': {'min': fila['temp_min'], 'max': fila['temp_max'],
+                        'avg': round(fila['temp_suma'] / muestras, 1)},
+        'humidity': {'min': fila['humedad_min'], 'max': fila['humedad_max'],
+                     'avg': round(fila['humedad_suma'] / muestras, 1)},
+        'wind_speed': {'min': fila['viento_min'], 'max': fila['viento_max'],
+                       'avg': round(fila['viento_suma'] / muestras, 1)},
+    }
+
+@app.route('/api/weather/history')
+def get_weather_history():
+    """Historial por hora o por día de una ciudad, leído de los resúmenes.
+
+    ?from= y ?to= en segundos desde 1970 o AAAA-MM-DD (por defecto los
+    últimos 7 días) y ?resolution=hour|day (por defecto según el rango).
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'No autorizado'}), 401
    
-    api_key = GLOBAL_API_KEY
+    ciudad, _, error = ciudad_de_peticion(request.args)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
    
-    locations = [
-        {'city': 'Aguascalientes', 'state': 'Ags', 'country': 'MX'},
-        {'city': 'Aguascalientes', 'state': '', 'country': 'MX'},
-        {'lat': 21.8853, 'lon': -102.2916}
-    ]
+    try:
+        hasta = _momento(request.args['to']) if request.args.get('to') else int(time.time())
+        desde = (_momento(request.args['from']) if request.args.get('from')
+                 else hasta - HISTORIAL_DIAS_POR_HORA * 86400)
+    except ValueError:
+        return jsonify({'error': 'Fechas inválidas'}), 400
+    if desde >= hasta:
+        return jsonify({'error': 'El rango está vacío'}), 400
+   
+    resolucion = request.args.get('resolution')
+    if resolucion is None:
+        resolucion = 'hour' if hasta - desde <= HISTORIAL_DIAS_POR_HORA * 86400 else 'day'
+    periodo = RESOLUCIONES.get(resolucion)
+    if periodo is None:
+        return jsonify({'error': 'Resolución inválida (hour o day)'}), 400
+    if hasta - desde > HISTORIAL_MAX_DIAS[periodo] * 86400:
+        return jsonify({'error': f'Rango máximo con {resolucion}: {HISTORIAL_MAX_DIAS[periodo]} días'}), 400
+   
+    # Una fila por periodo por la llave primaria: no se leen las observaciones
+    with obtener_conexion(lectura=True) as conexion:
+        if conexion is None:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        resumenes = Datos(conexion).historial.rango(ciudad['id'], periodo, desde, hasta)
    
-    for location in locations:
+    respuesta = jsonify({
+        'city': ciudad['nombre'],
+        'city_id': ciudad['id'],
+        'resolution': resolucion,
+        'from': desde,
+        'to': hasta,
+        'points': [_promedios(fila) for fila in resumenes]
+    })
+    respuesta.vary.add('Cookie')
+    return respuesta_condicional(respuesta, cache_control=f'private, max-age={WEATHER_MAX_AGE}')
+
+# ----------------------------------------------------
+# TAREAS PROGRAMADAS
+# ----------------------------------------------------
+def conectar_base_de_datos():
+    """Conexión propia (fuera del pool) para el candado del planificador"""
+    for backend in BACKENDS:
+        salud = salud_backends[backend]
+        if not salud.permitir():
+            continue
         try:
-            if 'lat' in location and 'lon' in location:
-                url = f'https://api.openweathermap.org/data/2.5/weather?lat={location["lat"]}&lon={location["lon"]}&appid={api_key}&units=metric&lang=es'
-            else:
-                url = f'https://api.openweathermap.org/data/2.5/weather?q={location["city"]},{location["country"]}&appid={api_key}&units=metric&lang=es'
-           
-            response = requests.get(url, timeout=10)
-           
-            if response.status_code == 200:
-                data = response.json()
-                city_name = data.get('name', '').lower()
-                country = data.get('sys', {}).get('country', '')
-               
-                if ('aguascalientes' in city_name or 'ags' in city_name) and country == 'MX':
-                    weather_data = {
-                        'temperature': round(data['main']['temp']),
-                        'feels_like': round(data['main']['feels_like']),
-                        'humidity': data['main']['humidity'],
-                        'pressure': data['main']['pressure'],
-                        'wind_speed': round(data['wind']['speed'] * 3.6),
-                        'description': data['weather'][0]['description'].capitalize(),
-                        'icon': data['weather'][0]['icon'],
-                        'city': data['name'],
-                        'country': data['sys']['country'],
-                        'source': 'OpenWeatherMap'
-                    }
-                    return jsonify(weather_data)
-           
-        except requests.exceptions.RequestException:
+            conexion = conectar_postgresql() if backend == 'postgresql' else conectar_mysql()
+        except Exception as e:
+            salud.registrar_fallo(e)
             continue
+        salud.registrar_exito()
+        return conexion
+    raise ConnectionError('Ninguna base de datos disponible')
+
+# Un solo proceso de todo el despliegue ejecuta las tareas (candado en la base de datos)
+planificador = Planificador(conectar_base_de_datos, obtener_conexion, es_postgresql,
+                            os.path.dirname(cache_clima.directorio))
+
+# 0 desactiva el refresco del clima en segundo plano. Lo corre un solo
+# proceso de todo el despliegue (candado del planificador, ver planificador.py);
+# solo mientras no hay base de datos el candado de archivo elige uno por
+# servidor y cada servidor consulta OpenWeatherMap por su cuenta
+WEATHER_POLLER_INTERVALO = int(os.environ.get('WEATHER_POLLER_INTERVALO', 240))
+if WEATHER_POLLER_INTERVALO > 0:
+    planificador.registrar('refrescar_clima', refrescar_clima, WEATHER_POLLER_INTERVALO)
+    planificador.registrar('refrescar_ciudades', refrescar_ciudades, WEATHER_POLLER_INTERVALO)
+
+# Proceso que ya lanzó el calentamiento de sus cachés
+_calentado_pid = None
+
+def calentar_caches():
+    """Lee las ciudades, llena el caché del catálogo de este proceso y trae el clima publicado.
+
+    iniciar_tareas_de_fondo la lanza en un hilo con el primer request de
+    cada worker (no al arrancar el proceso). El caché del catálogo vive en
+    la memoria de cada proceso, así que no puede calentarlo una tarea del
+    planificador. El clima solo se copia de clima_publicado si la caché de
+    archivos de este servidor ya venció (toca_traer_publicado): el primer
+    worker la deja al día y los demás la encuentran vigente. En el líder
+    la mantienen refrescar_clima y refrescar_ciudades.
+    """
+    try:
+        cargar_ciudades()
+        leer_catalogo(*CONSULTAS_CATALOGO)
+        for ciudad in indice_ciudades.ciudades.values():
+            clave = clave_ciudad(ciudad['id'])
+            if toca_traer_publicado(clave):
+                traer_publicado(clave)
+    except Exception as e:
+        print(f"Error calentando las cachés: {e}")
+
+@app.before_request
+def iniciar_tareas_de_fondo():
+    # Se arrancan en el primer request de cada worker (después del fork)
+    global _calentado_pid
+    migrar_base_de_datos()
+    planificador.iniciar()
+    cache_catalogo.iniciar_revision()
+    if cache_catalogo.escucha is not None:
+        cache_catalogo.escucha.iniciar()
+    if _calentado_pid != os.getpid():
+        _calentado_pid = os.getpid()
+        Thread(target=calentar_caches, name='calentar-caches', daemon=True).start()
+
+@app.route('/api/weather')
+def get_weather():
+    """Clima de ?city=<id>, de la ciudad más cercana a ?lat=&lon= o de la predeterminada"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autorizado'}), 401
    
-    return jsonify({
-        'temperature': 22,
-        'feels_like': 24,
-        'humidity': 45,
-        'pressure': 1013,
-        'wind_speed': 12,
-        'description': 'Despejado',
-        'icon': '01d',
-        'city': 'Aguascalientes',
-        'country': 'MX',
-        'source': 'Datos de ejemplo'
-    })
+    ciudad, distancia, error = ciudad_de_peticion(request.args)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+   
+    weather_data, guardado = clima_actual(ciudad['id'])
+    if distancia is not None:
+        weather_data = dict(weather_data, distance_km=round(distancia, 1))
+    respuesta = jsonify(weather_data)
+    # Depende de la sesión: solo el navegador (no un CDN) puede guardarla
+    respuesta.vary.add('Cookie')
+    return respuesta_condicional(respuesta, modificado=guardado,
+                                 cache_control=f'private, max-age={WEATHER_MAX_AGE}')
+
+# Un solo vigilante por proceso reparte cada cambio del clima a todos los clientes SSE
+difusor_clima = Difusor('clima', lectura_difundida,
+                        keepalive=int(os.environ.get('SSE_KEEPALIVE', 15)))
+
+@app.route('/api/weather/stream')
+def weather_stream():
+    """Envía el clima por Server-Sent Events cada vez que cambia"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autorizado'}), 401
+   
+    # Un worker sync de gunicorn atiende una petición a la vez: un cliente
+    # conectado lo dejaría ocupado. 204 hace que EventSource no reconecte y
+    # clima.html vuelve a consultar /api/weather cada 5 minutos.
+    if not request.environ.get('wsgi.multithread'):
+        return '', 204
+   
+    ultimo_id = request.headers.get('Last-Event-ID')
+    return Response(difusor_clima.suscribir(ultimo_id),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # ----------------------------------------------------
 # RUTAS ADMINISTRATIVAS
 # ----------------------------------------------------
+# Paginación del dashboard por id (keyset): el costo no crece con la tabla
+DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', 25))
+DASHBOARD_PAGE_MAX = 100
+DASHBOARD_COUNT_TTL = int(os.environ.get('DASHBOARD_COUNT_TTL', 300))
+
+_total_usuarios = {'valor': None, 'version': None, 'expira': 0.0}
+
+def total_usuarios(datos):
+    """Número total de usuarios, recalculado solo al expirar o tras un alta/baja.
+
+    Las altas y bajas suben la versión 'usuarios' de versiones_catalogo
+    (confirmar_cambio), así que un cambio hecho en otro worker se nota en
+    cuanto cache_catalogo conoce la nueva versión.
+    """
+    version = cache_catalogo.version('usuarios')
+    if (_total_usuarios['valor'] is None or version != _total_usuarios['version']
+            or time.monotonic() >= _total_usuarios['expira']):
+        _total_usuarios['valor'] = datos.usuarios.total()
+        _total_usuarios['version'] = version
+        _total_usuarios['expira'] = time.monotonic() + DASHBOARD_COUNT_TTL
+    return _total_usuarios['valor']
+
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session or session.get('rol') != 'admin':
         flash('No tienes permisos para acceder a esta sección', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('inicio'))
-       
-    cursor = conexion.cursor(dictionary=True)
-    busqueda = request.args.get('busqueda', '')
+    busqueda = request.args.get('busqueda', '').strip()
+    antes = request.args.get('antes', type=int)
+    despues = request.args.get('despues', type=int)
+    tamano = min(max(request.args.get('tamano', DASHBOARD_PAGE_SIZE, type=int), 1), DASHBOARD_PAGE_MAX)
    
-    if busqueda:
-        try:
-            # Convertir a número para buscar por ID exacto
-            usuario_id = int(busqueda)
-            cursor.execute('''
-                SELECT * FROM usuarios
-                WHERE id = %s
-                ORDER BY id DESC
-            ''', (usuario_id,))
-        except ValueError:
-            # Si no es un número, no mostrar resultados
-            cursor.execute('SELECT * FROM usuarios WHERE 1=0')
-    else:
-        cursor.execute('SELECT * FROM usuarios ORDER BY id DESC')
-   
-    usuarios = cursor.fetchall()
-    cursor.close()
-    conexion.close()
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('inicio'))
+           
+        datos = Datos(conexion)
+        usuarios, hay_anterior, hay_siguiente = datos.usuarios.pagina(busqueda, antes, despues, tamano)
+        total = None if busqueda else total_usuarios(datos)
    
     return render_template('admin.html',
                          usuarios=usuarios,
                          username=session['username'],
-                         busqueda=busqueda)
+                         busqueda=busqueda,
+                         tamano=tamano,
+                         total=total,
+                         anterior=usuarios[0]['id'] if usuarios and hay_anterior else None,
+                         siguiente=usuarios[-1]['id'] if usuarios and hay_siguiente else None)
 
 @app.route('/eliminar_usuario/<int:usuario_id>')
 def eliminar_usuario(usuario_id):
@@ -426,22 +1173,19 @@ def eliminar_usuario(usuario_id):
         flash('No puedes eliminar tu propio usuario', 'error')
         return redirect(url_for('dashboard'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('dashboard'))
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('dashboard'))
+           
+        datos = Datos(conexion)
        
-    cursor = conexion.cursor()
-   
-    try:
-        cursor.execute('DELETE FROM usuarios WHERE id = %s', (usuario_id,))
-        conexion.commit()
-        flash('Usuario eliminado correctamente', 'success')
-    except Exception as e:
-        flash('Error al eliminar el usuario', 'error')
-   
-    cursor.close()
-    conexion.close()
+        try:
+            datos.usuarios.eliminar(usuario_id)
+            confirmar_cambio(conexion, 'usuarios')
+            flash('Usuario eliminado correctamente', 'success')
+        except Exception as e:
+            flash('Error al eliminar el usuario', 'error')
     return redirect(url_for('dashboard'))
 
 @app.route('/editar_usuario/<int:usuario_id>', methods=['GET', 'POST'])
@@ -450,48 +1194,35 @@ def editar_usuario(usuario_id):
         flash('No tienes permisos para realizar esta acción', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('dashboard'))
-       
-    cursor = conexion.cursor(dictionary=True)
+    # El hash se calcula antes de tomar una conexión del pool
+    hashed_password = None
+    if request.method == 'POST' and request.form.get('nueva_password'):
+        hashed_password = hash_contrasenas.generar(request.form['nueva_password'])
    
-    if request.method == 'POST':
-        username = request.form['username']
-        email = request.form['email']
-        rol = request.form['rol']
-        nueva_password = request.form.get('nueva_password', '')
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('dashboard'))
+           
+        datos = Datos(conexion)
        
-        try:
-            if nueva_password:
-                hashed_password = generate_password_hash(nueva_password)
-                cursor.execute('''
-                    UPDATE usuarios
-                    SET username = %s, email = %s, rol = %s, password = %s
-                    WHERE id = %s
-                ''', (username, email, rol, hashed_password, usuario_id))
-            else:
-                cursor.execute('''
-                    UPDATE usuarios
-                    SET username = %s, email = %s, rol = %s
-                    WHERE id = %s
-                ''', (username, email, rol, usuario_id))
+        if request.method == 'POST':
+            username = request.form['username']
+            email = request.form['email']
+            rol = request.form['rol']
            
-            conexion.commit()
-            flash('Usuario actualizado correctamente', 'success')
+            try:
+                # Sin nueva contraseña se conserva la actual
+                datos.usuarios.actualizar(usuario_id, username, email, rol, hashed_password)
+                datos.commit()
+                flash('Usuario actualizado correctamente', 'success')
+               
+            except Exception as e:
+                flash('Error al actualizar el usuario', 'error')
            
-        except Exception as e:
-            flash('Error al actualizar el usuario', 'error')
+            return redirect(url_for('dashboard'))
        
-        cursor.close()
-        conexion.close()
-        return redirect(url_for('dashboard'))
-   
-    cursor.execute('SELECT * FROM usuarios WHERE id = %s', (usuario_id,))
-    usuario = cursor.fetchone()
-    cursor.close()
-    conexion.close()
+        usuario = datos.usuarios.por_id(usuario_id)
    
     if not usuario:
         flash('Usuario no encontrado', 'error')
@@ -518,37 +1249,50 @@ def crear_usuario():
             flash('Las contraseñas no coinciden', 'error')
             return render_template('crear_usuario.html', username=session['username'])
        
-        conexion = obtener_conexion()
-        if conexion is None:
-            flash('Error de conexión a la base de datos', 'error')
-            return render_template('crear_usuario.html', username=session['username'])
-           
-        cursor = conexion.cursor(dictionary=True)
-       
-        cursor.execute('SELECT id FROM usuarios WHERE username = %s OR email = %s', (username, email))
-        usuario_existente = cursor.fetchone()
-       
-        if usuario_existente:
-            flash('El usuario o email ya están registrados', 'error')
-            cursor.close()
-            conexion.close()
-            return render_template('crear_usuario.html', username=session['username'])
-       
-        hashed_password = generate_password_hash(password)
-        cursor.execute('''
-            INSERT INTO usuarios (username, email, password, rol)
-            VALUES (%s, %s, %s, %s)
-        ''', (username, email, hashed_password, rol))
+        # El hash se calcula antes de tomar una conexión del pool
+        hashed_password = hash_contrasenas.generar(password)
        
-        conexion.commit()
-        cursor.close()
-        conexion.close()
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                flash('Error de conexión a la base de datos', 'error')
+                return render_template('crear_usuario.html', username=session['username'])
+               
+            datos = Datos(conexion)
+           
+            if datos.usuarios.existe(username, email):
+                flash('El usuario o email ya están registrados', 'error')
+                return render_template('crear_usuario.html', username=session['username'])
+           
+            datos.usuarios.agregar(username, email, hashed_password, rol)
+            confirmar_cambio(conexion, 'usuarios')
        
         flash('Usuario creado correctamente', 'success')
         return redirect(url_for('dashboard'))
    
     return render_template('crear_usuario.html', username=session['username'])
 
+@app.route('/admin/metricas')
+def admin_metricas():
+    """Métricas internas del proceso (pools de conexiones, etc.)"""
+    if 'user_id' not in session or session.get('rol') != 'admin':
+        return jsonify({'error': 'No autorizado'}), 401
+
+    return jsonify({
+        'pid': os.getpid(),
+        'pools': [pool.estadisticas() for pool in list(_pools.values())],
+        'backends': [salud.estadisticas() for salud in salud_backends.values()],
+        'lecturas': dict(lecturas, replicas=REPLICAS, sticky_segundos=REPLICA_STICKY_SEGUNDOS),
+        'caches': [cache_clima.estadisticas()],
+        'clima': servicio_clima.estadisticas(),
+        'ciudades': indice_ciudades.estadisticas(),
+        'alertas': motor_alertas.estadisticas(),
+        'tareas': planificador.estadisticas(),
+        'difusores': [difusor_clima.estadisticas()],
+        'catalogo': cache_catalogo.estadisticas(),
+        'hash_contrasenas': hash_contrasenas.estadisticas(),
+        'sentencias_preparadas': repositorio.estadisticas()
+    })
+
 # ----------------------------------------------------
 # RUTAS PARA ADMINISTRACIÓN DE NÚMEROS DE EMERGENCIA
 # ----------------------------------------------------
@@ -559,18 +1303,13 @@ def admin_emergencia():
         flash('No tienes permisos para acceder a esta sección', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('inicio'))
-       
-    cursor = conexion.cursor(dictionary=True)
-    
-    # Obtener todos los números de emergencia
-    cursor.execute('SELECT * FROM numeros_emergencia ORDER BY categoria, nombre')
-    numeros = cursor.fetchall()
-    cursor.close()
-    conexion.close()
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('inicio'))
+           
+        # Obtener todos los números de emergencia
+        numeros = Datos(conexion).emergencias.todas()
    
     return render_template('admin_emergencia.html',
                          numeros=numeros,
@@ -590,27 +1329,18 @@ def agregar_emergencia():
         categoria = request.form['categoria']
         badge = request.form.get('badge', '')
        
-        conexion = obtener_conexion()
-        if conexion is None:
-            flash('Error de conexión a la base de datos', 'error')
-            return redirect(url_for('admin_emergencia'))
-           
-        cursor = conexion.cursor()
-       
-        try:
-            cursor.execute('''
-                INSERT INTO numeros_emergencia (nombre, numero, descripcion, icono, categoria, badge)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            ''', (nombre, numero, descripcion, icono, categoria, badge))
-           
-            conexion.commit()
-            flash('Número de emergencia agregado correctamente', 'success')
-           
-        except Exception as e:
-            flash('Error al agregar el número de emergencia', 'error')
-       
-        cursor.close()
-        conexion.close()
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                flash('Error de conexión a la base de datos', 'error')
+                return redirect(url_for('admin_emergencia'))
+               
+            try:
+                Datos(conexion).emergencias.agregar(nombre, numero, descripcion, icono, categoria, badge)
+                confirmar_cambio(conexion, 'numeros_emergencia')
+                flash('Número de emergencia agregado correctamente', 'success')
+               
+            except Exception as e:
+                flash('Error al agregar el número de emergencia', 'error')
         return redirect(url_for('admin_emergencia'))
    
     return render_template('agregar_emergencia.html', username=session['username'])
@@ -621,43 +1351,33 @@ def editar_emergencia(numero_id):
         flash('No tienes permisos para realizar esta acción', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('admin_emergencia'))
-       
-    cursor = conexion.cursor(dictionary=True)
-   
-    if request.method == 'POST':
-        nombre = request.form['nombre']
-        numero = request.form['numero']
-        descripcion = request.form['descripcion']
-        icono = request.form['icono']
-        categoria = request.form['categoria']
-        badge = request.form.get('badge', '')
-        activo = request.form.get('activo', 0)
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('admin_emergencia'))
+           
+        datos = Datos(conexion)
        
-        try:
-            cursor.execute('''
-                UPDATE numeros_emergencia
-                SET nombre = %s, numero = %s, descripcion = %s, icono = %s, categoria = %s, badge = %s, activo = %s
-                WHERE id = %s
-            ''', (nombre, numero, descripcion, icono, categoria, badge, activo, numero_id))
+        if request.method == 'POST':
+            nombre = request.form['nombre']
+            numero = request.form['numero']
+            descripcion = request.form['descripcion']
+            icono = request.form['icono']
+            categoria = request.form['categoria']
+            badge = request.form.get('badge', '')
+            activo = request.form.get('activo', 0)
            
-            conexion.commit()
-            flash('Número de emergencia actualizado correctamente', 'success')
+            try:
+                datos.emergencias.actualizar(numero_id, nombre, numero, descripcion, icono, categoria, badge, activo)
+                confirmar_cambio(conexion, 'numeros_emergencia')
+                flash('Número de emergencia actualizado correctamente', 'success')
+               
+            except Exception as e:
+                flash('Error al actualizar el número de emergencia', 'error')
            
-        except Exception as e:
-            flash('Error al actualizar el número de emergencia', 'error')
+            return redirect(url_for('admin_emergencia'))
        
-        cursor.close()
-        conexion.close()
-        return redirect(url_for('admin_emergencia'))
-   
-    cursor.execute('SELECT * FROM numeros_emergencia WHERE id = %s', (numero_id,))
-    numero_emergencia = cursor.fetchone()
-    cursor.close()
-    conexion.close()
+        numero_emergencia = datos.emergencias.por_id(numero_id)
    
     if not numero_emergencia:
         flash('Número de emergencia no encontrado', 'error')
@@ -673,37 +1393,23 @@ def eliminar_emergencia(numero_id):
         flash('No tienes permisos para realizar esta acción', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('admin_emergencia'))
-       
-    cursor = conexion.cursor()
-   
-    try:
-        cursor.execute('DELETE FROM numeros_emergencia WHERE id = %s', (numero_id,))
-        conexion.commit()
-        flash('Número de emergencia eliminado correctamente', 'success')
-    except Exception as e:
-        flash('Error al eliminar el número de emergencia', 'error')
-   
-    cursor.close()
-    conexion.close()
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('admin_emergencia'))
+           
+        try:
+            Datos(conexion).emergencias.eliminar(numero_id)
+            confirmar_cambio(conexion, 'numeros_emergencia')
+            flash('Número de emergencia eliminado correctamente', 'success')
+        except Exception as e:
+            flash('Error al eliminar el número de emergencia', 'error')
     return redirect(url_for('admin_emergencia'))
 
 # Ruta para obtener números de emergencia (API)
 @app.route('/api/emergencia')
 def get_emergencia():
-    conexion = obtener_conexion()
-    if conexion is None:
-        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
-        
-    cursor = conexion.cursor(dictionary=True)
-    cursor.execute('SELECT * FROM numeros_emergencia WHERE activo = TRUE ORDER BY categoria, nombre')
-    numeros = cursor.fetchall()
-    cursor.close()
-    conexion.close()
-    return jsonify(numeros)
+    return respuesta_catalogo('numeros_emergencia')
 
 @app.route('/logout')
 def logout():
@@ -721,18 +1427,13 @@ def admin_consejos():
         flash('No tienes permisos para acceder a esta sección', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('inicio'))
-       
-    cursor = conexion.cursor(dictionary=True)
-    
-    # Obtener todos los consejos
-    cursor.execute('SELECT * FROM consejos_clima ORDER BY fecha_creacion DESC')
-    consejos = cursor.fetchall()
-    cursor.close()
-    conexion.close()
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('inicio'))
+           
+        # Obtener todos los consejos
+        consejos = Datos(conexion).consejos.todos()
    
     return render_template('admin_consejos.html',
                          consejos=consejos,
@@ -750,27 +1451,18 @@ def agregar_consejo():
         icono = request.form['icono']
         etiquetas = request.form.get('etiquetas', '')
        
-        conexion = obtener_conexion()
-        if conexion is None:
-            flash('Error de conexión a la base de datos', 'error')
-            return redirect(url_for('admin_consejos'))
-           
-        cursor = conexion.cursor()
-       
-        try:
-            cursor.execute('''
-                INSERT INTO consejos_clima (titulo, descripcion, icono, etiquetas)
-                VALUES (%s, %s, %s, %s)
-            ''', (titulo, descripcion, icono, etiquetas))
-           
-            conexion.commit()
-            flash('Consejo agregado correctamente', 'success')
-           
-        except Exception as e:
-            flash('Error al agregar el consejo', 'error')
-       
-        cursor.close()
-        conexion.close()
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                flash('Error de conexión a la base de datos', 'error')
+                return redirect(url_for('admin_consejos'))
+               
+            try:
+                Datos(conexion).consejos.agregar(titulo, descripcion, icono, etiquetas)
+                confirmar_cambio(conexion, 'consejos_clima')
+                flash('Consejo agregado correctamente', 'success')
+               
+            except Exception as e:
+                flash('Error al agregar el consejo', 'error')
         return redirect(url_for('admin_consejos'))
    
     return render_template('agregar_consejo.html', username=session['username'])
@@ -781,41 +1473,31 @@ def editar_consejo(consejo_id):
         flash('No tienes permisos para realizar esta acción', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('admin_consejos'))
-       
-    cursor = conexion.cursor(dictionary=True)
-   
-    if request.method == 'POST':
-        titulo = request.form['titulo']
-        descripcion = request.form['descripcion']
-        icono = request.form['icono']
-        etiquetas = request.form.get('etiquetas', '')
-        activo = request.form.get('activo', 0)
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('admin_consejos'))
+           
+        datos = Datos(conexion)
        
-        try:
-            cursor.execute('''
-                UPDATE consejos_clima
-                SET titulo = %s, descripcion = %s, icono = %s, etiquetas = %s, activo = %s
-                WHERE id = %s
-            ''', (titulo, descripcion, icono, etiquetas, activo, consejo_id))
+        if request.method == 'POST':
+            titulo = request.form['titulo']
+            descripcion = request.form['descripcion']
+            icono = request.form['icono']
+            etiquetas = request.form.get('etiquetas', '')
+            activo = request.form.get('activo', 0)
            
-            conexion.commit()
-            flash('Consejo actualizado correctamente', 'success')
+            try:
+                datos.consejos.actualizar(consejo_id, titulo, descripcion, icono, etiquetas, activo)
+                confirmar_cambio(conexion, 'consejos_clima')
+                flash('Consejo actualizado correctamente', 'success')
+               
+            except Exception as e:
+                flash('Error al actualizar el consejo', 'error')
            
-        except Exception as e:
-            flash('Error al actualizar el consejo', 'error')
+            return redirect(url_for('admin_consejos'))
        
-        cursor.close()
-        conexion.close()
-        return redirect(url_for('admin_consejos'))
-   
-    cursor.execute('SELECT * FROM consejos_clima WHERE id = %s', (consejo_id,))
-    consejo = cursor.fetchone()
-    cursor.close()
-    conexion.close()
+        consejo = datos.consejos.por_id(consejo_id)
    
     if not consejo:
         flash('Consejo no encontrado', 'error')
@@ -831,37 +1513,23 @@ def eliminar_consejo(consejo_id):
         flash('No tienes permisos para realizar esta acción', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('admin_consejos'))
-       
-    cursor = conexion.cursor()
-   
-    try:
-        cursor.execute('DELETE FROM consejos_clima WHERE id = %s', (consejo_id,))
-        conexion.commit()
-        flash('Consejo eliminado correctamente', 'success')
-    except Exception as e:
-        flash('Error al eliminar el consejo', 'error')
-   
-    cursor.close()
-    conexion.close()
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('admin_consejos'))
+           
+        try:
+            Datos(conexion).consejos.eliminar(consejo_id)
+            confirmar_cambio(conexion, 'consejos_clima')
+            flash('Consejo eliminado correctamente', 'success')
+        except Exception as e:
+            flash('Error al eliminar el consejo', 'error')
     return redirect(url_for('admin_consejos'))
 
 # Ruta para obtener consejos (API)
 @app.route('/api/consejos')
 def get_consejos():
-    conexion = obtener_conexion()
-    if conexion is None:
-        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
-        
-    cursor = conexion.cursor(dictionary=True)
-    cursor.execute('SELECT * FROM consejos_clima WHERE activo = TRUE ORDER BY fecha_creacion DESC')
-    consejos = cursor.fetchall()
-    cursor.close()
-    conexion.close()
-    return jsonify(consejos)
+    return respuesta_catalogo('consejos_clima')
 
 @app.route('/admin/frases')
 def admin_frases():
@@ -869,21 +1537,21 @@ def admin_frases():
         flash('No tienes permisos para acceder a esta sección', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('inicio'))
-       
-    cursor = conexion.cursor(dictionary=True)
-    
-    # Obtener todas las frases
-    cursor.execute('SELECT * FROM frases_dia ORDER BY fecha_publicacion DESC')
-    frases = cursor.fetchall()
-    cursor.close()
-    conexion.close()
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('inicio'))
+           
+        datos = Datos(conexion)
+        
+        # Obtener todas las frases
+        frases = datos.frases.todas()
+        actual = consultar_frase_dia(datos)
    
     return render_template('admin_frases.html',
                          frases=frases,
+                         frase_actual_id=actual.get('id') if actual else None,
+                         ahora=time.time(),
                          username=session['username'])
 
 @app.route('/admin/frases/agregar', methods=['GET', 'POST'])
@@ -895,35 +1563,42 @@ def agregar_frase():
     if request.method == 'POST':
         frase = request.form['frase']
         autor = request.form.get('autor', '')
+        vigencia_horas = request.form.get('vigencia_horas', FRASE_VIGENCIA_HORAS, type=float)
+        if vigencia_horas <= 0:
+            vigencia_horas = FRASE_VIGENCIA_HORAS
+        inicio_horas = request.form.get('inicio_horas', 0, type=float)
+        publica = int(time.time() + max(inicio_horas, 0) * 3600)
        
-        conexion = obtener_conexion()
-        if conexion is None:
-            flash('Error de conexión a la base de datos', 'error')
-            return redirect(url_for('admin_frases'))
-           
-        cursor = conexion.cursor()
-       
-        try:
-            # Desactivar frases anteriores
-            cursor.execute('UPDATE frases_dia SET activa = FALSE')
-            
-            # Insertar nueva frase activa
-            cursor.execute('''
-                INSERT INTO frases_dia (frase, autor, activa)
-                VALUES (%s, %s, TRUE)
-            ''', (frase, autor))
-           
-            conexion.commit()
-            flash('Frase del día agregada correctamente', 'success')
+        with obtener_conexion() as conexion:
+            if conexion is None:
+                flash('Error de conexión a la base de datos', 'error')
+                return redirect(url_for('admin_frases'))
+               
+            datos = Datos(conexion)
            
-        except Exception as e:
-            flash('Error al agregar la frase', 'error')
-       
-        cursor.close()
-        conexion.close()
+            try:
+                if request.form.get('en_cola'):
+                    # En cola: empieza cuando termina la última frase programada
+                    fin_de_la_cola = datos.frases.fin_de_la_cola()
+                    if fin_de_la_cola:
+                        publica = max(publica, fin_de_la_cola)
+                expira = int(publica + vigencia_horas * 3600)
+                
+                # Un solo INSERT: la más reciente reemplaza a la anterior al publicarse
+                datos.frases.agregar(frase, autor, publica, expira)
+                confirmar_cambio(conexion, 'frases_dia')
+                if publica > time.time():
+                    flash('Frase del día programada correctamente', 'success')
+                else:
+                    flash('Frase del día agregada correctamente', 'success')
+               
+            except Exception as e:
+                flash('Error al agregar la frase', 'error')
         return redirect(url_for('admin_frases'))
    
-    return render_template('agregar_frase.html', username=session['username'])
+    return render_template('agregar_frase.html',
+                         vigencia_horas=FRASE_VIGENCIA_HORAS,
+                         username=session['username'])
 
 @app.route('/admin/frases/eliminar/<int:frase_id>')
 def eliminar_frase(frase_id):
@@ -931,85 +1606,76 @@ def eliminar_frase(frase_id):
         flash('No tienes permisos para realizar esta acción', 'error')
         return redirect(url_for('inicio'))
    
-    conexion = obtener_conexion()
-    if conexion is None:
-        flash('Error de conexión a la base de datos', 'error')
-        return redirect(url_for('admin_frases'))
-       
-    cursor = conexion.cursor()
-   
-    try:
-        cursor.execute('DELETE FROM frases_dia WHERE id = %s', (frase_id,))
-        conexion.commit()
-        flash('Frase eliminada correctamente', 'success')
-    except Exception as e:
-        flash('Error al eliminar la frase', 'error')
-   
-    cursor.close()
-    conexion.close()
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            flash('Error de conexión a la base de datos', 'error')
+            return redirect(url_for('admin_frases'))
+           
+        try:
+            Datos(conexion).frases.eliminar(frase_id)
+            confirmar_cambio(conexion, 'frases_dia')
+            flash('Frase eliminada correctamente', 'success')
+        except Exception as e:
+            flash('Error al eliminar la frase', 'error')
     return redirect(url_for('admin_frases'))
 
 # Ruta para obtener la frase activa del día (API)
 @app.route('/api/frase_dia')
 def get_frase_dia():
-    conexion = obtener_conexion()
-    if conexion is None:
+    return respuesta_catalogo('frases_dia')
+
+# Todo lo que necesita clima.html en una sola petición (API)
+@app.route('/api/bootstrap')
+def get_bootstrap():
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autorizado'}), 401
+   
+    # Lo que no esté en caché se lee con la misma conexión y transacción
+    catalogo = leer_catalogo('numeros_emergencia', 'consejos_clima', 'frases_dia')
+    if catalogo is None:
         return jsonify({'error': 'Error de conexión a la base de datos'}), 500
-        
-    cursor = conexion.cursor(dictionary=True)
     
-    # Obtener la frase activa más reciente
-    cursor.execute('''
-        SELECT * FROM frases_dia 
-        WHERE activa = TRUE 
-        ORDER BY fecha_publicacion DESC 
-        LIMIT 1
-    ''')
-    frase = cursor.fetchone()
-    cursor.close()
-    conexion.close()
-    
-    return jsonify(frase if frase else {})
+    return jsonify({
+        'emergencia': catalogo['numeros_emergencia'][0],
+        'consejos': catalogo['consejos_clima'][0],
+        'frase_dia': catalogo['frases_dia'][0],
+        'weather': clima_actual()[0]
+    })
 
 
-def limpiar_frases_antiguas():
-    """Desactiva frases con más de 12 horas"""
-    conexion = obtener_conexion()
-    if conexion is None:
-        return
+# Archivado opcional: la API ya ignora las frases vencidas, esto solo
+# marca como inactivas las viejas para que no se acumulen como activas
+FRASES_ARCHIVADO = os.environ.get('FRASES_ARCHIVADO', '0') == '1'
+FRASES_ARCHIVADO_LOTE = int(os.environ.get('FRASES_ARCHIVADO_LOTE', 500))
+FRASES_ARCHIVADO_INTERVALO = int(os.environ.get('FRASES_ARCHIVADO_INTERVALO', 3600))
+
+def archivar_frases_vencidas(lote=FRASES_ARCHIVADO_LOTE):
+    """Desactiva por lotes las frases vencidas; devuelve cuántas archivó"""
+    total = 0
+    with obtener_conexion() as conexion:
+        if conexion is None:
+            return 0
+            
+        datos = Datos(conexion)
         
-    cursor = conexion.cursor()
-    
-    try:
-        cursor.execute('''
-            UPDATE frases_dia 
-            SET activa = FALSE 
-            WHERE fecha_publicacion < NOW() - INTERVAL '12 hours'
-            AND activa = TRUE
-        ''')
-        conexion.commit()
-    except Exception as e:
-        print(f"Error limpiando frases antiguas: {e}")
-    finally:
-        cursor.close()
-        conexion.close()
+        try:
+            while True:
+                archivadas = datos.frases.archivar_vencidas(int(time.time()), lote)
+                # Un commit por lote para no bloquear la tabla mucho tiempo
+                datos.commit()
+                total += archivadas
+                if archivadas < lote:
+                    break
+        except Exception as e:
+            print(f"Error archivando frases vencidas: {e}")
+    return total
 
-def programar_limpieza():
-    """Programa la limpieza cada hora"""
-    schedule.every().hour.do(limpiar_frases_antiguas)
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(3600)  # Esperar 1 hora
+if FRASES_ARCHIVADO:
+    planificador.registrar('archivar_frases', archivar_frases_vencidas, FRASES_ARCHIVADO_INTERVALO)
 
-# Iniciar hilo de limpieza al arrancar la aplicación
 if __name__ == '__main__':
     # Ejecutar inicialización del sistema
     inicializar_sistema()
     
-    # Iniciar hilo para limpieza automática
-    limpieza_thread = Thread(target=programar_limpieza, daemon=True)
-    limpieza_thread.start()
-    
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
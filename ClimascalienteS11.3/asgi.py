@@ -0,0 +1,535 @@
+"""Modo asíncrono (ASGI) para las rutas de API que solo esperan red o base de datos.
+
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn -c gunicorn.conf.py asgi:aplicacion
+
+/api/weather, /api/weather/stream, /api/bootstrap, /api/emergencia,
+/api/consejos y /api/frase_dia se atienden en el event loop. El catálogo
+y el clima salen de las mismas cachés que usa Flask; lo que falte se lee
+con asyncpg (un pool por proceso y por réplica) y OpenWeatherMap se
+consulta con httpx.AsyncClient (keep-alive). Así un proceso sostiene
+cientos de peticiones en espera sin ocupar un hilo por cada una.
+
+Los encabezados (ETag, Last-Modified, Cache-Control y el 304) los arman
+las mismas funciones de app.py, con una petición de Flask construida a
+partir del scope ASGI. Todo lo demás (páginas, login, administración)
+pasa a Flask por a2wsgi, en un pool de hilos.
+
+Con MySQL (desarrollo) no hay driver asíncrono: lo que falte del
+catálogo se lee con el código síncrono en un hilo.
+"""
+import asyncio
+import io
+import itertools
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+import httpx
+from a2wsgi import WSGIMiddleware
+
+import app
+import servicio_clima
+from repositorio import PREPARAR, EMERGENCIAS_ACTIVAS, CONSEJOS_ACTIVOS, FRASE_PUBLICADA, FRASE_SIGUIENTE
+
+# Conexiones máximas de cada pool asyncpg (por proceso)
+ASYNC_DB_POOL_MAX = int(os.environ.get('ASYNC_DB_POOL_MAX', 10))
+# Hilos para las rutas que siguen en Flask
+ASGI_HILOS_FLASK = int(os.environ.get('ASGI_HILOS_FLASK', 16))
+
+flask_asgi = WSGIMiddleware(app.app, workers=ASGI_HILOS_FLASK)
+
+# Estado de cada proceso: se crea al arrancar el worker (después del fork)
+_primaria = None
+_replicas = []
+_http = None
+_refresco_clima = None
+_iniciado = None
+_tareas = set()
+_turno_replicas = itertools.count()
+
+
+# ----------------------------------------------------
+# ARRANQUE Y CIERRE
+# ----------------------------------------------------
+async def _crear_pool(config):
+    return await asyncpg.create_pool(
+        host=config['host'], port=config['port'], user=config['user'],
+        password=config['password'], database=config['database'],
+        timeout=config['connect_timeout'],
+        # Sin conexiones al arrancar: una base de datos caída no impide iniciar el worker
+        min_size=0, max_size=ASYNC_DB_POOL_MAX,
+        max_inactive_connection_lifetime=app.POOL_CONFIG['max_edad'],
+        # asyncpg prepara cada consulta; DB_PREPARED=0 lo evita (pgbouncer en modo transacción)
+        statement_cache_size=100 if PREPARAR else 0)
+
+
+def _en_fondo(corrutina):
+    tarea = asyncio.ensure_future(corrutina)
+    _tareas.add(tarea)
+    tarea.add_done_callback(_tareas.discard)
+
+
+async def iniciar():
+    global _primaria, _replicas, _http, _refresco_clima
+    if app.POSTGRES_CONFIG:
+        _primaria = await _crear_pool(app.POSTGRES_CONFIG)
+        _replicas = [(nombre, await _crear_pool(config))
+                     for nombre, config in zip(app.REPLICAS, app.REPLICAS_CONFIG)]
+
+    # Mismos timeouts, reintentos y límite en vuelo que el cliente síncrono
+    cliente = servicio_clima.cliente
+    _http = httpx.AsyncClient(
+        timeout=httpx.Timeout(cliente.timeout_lectura, connect=cliente.timeout_conexion,
+                              pool=servicio_clima.PRESUPUESTO),
+        transport=httpx.AsyncHTTPTransport(
+            retries=cliente.reintentos,
+            limits=httpx.Limits(max_connections=cliente.max_en_vuelo,
+                                max_keepalive_connections=cliente.max_en_vuelo)))
+    _refresco_clima = asyncio.Lock()
+
+    # Migraciones, planificador, revisión de versiones y LISTEN/NOTIFY: lo que
+    # Flask arranca en su primer request (las lecturas del caché ya no consultan versiones)
+    await asyncio.to_thread(app.iniciar_tareas_de_fondo)
+    print(f"✓ Modo ASGI listo (pid {os.getpid()})")
+
+
+async def _asegurar_inicio():
+    global _iniciado
+    if _iniciado is None:
+        _iniciado = asyncio.ensure_future(iniciar())
+    await asyncio.shield(_iniciado)
+
+
+async def detener():
+    for tarea in list(_tareas):
+        tarea.cancel()
+    if _http is not None:
+        await _http.aclose()
+    for pool in [_primaria] + [pool for _, pool in _replicas]:
+        if pool is not None:
+            await pool.close()
+    await asyncio.to_thread(app.cerrar_worker)
+
+
+async def _ciclo_de_vida(receive, send):
+    while True:
+        mensaje = await receive()
+        if mensaje['type'] == 'lifespan.startup':
+            try:
+                await _asegurar_inicio()
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensaje['type'] == 'lifespan.shutdown':
+            await detener()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+# ----------------------------------------------------
+# BASE DE DATOS
+# ----------------------------------------------------
+@asynccontextmanager
+async def conexion(lectura=False, primaria=False):
+    """Conexión asyncpg: réplica por turnos si es lectura, si no (o si fallan) la primaria.
+
+    Entrega None si ninguna está disponible. Usa el mismo estado de salud
+    (backoff) que los pools síncronos.
+    """
+    candidatos = []
+    if lectura and _replicas:
+        if primaria:
+            app.lecturas['primaria_sesion'] += 1
+        else:
+            inicio = next(_turno_replicas)
+            candidatos = [_replicas[(inicio + paso) % len(_replicas)] for paso in range(len(_replicas))]
+    candidatos.append(('postgresql', _primaria))
+
+    elegido = None
+    for nombre, pool in candidatos:
+        salud = app.salud_backends[nombre]
+        if not salud.permitir():
+            continue
+        try:
+            con = await pool.acquire(timeout=app.POOL_CONFIG['espera_maxima'])
+        except asyncio.TimeoutError:
+            # Pool lleno (o conexión que no responde): se prueba el siguiente
+            print(f"⚠ Pool asíncrono {nombre} sin conexiones libres")
+            salud.cancelar_prueba()
+            continue
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            salud.registrar_fallo(e)
+            continue
+        salud.registrar_exito()
+        elegido = (nombre, pool, con)
+        break
+
+    if elegido is None:
+        yield None
+        return
+    nombre, pool, con = elegido
+    if lectura and _replicas and not primaria:
+        app.lecturas['replica' if nombre != 'postgresql' else 'primaria_sin_replica'] += 1
+    try:
+        yield con
+    finally:
+        await pool.release(con)
+
+
+async def _filas(con, consulta, *parametros):
+    return [dict(fila) for fila in await con.fetch(consulta.sql_numerado, *parametros)]
+
+
+async def _frase_dia(con):
+    ahora = int(time.time())
+    frases = await _filas(con, FRASE_PUBLICADA, ahora)
+    siguientes = await _filas(con, FRASE_SIGUIENTE, ahora)
+    return app.armar_frase_dia(frases[0] if frases else None,
+                               siguientes[0]['publica'] if siguientes else None, ahora)
+
+
+# Las mismas consultas de app.CONSULTAS_CATALOGO, con asyncpg
+LECTURAS_CATALOGO = {
+    'numeros_emergencia': lambda con: _filas(con, EMERGENCIAS_ACTIVAS),
+    'consejos_clima': lambda con: _filas(con, CONSEJOS_ACTIVOS),
+    'frases_dia': _frase_dia,
+}
+
+
+async def _leer_tablas(con, tablas):
+    leidas = {}
+    for tabla in tablas:
+        leidas[tabla] = await LECTURAS_CATALOGO[tabla](con) or {}
+    return leidas
+
+
+async def _replica_atrasada(con, versiones):
+    esperadas = {tabla: version for tabla, version in versiones.items() if version is not None}
+    if not esperadas:
+        return False
+    en_conexion = {fila['tabla']: fila['version']
+                   for fila in await con.fetch('SELECT tabla, version FROM versiones_catalogo')}
+    return any(en_conexion.get(tabla, 0) < version for tabla, version in esperadas.items())
+
+
+async def leer_catalogo(*tablas, primaria=False):
+    """app.leer_catalogo() sin bloquear el event loop"""
+    resultado = {}
+    faltantes = []
+    for tabla in tablas:
+        en_cache = app.cache_catalogo.obtener(tabla)
+        if en_cache is not None:
+            resultado[tabla] = en_cache
+        else:
+            faltantes.append(tabla)
+    if not faltantes:
+        return resultado
+    if _primaria is None:
+        return await asyncio.to_thread(app.leer_catalogo, *tablas)
+
+    versiones = {tabla: app.cache_catalogo.version(tabla) for tabla in faltantes}
+    leidas = None
+    async with conexion(lectura=True, primaria=primaria) as con:
+        if con is None:
+            return None
+        if not _replicas or not await _replica_atrasada(con, versiones):
+            leidas = await _leer_tablas(con, faltantes)
+    if leidas is None:
+        app.lecturas['replica_atrasada'] += 1
+        async with conexion() as con:
+            if con is None:
+                return None
+            leidas = await _leer_tablas(con, faltantes)
+    app.guardar_leidas(leidas, versiones, resultado)
+    return resultado
+
+
+# ----------------------------------------------------
+# CLIMA
+# ----------------------------------------------------
+def _guardar_clima(weather_data):
+    # Archivo temporal, rename y flock: se corre en un hilo, no en el event loop
+    app.snapshot_clima.guardar(weather_data)
+    app.cache_clima.guardar(app.CLAVE_CLIMA, weather_data)
+
+
+def _clima_vigente():
+    # Lee el archivo de la caché: se corre en un hilo, no en el event loop
+    lectura = app.cache_clima.leer(app.CLAVE_CLIMA)
+    if lectura is not None and time.time() - lectura[1] < app.cache_clima.ttl:
+        return lectura[0]
+    return None
+
+
+def _clima_en_cache():
+    """(weather_data, guardado) de la caché o None; lee archivos y la base de datos, va en un hilo"""
+    if app.toca_traer_publicado(app.CLAVE_CLIMA):
+        # El planificador corre en otro servidor: su lectura está en la base de datos
+        app.traer_publicado(app.CLAVE_CLIMA)
+    weather_data = app.cache_clima.obtener(app.CLAVE_CLIMA, None)
+    if not weather_data:
+        return None
+    return app._lectura_en_cache(weather_data)
+
+
+async def consejos_vigentes():
+    """app.consejos_vigentes() sin bloquear el event loop"""
+    version = app.cache_catalogo.version('consejos_clima')
+    return version, await leer_catalogo('consejos_clima')
+
+
+async def alerta_al_dia(weather_data, guardado):
+    """app.alerta_al_dia(); el catálogo solo se lee si cambiaron los consejos"""
+    consejos = None
+    if app.alerta_desactualizada(app.CLAVE_CLIMA, weather_data, guardado):
+        consejos = await consejos_vigentes()
+    return app.alerta_al_dia(app.CLAVE_CLIMA, weather_data, guardado, consejos)
+
+
+async def actualizar_clima():
+    """Consulta OpenWeatherMap una sola vez por proceso aunque lo pidan muchas peticiones"""
+    async with _refresco_clima:
+        vigente = await asyncio.to_thread(_clima_vigente)
+        if vigente is not None:
+            return vigente
+        weather_data = await servicio_clima.consultar_openweather_async(_http, app.GLOBAL_API_KEY)
+        if weather_data:
+            weather_data = app.con_alerta(weather_data, await consejos_vigentes())
+            await asyncio.to_thread(_guardar_clima, weather_data)
+            # El historial lo guarda el hilo del historial, sin que la petición espere
+            app.registrar_en_fondo({app.CIUDAD_PREDETERMINADA: weather_data})
+        return weather_data
+
+
+async def clima_actual():
+    """app.clima_actual() con la consulta al API en el event loop"""
+    calcular = app.WEATHER_POLLER_INTERVALO <= 0
+    # Las lecturas de la caché (archivos con flock) también van en un hilo
+    en_cache = await asyncio.to_thread(_clima_en_cache)
+    if en_cache:
+        weather_data, guardado = en_cache
+        edad = time.time() - guardado if guardado is not None else None
+        if calcular and edad is not None and edad >= app.cache_clima.ttl and not _refresco_clima.locked():
+            # Vencida pero aún servible: se refresca sin que esta petición espere
+            _en_fondo(actualizar_clima())
+        return await alerta_al_dia(weather_data, guardado)
+
+    if calcular:
+        weather_data = await actualizar_clima()
+        if weather_data:
+            return await alerta_al_dia(*await asyncio.to_thread(app._lectura_en_cache, weather_data))
+
+    ultima_lectura = await asyncio.to_thread(app.snapshot_clima.leer)
+    if ultima_lectura:
+        weather_data, guardado = await alerta_al_dia(*ultima_lectura)
+        return dict(weather_data, stale=True, age_seconds=int(time.time() - guardado)), guardado
+
+    if not calcular:
+        weather_data = await actualizar_clima()
+        if weather_data:
+            return await alerta_al_dia(*await asyncio.to_thread(app._lectura_en_cache, weather_data))
+
+    return await alerta_al_dia(dict(app.CLIMA_EJEMPLO, city_id=app.CIUDAD_PREDETERMINADA), None)
+
+
+async def clima_ciudad(ciudad_id):
+    """clima_actual() para cualquier ciudad de la región"""
+    if ciudad_id == app.CIUDAD_PREDETERMINADA:
+        return await clima_actual()
+    # Caché por ciudad y consultas agrupadas a /group: el código síncrono, en un hilo
+    return await asyncio.to_thread(app.clima_actual, ciudad_id)
+
+
+# ----------------------------------------------------
+# PETICIONES Y RESPUESTAS
+# ----------------------------------------------------
+def _peticion(scope):
+    """Petición de Flask (solo encabezados) a partir del scope ASGI"""
+    servidor = scope.get('server') or ('localhost', 80)
+    entorno = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+    for nombre, valor in scope['headers']:
+        nombre = nombre.decode('latin-1').upper().replace('-', '_')
+        if nombre not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            nombre = 'HTTP_' + nombre
+        valor = valor.decode('latin-1')
+        if nombre in entorno:
+            valor = entorno[nombre] + ('; ' if nombre == 'HTTP_COOKIE' else ',') + valor
+        entorno[nombre] = valor
+    return app.app.request_class(entorno)
+
+
+def _sesion(peticion):
+    return app.app.session_interface.open_session(app.app, peticion) or {}
+
+
+def _leer_de_primaria(sesion):
+    # Misma lectura propia que app._leer_de_primaria()
+    return sesion.get('primaria_hasta', 0) > time.time()
+
+
+def _json(datos, estado=200):
+    respuesta = app.app.json.response(datos)
+    respuesta.status_code = estado
+    return respuesta
+
+
+async def _enviar(send, respuesta, peticion):
+    await send({
+        'type': 'http.response.start',
+        'status': respuesta.status_code,
+        'headers': [(nombre.lower().encode('latin-1'), valor.encode('latin-1'))
+                    for nombre, valor in respuesta.headers.items()],
+    })
+    # get_app_iter omite el cuerpo en HEAD y en 304
+    await send({'type': 'http.response.body', 'body': b''.join(respuesta.get_app_iter(peticion.environ))})
+
+
+# ----------------------------------------------------
+# RUTAS
+# ----------------------------------------------------
+def _ruta_catalogo(tabla):
+    async def ruta(peticion, receive, send):
+        catalogo = await leer_catalogo(tabla, primaria=_leer_de_primaria(_sesion(peticion)))
+        if catalogo is None:
+            respuesta = _json({'error': 'Error de conexión a la base de datos'}, 500)
+        else:
+            respuesta = app.respuesta_catalogo(tabla, peticion, catalogo)
+        await _enviar(send, respuesta, peticion)
+    return ruta
+
+
+async def api_weather(peticion, receive, send):
+    if 'user_id' not in _sesion(peticion):
+        await _enviar(send, _json({'error': 'No autorizado'}, 401), peticion)
+        return
+
+    ciudad, distancia, error = app.ciudad_de_peticion(peticion.args)
+    if error:
+        await _enviar(send, _json({'error': error[0]}, error[1]), peticion)
+        return
+
+    weather_data, guardado = await clima_ciudad(ciudad['id'])
+    if distancia is not None:
+        weather_data = dict(weather_data, distance_km=round(distancia, 1))
+    respuesta = _json(weather_data)
+    respuesta.vary.add('Cookie')
+    respuesta = app.respuesta_condicional(respuesta, modificado=guardado,
+                                          cache_control=f'private, max-age={app.WEATHER_MAX_AGE}',
+                                          peticion=peticion)
+    await _enviar(send, respuesta, peticion)
+
+
+async def api_bootstrap(peticion, receive, send):
+    sesion = _sesion(peticion)
+    if 'user_id' not in sesion:
+        await _enviar(send, _json({'error': 'No autorizado'}, 401), peticion)
+        return
+
+    catalogo = await leer_catalogo('numeros_emergencia', 'consejos_clima', 'frases_dia',
+                                   primaria=_leer_de_primaria(sesion))
+    if catalogo is None:
+        await _enviar(send, _json({'error': 'Error de conexión a la base de datos'}, 500), peticion)
+        return
+
+    weather_data, _ = await clima_actual()
+    await _enviar(send, _json({
+        'emergencia': catalogo['numeros_emergencia'][0],
+        'consejos': catalogo['consejos_clima'][0],
+        'frase_dia': catalogo['frases_dia'][0],
+        'weather': weather_data
+    }), peticion)
+
+
+async def api_weather_stream(peticion, receive, send):
+    """SSE sin un hilo por cliente: cada conexión es una corrutina que duerme"""
+    if 'user_id' not in _sesion(peticion):
+        await _enviar(send, _json({'error': 'No autorizado'}, 401), peticion)
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no')],
+    })
+    mensajes = app.difusor_clima.suscribir_async(peticion.headers.get('Last-Event-ID'))
+
+    async def transmitir():
+        async for mensaje in mensajes:
+            await send({'type': 'http.response.body', 'body': mensaje.encode('utf-8'), 'more_body': True})
+
+    async def vigilar():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    # Lo que termine primero (el cliente se fue o falló el envío) cancela lo otro
+    tareas = {asyncio.ensure_future(transmitir()), asyncio.ensure_future(vigilar())}
+    try:
+        await asyncio.wait(tareas, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        await mensajes.aclose()
+
+
+RUTAS = {
+    '/api/weather': api_weather,
+    '/api/weather/stream': api_weather_stream,
+    '/api/bootstrap': api_bootstrap,
+    '/api/emergencia': _ruta_catalogo('numeros_emergencia'),
+    '/api/consejos': _ruta_catalogo('consejos_clima'),
+    '/api/frase_dia': _ruta_catalogo('frases_dia'),
+}
+
+
+async def aplicacion(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _ciclo_de_vida(receive, send)
+        return
+
+    ruta = None
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+        ruta = RUTAS.get(scope['path'])
+    if ruta is None:
+        await flask_asgi(scope, receive, send)
+        return
+
+    await _asegurar_inicio()
+    peticion = _peticion(scope)
+    estado = {'iniciada': False, 'terminada': False}
+
+    async def enviar(mensaje):
+        if mensaje['type'] == 'http.response.start':
+            estado['iniciada'] = True
+        elif not mensaje.get('more_body', False):
+            estado['terminada'] = True
+        await send(mensaje)
+
+    try:
+        await ruta(peticion, receive, enviar)
+    except Exception as e:
+        print(f"Error en {scope['path']}: {e}")
+        if not estado['iniciada']:
+            await _enviar(send, _json({'error': 'Error interno del servidor'}, 500), peticion)
+        elif not estado['terminada']:
+            # Los encabezados ya salieron (p. ej. SSE): solo se cierra el cuerpo
+            try:
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            except Exception:
+                pass
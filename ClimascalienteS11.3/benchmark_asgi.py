@@ -0,0 +1,85 @@
+"""Benchmark: rutas de API en modo ASGI (asgi.py) contra Flask síncrono.
+
+Levanta un solo worker de cada servidor con gunicorn.conf.py y usa el
+mismo OpenWeatherMap falso y los mismos clientes de benchmark_servidor.py,
+pero solo contra las rutas de API que asgi.py atiende en el event loop:
+
+- normal: catálogo y clima en caché
+- api_lenta: la caché del clima vence cada segundo y sin refresco en
+  segundo plano
+- sse: además hay CLIENTES_SSE conexiones a /api/weather/stream
+
+Uso: python benchmark_asgi.py [segundos] [clientes] [servidor ...]
+Servidores: gthread, gevent (app:app) y uvicorn (asgi:aplicacion).
+Resultados de referencia en BENCHMARK_SERVIDOR.md.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import app
+from benchmark_servidor import (ESCENARIOS, RETRASO, OpenWeatherFalso, abrir_sse, cookie_de_sesion,
+                                levantar, medir, percentil)
+
+RUTAS = ['/api/emergencia', '/api/consejos', '/api/frase_dia', '/api/bootstrap', '/api/weather']
+CLIENTES_SSE = int(os.environ.get('BENCHMARK_CLIENTES_SSE', 100))
+
+SERVIDORES = {
+    'gthread': 'app:app',
+    'gevent': 'app:app',
+    'uvicorn': 'asgi:aplicacion',
+}
+
+
+if __name__ == '__main__':
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    servidores = sys.argv[3:] or list(SERVIDORES)
+
+    if not app.migrar_base_de_datos():
+        print("❌ No se pudo conectar o migrar la base de datos")
+        sys.exit(2)
+
+    api = ThreadingHTTPServer(('127.0.0.1', 0), OpenWeatherFalso)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    url_api = f'http://127.0.0.1:{api.server_address[1]}/data/2.5/weather'
+    cookies = cookie_de_sesion()
+    os.environ['WEB_CONCURRENCY'] = os.environ.get('WEB_CONCURRENCY', '1')
+    # Sin reciclaje: cerraría a mitad de la medición las conexiones keep-alive de todos los clientes
+    os.environ['GUNICORN_MAX_REQUESTS'] = '0'
+
+    print(f"{clientes} clientes | {CLIENTES_SSE} SSE en el escenario sse | {segundos:.0f} s por escenario | "
+          f"API falsa con {RETRASO:.1f} s de retraso\n")
+    print(f"{'servidor':<8} {'escenario':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+
+    for servidor in servidores:
+        for escenario, variables in ESCENARIOS.items():
+            with tempfile.TemporaryFile() as registro:
+                try:
+                    proceso, base = levantar(servidor, variables, url_api, registro, SERVIDORES[servidor])
+                except RuntimeError as e:
+                    registro.seek(0)
+                    print(f"❌ {e}\n{registro.read().decode(errors='replace')[-2000:]}")
+                    break
+                detener = threading.Event()
+                try:
+                    # Calentar: conexiones de los pools y cachés llenas
+                    medir(base, cookies, 1, clientes, RUTAS)
+                    if escenario == 'sse':
+                        for _ in range(CLIENTES_SSE):
+                            threading.Thread(target=abrir_sse, args=(base, cookies, detener), daemon=True).start()
+                        time.sleep(2)
+                    latencias, errores = medir(base, cookies, segundos, clientes, RUTAS)
+                finally:
+                    detener.set()
+                    proceso.terminate()
+                    proceso.wait(timeout=60)
+
+            todas = sorted(valor for valores in latencias.values() for valor in valores)
+            mediana = statistics.median(todas) if todas else 0.0
+            print(f"{servidor:<8} {escenario:<10} {len(todas) / segundos:8.1f} {mediana:8.1f} "
+                  f"{percentil(todas, 0.95):8.1f} {percentil(todas, 0.99):8.1f} {errores:8d}")
@@ -0,0 +1,167 @@
+"""Benchmark: inicios de sesión por segundo verificando contraseñas.
+
+Compara la verificación en el hilo de la petición (antes) con el pool de
+procesos de servicio_hash (después), con varios hilos simulando las
+peticiones concurrentes de un worker.
+
+Con `gevent` levanta gunicorn con gunicorn.conf.py (un worker gevent) y
+compara PASSWORD_HASH_PROCESOS=0 con el pool de procesos: logins por
+segundo contra /login y latencia de /api/weather mientras tanto (con el
+hash en el worker, el event loop de gevent se detiene en cada login).
+Usa la base de datos configurada (DATABASE_URL o DB_*).
+
+Uso: python benchmark_hash.py [segundos] [hilos] [procesos]
+     python benchmark_hash.py gevent [segundos] [clientes] [procesos]
+"""
+import os
+import sys
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from servicio_hash import ServicioHash, ServicioSaturado
+
+METODO = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def medir(nombre, verificar, segundos, hilos):
+    password_hash = generate_password_hash('123456', method=METODO)
+    contadores = {'ok': 0, 'saturado': 0}
+    lock = threading.Lock()
+    limite = time.monotonic() + segundos
+
+    def cliente():
+        while time.monotonic() < limite:
+            try:
+                verificar(password_hash, '123456')
+                resultado = 'ok'
+            except ServicioSaturado:
+                resultado = 'saturado'
+            with lock:
+                contadores[resultado] += 1
+
+    inicio_cpu = time.process_time()
+    inicio = time.monotonic()
+    trabajadores = [threading.Thread(target=cliente) for _ in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    duracion = time.monotonic() - inicio
+
+    por_segundo = contadores['ok'] / duracion
+    print(f"{nombre:<28} {por_segundo:8.1f} logins/s  "
+          f"503: {contadores['saturado']:<5} CPU en este proceso: {time.process_time() - inicio_cpu:.1f}s")
+    return por_segundo
+
+
+def medir_en_gunicorn(procesos, segundos, clientes, url_api):
+    """(logins/s, 503, p50 y p95 ms de /api/weather) con un worker gevent"""
+    import requests
+    import benchmark_servidor
+
+    variables = {'PASSWORD_HASH_PROCESOS': str(procesos), 'PASSWORD_HASH_METHOD': METODO,
+                 'GUNICORN_MAX_REQUESTS': '0'}
+    cookies = benchmark_servidor.cookie_de_sesion()
+    contadores = {'ok': 0, 'saturado': 0, 'error': 0}
+    latencias = []
+    lock = threading.Lock()
+    with open(os.devnull, 'wb') as registro:
+        proceso, base = benchmark_servidor.levantar('gevent', variables, url_api, registro)
+        try:
+            # Primer request del worker y arranque de los procesos de hash
+            requests.post(base + '/login', data={'username': 'benchmarkhash', 'password': '123456'},
+                          allow_redirects=False, timeout=30)
+            requests.get(base + '/api/weather', cookies=cookies, timeout=30)
+            limite = time.monotonic() + segundos
+
+            def login():
+                sesion = requests.Session()
+                while time.monotonic() < limite:
+                    try:
+                        respuesta = sesion.post(base + '/login', allow_redirects=False, timeout=30,
+                                                data={'username': 'benchmarkhash', 'password': '123456'})
+                        resultado = {302: 'ok', 503: 'saturado'}.get(respuesta.status_code, 'error')
+                    except requests.exceptions.RequestException:
+                        resultado = 'error'
+                    sesion.cookies.clear()
+                    with lock:
+                        contadores[resultado] += 1
+
+            def clima():
+                sesion = requests.Session()
+                sesion.cookies.update(cookies)
+                while time.monotonic() < limite:
+                    inicio = time.perf_counter()
+                    sesion.get(base + '/api/weather', timeout=30)
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    time.sleep(0.05)
+
+            trabajadores = [threading.Thread(target=login) for _ in range(clientes)]
+            trabajadores.append(threading.Thread(target=clima))
+            for trabajador in trabajadores:
+                trabajador.start()
+            for trabajador in trabajadores:
+                trabajador.join()
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=60)
+
+    latencias.sort()
+    return (contadores['ok'] / segundos, contadores['saturado'] + contadores['error'],
+            benchmark_servidor.percentil(latencias, 0.5), benchmark_servidor.percentil(latencias, 0.95))
+
+
+def comparar_en_gunicorn(segundos, clientes, procesos):
+    from http.server import ThreadingHTTPServer
+    import app
+    import benchmark_servidor
+    from repositorio import Datos
+
+    if not app.migrar_base_de_datos():
+        print("❌ No se pudo conectar o migrar la base de datos")
+        sys.exit(2)
+    with app.obtener_conexion() as conexion:
+        datos = Datos(conexion)
+        usuario = datos.usuarios.por_username('benchmarkhash')
+        password_hash = generate_password_hash('123456', method=METODO)
+        if usuario is None:
+            datos.usuarios.agregar('benchmarkhash', 'benchmarkhash@example.com', password_hash, 'user')
+        elif usuario['password'].split('$', 1)[0] != password_hash.split('$', 1)[0]:
+            # Con otro método cada login mediría también el rehash
+            datos.usuarios.cambiar_hash(usuario['id'], password_hash, usuario['password'])
+        datos.commit()
+
+    benchmark_servidor.RETRASO = 0
+    os.environ['WEB_CONCURRENCY'] = '1'
+    api = ThreadingHTTPServer(('127.0.0.1', 0), benchmark_servidor.OpenWeatherFalso)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    url_api = f'http://127.0.0.1:{api.server_address[1]}/data/2.5/weather'
+
+    print(f"gunicorn gevent, 1 worker | método: {METODO} | {clientes} clientes de /login | {segundos:.0f} s\n")
+    print(f"{'hash':<22} {'logins/s':>9} {'503/err':>8} {'clima p50':>10} {'clima p95':>10}")
+    for nombre, cantidad in (('en el worker', 0), (f'{procesos} procesos (spawn)', procesos)):
+        por_segundo, rechazos, p50, p95 = medir_en_gunicorn(cantidad, segundos, clientes, url_api)
+        print(f"{nombre:<22} {por_segundo:9.1f} {rechazos:8d} {p50:8.1f}ms {p95:8.1f}ms")
+
+
+if __name__ == '__main__' and sys.argv[1:2] == ['gevent']:
+    comparar_en_gunicorn(float(sys.argv[2]) if len(sys.argv) > 2 else 10,
+                         int(sys.argv[3]) if len(sys.argv) > 3 else 8,
+                         int(sys.argv[4]) if len(sys.argv) > 4 else 2)
+elif __name__ == '__main__':
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    procesos = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+    nucleos = os.cpu_count() or 1
+
+    print(f"Método: {METODO} | núcleos: {nucleos} | hilos: {hilos} | procesos de hash: {procesos}\n")
+    antes = medir('antes (en el hilo)', check_password_hash, segundos, hilos)
+
+    servicio = ServicioHash(metodo=METODO, procesos=procesos, max_pendientes=procesos * 2)
+    servicio.verificar(generate_password_hash('x', method=METODO), 'x')  # Arranque de los procesos
+    despues = medir('después (pool de procesos)', servicio.verificar, segundos, hilos)
+
+    print(f"\nPor núcleo: antes {antes / nucleos:.1f} logins/s, después {despues / nucleos:.1f} logins/s")
+    print(servicio.estadisticas())
@@ -0,0 +1,92 @@
+"""Benchmark: latencia por consulta del SQL ad hoc contra repositorio.py.
+
+Con una misma conexión del pool ejecuta las consultas más frecuentes de
+tres formas:
+
+- ad hoc: cursor nuevo, SELECT * y parámetros interpolados en el cliente
+  (como estaban escritas en las rutas de app.py)
+- repositorio sin preparar (DB_PREPARED=0)
+- repositorio con sentencias preparadas en el servidor
+
+Usa la base de datos configurada (DATABASE_URL o DB_*).
+
+Uso: python benchmark_repositorio.py [repeticiones]
+"""
+import statistics
+import sys
+import time
+
+import psycopg2.extras
+
+import app
+from repositorio import Datos
+
+# (nombre, sql ad hoc, parámetros, llamada al repositorio)
+CONSULTAS = [
+    ('login por username', 'SELECT * FROM usuarios WHERE username = %s', ('admin',),
+     lambda datos: datos.usuarios.por_username('admin')),
+    ('usuario por id', 'SELECT * FROM usuarios WHERE id = %s', (1,),
+     lambda datos: datos.usuarios.por_id(1)),
+    ('emergencias activas',
+     'SELECT * FROM numeros_emergencia WHERE activo = TRUE ORDER BY categoria, nombre', (),
+     lambda datos: datos.emergencias.activas()),
+    ('consejos activos',
+     'SELECT * FROM consejos_clima WHERE activo = TRUE ORDER BY fecha_creacion DESC', (),
+     lambda datos: datos.consejos.activos()),
+    ('frase publicada',
+     'SELECT * FROM frases_dia WHERE publica <= %s ORDER BY publica DESC, id DESC LIMIT 1', (2 ** 40,),
+     lambda datos: datos.frases.publicada(2 ** 40)),
+    ('dashboard: primera página',
+     'SELECT id, username, email, rol, fecha_registro FROM usuarios ORDER BY id DESC LIMIT %s', (26,),
+     lambda datos: datos.usuarios.pagina('', None, None, 25)),
+]
+
+
+def ad_hoc(conexion, sql, parametros):
+    if app.es_postgresql(conexion):
+        cursor = conexion.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    else:
+        cursor = conexion.cursor(dictionary=True)
+    cursor.execute(sql, parametros)
+    filas = cursor.fetchall()
+    cursor.close()
+    return filas
+
+
+def medir(funcion, repeticiones):
+    """Latencias en microsegundos (se descartan las primeras para calentar)"""
+    for _ in range(min(20, repeticiones)):
+        funcion()
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append((time.perf_counter() - inicio) * 1e6)
+    latencias.sort()
+    return statistics.mean(latencias), latencias[int(len(latencias) * 0.95) - 1]
+
+
+if __name__ == '__main__':
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    if not app.migrar_base_de_datos():
+        print("❌ No se pudo conectar o migrar la base de datos")
+        sys.exit(2)
+
+    with app.obtener_conexion() as conexion:
+        backend = 'PostgreSQL' if app.es_postgresql(conexion) else 'MySQL'
+        print(f"{backend} | {repeticiones} repeticiones por consulta | µs promedio / p95\n")
+        print(f"{'consulta':<28} {'ad hoc':>16} {'sin preparar':>16} {'preparada':>16}")
+
+        sin_preparar = Datos(conexion, preparar=False)
+        preparada = Datos(conexion, preparar=True)
+        for nombre, sql, parametros, llamar in CONSULTAS:
+            resultados = [
+                medir(lambda: ad_hoc(conexion, sql, parametros), repeticiones),
+                medir(lambda: llamar(sin_preparar), repeticiones),
+                medir(lambda: llamar(preparada), repeticiones),
+            ]
+            columnas = ' '.join(f'{promedio:8.1f} /{p95:6.1f}' for promedio, p95 in resultados)
+            mejora = (1 - resultados[2][0] / resultados[0][0]) * 100
+            print(f"{nombre:<28} {columnas}   {mejora:+.0f}%")
+            conexion.rollback()
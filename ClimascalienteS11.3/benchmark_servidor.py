@@ -0,0 +1,194 @@
+"""Benchmark: peticiones por segundo de las rutas principales con cada
+clase de worker de gunicorn (gunicorn.conf.py).
+
+Para cada clase levanta gunicorn con la configuración de producción y un
+OpenWeatherMap falso local que tarda RETRASO segundos en responder. Cada
+escenario corre CLIENTES hilos con keep-alive durante SEGUNDOS:
+
+- normal: catálogo y clima en caché
+- api_lenta: la caché del clima vence cada segundo y sin refresco en
+  segundo plano, así que algunas peticiones esperan al API
+- sse: además hay clientes con /api/weather/stream abierto
+
+Usa la base de datos configurada (DATABASE_URL o DB_*) y WEB_CONCURRENCY
+(2 por defecto). Resultados de referencia en BENCHMARK_SERVIDOR.md.
+
+Uso: python benchmark_servidor.py [segundos] [clientes] [clase ...]
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import app
+
+RUTAS = ['/', '/api/emergencia', '/api/frase_dia', '/api/bootstrap', '/api/weather']
+RETRASO = float(os.environ.get('BENCHMARK_RETRASO_API', 1))
+CLIENTES_SSE = int(os.environ.get('BENCHMARK_CLIENTES_SSE', 20))
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+ESCENARIOS = {
+    'normal': {},
+    'api_lenta': {'WEATHER_POLLER_INTERVALO': '0', 'WEATHER_CACHE_TTL': '1', 'WEATHER_CACHE_STALE': '0'},
+    'sse': {},
+}
+
+
+class OpenWeatherFalso(BaseHTTPRequestHandler):
+    """Responde como OpenWeatherMap para Aguascalientes, con retraso"""
+
+    # Conexiones keep-alive, como el API real
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(RETRASO)
+        cuerpo = json.dumps({
+            'name': 'Aguascalientes',
+            'sys': {'country': 'MX'},
+            'main': {'temp': 27.4, 'feels_like': 28.1, 'humidity': 30, 'pressure': 1017},
+            'wind': {'speed': 3.2},
+            'weather': [{'description': 'cielo claro', 'icon': '01d'}],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def cookie_de_sesion():
+    # Sesión firmada con la misma SECRET_KEY que usará gunicorn
+    serializador = app.app.session_interface.get_signing_serializer(app.app)
+    return {app.app.config['SESSION_COOKIE_NAME']:
+            serializador.dumps({'user_id': 1, 'username': 'benchmark', 'rol': 'user'})}
+
+
+def levantar(clase, variables, url_api, registro, aplicacion='app:app'):
+    puerto = puerto_libre()
+    entorno = dict(os.environ, GUNICORN_WORKER_CLASS=clase, WEATHER_API_URL=url_api,
+                   WEB_CONCURRENCY=os.environ.get('WEB_CONCURRENCY', '2'), **variables)
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{puerto}', aplicacion],
+        cwd=DIRECTORIO, env=entorno, stdout=registro, stderr=subprocess.STDOUT)
+    base = f'http://127.0.0.1:{puerto}'
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            requests.get(base + '/', timeout=2)
+            return proceso, base
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError(f'gunicorn ({clase}) no respondió')
+
+
+def abrir_sse(base, cookies, detener):
+    try:
+        with requests.get(base + '/api/weather/stream', cookies=cookies, stream=True, timeout=(5, 60)) as respuesta:
+            for _ in respuesta.iter_lines(chunk_size=1):
+                if detener.is_set():
+                    return
+    except requests.exceptions.RequestException:
+        pass
+
+
+def medir(base, cookies, segundos, clientes, rutas=RUTAS):
+    latencias = {ruta: [] for ruta in rutas}
+    errores = [0]
+    lock = threading.Lock()
+    limite = time.monotonic() + segundos
+
+    def cliente(numero):
+        sesion = requests.Session()
+        sesion.cookies.update(cookies)
+        paso = numero
+        while time.monotonic() < limite:
+            ruta = rutas[paso % len(rutas)]
+            paso += 1
+            inicio = time.perf_counter()
+            try:
+                ok = sesion.get(base + ruta, timeout=10).status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            duracion = (time.perf_counter() - inicio) * 1000
+            with lock:
+                if ok:
+                    latencias[ruta].append(duracion)
+                else:
+                    errores[0] += 1
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return latencias, errores[0]
+
+
+def percentil(valores, p):
+    return valores[min(int(len(valores) * p), len(valores) - 1)] if valores else 0.0
+
+
+if __name__ == '__main__':
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    clases = sys.argv[3:] or ['sync', 'gthread', 'gevent']
+
+    if not app.migrar_base_de_datos():
+        print("❌ No se pudo conectar o migrar la base de datos")
+        sys.exit(2)
+
+    api = ThreadingHTTPServer(('127.0.0.1', 0), OpenWeatherFalso)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    url_api = f'http://127.0.0.1:{api.server_address[1]}/data/2.5/weather'
+    cookies = cookie_de_sesion()
+
+    print(f"{clientes} clientes | {segundos:.0f} s por escenario | API falsa con {RETRASO:.1f} s de retraso\n")
+    print(f"{'clase':<8} {'escenario':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+
+    for clase in clases:
+        for escenario, variables in ESCENARIOS.items():
+            with tempfile.TemporaryFile() as registro:
+                try:
+                    proceso, base = levantar(clase, variables, url_api, registro)
+                except RuntimeError as e:
+                    registro.seek(0)
+                    print(f"❌ {e}\n{registro.read().decode(errors='replace')[-2000:]}")
+                    break
+                detener = threading.Event()
+                try:
+                    # Calentar: primera petición de cada worker y cachés llenas
+                    medir(base, cookies, 1, clientes)
+                    if escenario == 'sse':
+                        for _ in range(CLIENTES_SSE):
+                            threading.Thread(target=abrir_sse, args=(base, cookies, detener), daemon=True).start()
+                        time.sleep(1)
+                    latencias, errores = medir(base, cookies, segundos, clientes)
+                finally:
+                    detener.set()
+                    proceso.terminate()
+                    proceso.wait(timeout=60)
+
+            todas = sorted(valor for valores in latencias.values() for valor in valores)
+            por_segundo = len(todas) / segundos
+            mediana = statistics.median(todas) if todas else 0.0
+            print(f"{clase:<8} {escenario:<10} {por_segundo:8.1f} {mediana:8.1f} "
+                  f"{percentil(todas, 0.95):8.1f} {percentil(todas, 0.99):8.1f} {errores:8d}")
@@ -0,0 +1,193 @@
+"""Caché en memoria del contenido público (emergencias, consejos, frases).
+
+Cada tabla tiene un número de versión en la base de datos que las rutas
+de administración incrementan en la misma transacción del cambio. Cada
+proceso guarda la respuesta ya serializada junto con la versión con la
+que se leyó y solo vuelve a consultar la tabla cuando esa versión cambia.
+
+Para enterarse de los cambios hechos por otros workers:
+- En PostgreSQL un hilo escucha LISTEN/NOTIFY e invalida al instante.
+- En MySQL (o si el hilo no está disponible) se revisa la tabla de
+  versiones como máximo cada `intervalo_revision` segundos.
+
+La revisión corre en un hilo propio de cada proceso (iniciar_revision()),
+así que una petición nunca espera la consulta de versiones. Sin ese hilo
+(scripts, benchmarks) la revisión se hace al leer.
+"""
+import os
+import select
+import threading
+import time
+
+
+class CacheCatalogo:
+    """Respuestas serializadas por tabla, válidas mientras no cambie su versión"""
+
+    def __init__(self, leer_versiones, intervalo_revision=5, ttl=300):
+        # leer_versiones() -> {tabla: (version, actualizado)} o None si no hay base de datos
+        self._leer_versiones = leer_versiones
+        self.intervalo_revision = intervalo_revision
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._versiones = {}
+        self._modificado = {}
+        self._revisado = 0.0
+        self.escucha = None
+        self.revisar_al_leer = True
+        self._revision_pid = None
+        self.contadores = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0, 'revisiones': 0}
+
+    def _revisar_versiones(self):
+        if self.revisar_al_leer:
+            self.revisar_versiones()
+
+    def revisar_versiones(self):
+        """Lee la tabla de versiones si ya pasó el intervalo de revisión"""
+        escuchando = self.escucha is not None and self.escucha.activa()
+        # Con LISTEN/NOTIFY activo la revisión periódica es solo un respaldo
+        intervalo = self.intervalo_revision * 12 if escuchando else self.intervalo_revision
+        if time.monotonic() - self._revisado < intervalo:
+            return
+        self._revisado = time.monotonic()
+        versiones = self._leer_versiones()
+        if versiones is None:
+            return
+        with self._lock:
+            self.contadores['revisiones'] += 1
+            for tabla, (version, actualizado) in versiones.items():
+                self._modificado[tabla] = actualizado
+                if self._versiones.get(tabla) != version:
+                    self._versiones[tabla] = version
+                    if self._entradas.pop(tabla, None) is not None:
+                        self.contadores['invalidaciones'] += 1
+
+    def iniciar_revision(self):
+        """Revisa las versiones desde un hilo en lugar de hacerlo al leer"""
+        # Un hilo por proceso; se vuelve a crear después de un fork
+        with self._lock:
+            if self._revision_pid == os.getpid():
+                return
+            self._revision_pid = os.getpid()
+        self.revisar_al_leer = False
+        threading.Thread(target=self._ciclo_revision, name='versiones-catalogo', daemon=True).start()
+
+    def _ciclo_revision(self):
+        pid = os.getpid()
+        while pid == self._revision_pid:
+            try:
+                self.revisar_versiones()
+            except Exception as e:
+                print(f"Error revisando versiones del catálogo: {e}")
+            time.sleep(1)
+
+    def version(self, tabla):
+        """Última versión conocida de la tabla (None si no se conoce)"""
+        self._revisar_versiones()
+        return self._versiones.get(tabla)
+
+    def modificado(self, tabla):
+        """Momento (epoch) del último cambio de la tabla, si se conoce"""
+        return self._modificado.get(tabla) or None
+
+    def obtener(self, tabla):
+        """Devuelve (datos, json) si hay una copia vigente, si no None"""
+        self._revisar_versiones()
+        with self._lock:
+            entrada = self._entradas.get(tabla)
+            if entrada is not None:
+                version, guardado, vence, datos, serializado = entrada
+                vigente = vence is None or time.time() < vence
+                if version == self._versiones.get(tabla) and time.monotonic() - guardado < self.ttl and vigente:
+                    self.contadores['aciertos'] += 1
+                    return datos, serializado
+                del self._entradas[tabla]
+            self.contadores['fallos'] += 1
+            return None
+
+    def guardar(self, tabla, version, datos, serializado, vence=None):
+        """Guarda una lectura hecha cuando la tabla tenía `version`.
+
+        `vence` (epoch) limita la copia cuando el contenido depende de la
+        hora, p. ej. la frase del día deja de ser válida al expirar.
+        """
+        with self._lock:
+            if version == self._versiones.get(tabla):
+                self._entradas[tabla] = (version, time.monotonic(), vence, datos, serializado)
+
+    def invalidar(self, tabla, version=None, actualizado=None):
+        with self._lock:
+            if self._entradas.pop(tabla, None) is not None:
+                self.contadores['invalidaciones'] += 1
+            if version is not None:
+                self._versiones[tabla] = version
+                self._modificado[tabla] = actualizado
+            else:
+                # Forzar que la siguiente lectura consulte las versiones
+                self._versiones.pop(tabla, None)
+                self._revisado = 0.0
+
+    def invalidar_todo(self):
+        with self._lock:
+            self._entradas.clear()
+            self._versiones.clear()
+            self._modificado.clear()
+            self._revisado = 0.0
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self.contadores)
+            datos['tablas_en_cache'] = sorted(self._entradas)
+            datos['versiones'] = dict(self._versiones)
+        datos['listen_notify'] = self.escucha is not None and self.escucha.activa()
+        return datos
+
+
+class EscuchaNotificaciones:
+    """Hilo con LISTEN en PostgreSQL que invalida el caché en cuanto otro worker escribe"""
+
+    def __init__(self, cache, conectar, canal='catalogo'):
+        self.cache = cache
+        self._conectar = conectar
+        self.canal = canal
+        self._pid = None
+        self._conectado = False
+        self._lock = threading.Lock()
+
+    def activa(self):
+        return self._conectado and self._pid == os.getpid()
+
+    def iniciar(self):
+        # Un hilo por proceso; se vuelve a crear después de un fork
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._conectado = False
+        threading.Thread(target=self._ciclo, name='listen-catalogo', daemon=True).start()
+
+    def _ciclo(self):
+        pid = os.getpid()
+        while pid == self._pid:
+            try:
+                conexion = self._conectar()
+                conexion.autocommit = True
+                cursor = conexion.cursor()
+                cursor.execute(f'LISTEN {self.canal}')
+                self._conectado = True
+                # Lo que cambió mientras no escuchábamos se detecta con la tabla de versiones
+                self.cache.invalidar_todo()
+                while pid == self._pid:
+                    if select.select([conexion], [], [], 30) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        aviso = conexion.notifies.pop(0)
+                        # Formato del aviso: tabla:version:actualizado
+                        tabla, version, actualizado = (aviso.payload.split(':') + ['', ''])[:3]
+                        self.cache.invalidar(tabla, int(version) if version else None,
+                                             int(actualizado) if actualizado else None)
+            except Exception as e:
+                print(f"Error escuchando cambios del catálogo: {e}")
+            self._conectado = False
+            time.sleep(5)
@@ -0,0 +1,239 @@
+"""Caché con TTL compartida entre los workers de gunicorn.
+
+Cada clave se guarda como un archivo JSON en un directorio local que
+reemplazamos de forma atómica, así todos los procesos del servidor ven
+el mismo valor. Incluye:
+
+- stale-while-revalidate: un valor vencido se sigue sirviendo durante
+  un tiempo mientras se recalcula en segundo plano.
+- single-flight: con un candado de archivo (flock) solo un proceso/hilo
+  calcula el valor cuando falta; los demás esperan y reutilizan el
+  resultado. La espera es un sondeo sin bloqueo con time.sleep, que con
+  gevent cede a las demás peticiones del worker (flock bloqueante no).
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo coordinamos hilos del mismo proceso
+    fcntl = None
+
+
+class _Candado:
+    """Candado exclusivo por clave, entre hilos y entre procesos"""
+
+    _locales = {}
+    _locales_lock = threading.Lock()
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with self._locales_lock:
+            self._local = self._locales.setdefault(ruta, threading.Lock())
+        self._archivo = None
+
+    def adquirir(self, bloquear=True):
+        if not self._local.acquire(blocking=bloquear):
+            return False
+        if fcntl is None:
+            return True
+        self._archivo = open(self.ruta, 'a')
+        espera = 0.005
+        while True:
+            try:
+                fcntl.flock(self._archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if not bloquear:
+                    break
+                time.sleep(espera)
+                espera = min(espera * 2, 0.1)
+            except OSError:
+                break
+        self._archivo.close()
+        self._archivo = None
+        self._local.release()
+        return False
+
+    def liberar(self):
+        if self._archivo is not None:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+            self._archivo.close()
+            self._archivo = None
+        self._local.release()
+
+
+class CacheArchivo:
+    """Caché clave -> valor JSON con TTL, compartida vía sistema de archivos"""
+
+    def __init__(self, nombre, ttl=300, ttl_obsoleto=1800, directorio=None):
+        self.nombre = nombre
+        self.ttl = ttl
+        self.ttl_obsoleto = ttl_obsoleto
+        self.directorio = directorio or os.path.join(
+            os.environ.get('CACHE_DIR', tempfile.gettempdir()), 'climas_cache', nombre)
+        os.makedirs(self.directorio, exist_ok=True)
+        # Última lectura de cada archivo para no volver a parsearlo si no cambió
+        # (inodo, mtime y tamaño: un rename nuevo cambia el inodo aunque el
+        # reloj del sistema de archivos no avance)
+        self._memoria = {}
+        self._contadores_lock = threading.Lock()
+        self.contadores = {
+            'aciertos': 0,
+            'aciertos_obsoletos': 0,
+            'fallos': 0,
+            'esperas_coalescidas': 0,
+            'recalculos_fondo': 0,
+            'errores': 0,
+        }
+
+    # ------------------------------------------------
+    # Almacenamiento
+    # ------------------------------------------------
+    def _ruta(self, clave, extension='.json'):
+        segura = re.sub(r'[^A-Za-z0-9_.-]', '_', clave)
+        return os.path.join(self.directorio, segura + extension)
+
+    def _leer(self, clave):
+        ruta = self._ruta(clave)
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            return None
+        marca = (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+        en_memoria = self._memoria.get(clave)
+        if en_memoria and en_memoria[0] == marca:
+            return en_memoria[1]
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                entrada = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+        self._memoria[clave] = (marca, entrada)
+        return entrada
+
+    def _escribir(self, clave, valor, guardado=None):
+        entrada = {'guardado': guardado or time.time(), 'valor': valor}
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as archivo:
+                json.dump(entrada, archivo, ensure_ascii=False)
+            os.replace(temporal, self._ruta(clave))
+        except BaseException:
+            # Sin dejar temporales huérfanos en el directorio de la caché
+            try:
+                os.unlink(temporal)
+            except OSError:
+                pass
+            raise
+        return entrada
+
+    def _contar(self, contador):
+        with self._contadores_lock:
+            self.contadores[contador] += 1
+
+    # ------------------------------------------------
+    # API pública
+    # ------------------------------------------------
+    def edad(self, clave):
+        """Segundos desde que se guardó el valor (None si no existe)"""
+        entrada = self._leer(clave)
+        return None if entrada is None else time.time() - entrada['guardado']
+
+    def leer(self, clave):
+        """Devuelve (valor, guardado) sin importar su antigüedad, o None"""
+        entrada = self._leer(clave)
+        return None if entrada is None else (entrada['valor'], entrada['guardado'])
+
+    def guardar(self, clave, valor):
+        """Guarda el valor y regresa el momento (epoch) con el que quedó"""
+        return self._escribir(clave, valor)['guardado']
+
+    def sembrar(self, clave, valor, guardado):
+        """Precarga un valor conservando su antigüedad real.
+
+        No reemplaza un valor más reciente que ya esté en la caché.
+        """
+        actual = self._leer(clave)
+        if actual is None or actual['guardado'] < guardado:
+            self._escribir(clave, valor, guardado)
+
+    def obtener(self, clave, calcular):
+        """Devuelve el valor en caché o lo calcula con calcular().
+
+        Si calcular() falla o devuelve None no se guarda nada y se
+        regresa None (el valor vencido ya no se considera válido).
+        Con calcular=None solo se lee: otro proceso se encarga de
+        mantener el valor al día.
+        """
+        entrada = self._leer(clave)
+        if entrada is not None:
+            edad = time.time() - entrada['guardado']
+            if edad < self.ttl:
+                self._contar('aciertos')
+                return entrada['valor']
+            if edad < self.ttl + self.ttl_obsoleto:
+                self._contar('aciertos_obsoletos')
+                if calcular is not None:
+                    self._recalcular_en_fondo(clave, calcular)
+                return entrada['valor']
+
+        self._contar('fallos')
+        if calcular is None:
+            return None
+        candado = _Candado(self._ruta(clave, '.lock'))
+        candado.adquirir()
+        try:
+            # Otro proceso pudo llenarla mientras esperábamos el candado
+            reciente = self._leer(clave)
+            if reciente is not None and time.time() - reciente['guardado'] < self.ttl:
+                self._contar('esperas_coalescidas')
+                return reciente['valor']
+            valor = self._calcular(clave, calcular)
+        finally:
+            candado.liberar()
+        return valor
+
+    def _calcular(self, clave, calcular):
+        try:
+            valor = calcular()
+        except Exception as e:
+            print(f"Error recalculando caché {self.nombre}/{clave}: {e}")
+            valor = None
+        if valor is None:
+            self._contar('errores')
+            return None
+        self._escribir(clave, valor)
+        return valor
+
+    def _recalcular_en_fondo(self, clave, calcular):
+        candado = _Candado(self._ruta(clave, '.lock'))
+        if not candado.adquirir(bloquear=False):
+            # Alguien más ya lo está recalculando
+            return
+
+        def tarea():
+            try:
+                entrada = self._leer(clave)
+                if entrada is None or time.time() - entrada['guardado'] >= self.ttl:
+                    self._contar('recalculos_fondo')
+                    self._calcular(clave, calcular)
+            finally:
+                candado.liberar()
+
+        threading.Thread(target=tarea, daemon=True).start()
+
+    def estadisticas(self):
+        with self._contadores_lock:
+            datos = dict(self.contadores)
+        consultas = datos['aciertos'] + datos['aciertos_obsoletos'] + datos['fallos']
+        datos['cache'] = self.nombre
+        datos['ttl'] = self.ttl
+        datos['ttl_obsoleto'] = self.ttl_obsoleto
+        datos['tasa_aciertos'] = round(
+            (datos['aciertos'] + datos['aciertos_obsoletos']) / consultas, 4) if consultas else 0.0
+        return datos
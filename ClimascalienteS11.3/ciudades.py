@@ -0,0 +1,124 @@
+"""Ciudades de la región y búsqueda de la más cercana a unas coordenadas.
+
+El índice es una rejilla en memoria: las coordenadas se proyectan a
+kilómetros alrededor de la latitud media de las ciudades y cada ciudad
+cae en una celda de `celda_km`. La búsqueda revisa anillos de celdas
+alrededor del punto y se detiene en cuanto ninguna celda más lejana
+puede tener una ciudad más cerca que la mejor encontrada.
+"""
+import math
+import threading
+
+RADIO_TIERRA_KM = 6371.0
+KM_POR_GRADO_LAT = 110.57
+
+# Cabeceras municipales del estado de Aguascalientes
+CIUDADES = [
+    {'id': 'aguascalientes', 'nombre': 'Aguascalientes', 'lat': 21.8853, 'lon': -102.2916},
+    {'id': 'asientos', 'nombre': 'Asientos', 'lat': 22.2383, 'lon': -102.0894},
+    {'id': 'calvillo', 'nombre': 'Calvillo', 'lat': 21.8467, 'lon': -102.7186},
+    {'id': 'cosio', 'nombre': 'Cosío', 'lat': 22.3656, 'lon': -102.3003},
+    {'id': 'el-llano', 'nombre': 'El Llano', 'lat': 21.9167, 'lon': -101.9667},
+    {'id': 'jesus-maria', 'nombre': 'Jesús María', 'lat': 21.9614, 'lon': -102.3436},
+    {'id': 'pabellon-de-arteaga', 'nombre': 'Pabellón de Arteaga', 'lat': 22.1497, 'lon': -102.2761},
+    {'id': 'rincon-de-romos', 'nombre': 'Rincón de Romos', 'lat': 22.2306, 'lon': -102.3217},
+    {'id': 'san-francisco-de-los-romo', 'nombre': 'San Francisco de los Romo', 'lat': 22.0753, 'lon': -102.2706},
+    {'id': 'san-jose-de-gracia', 'nombre': 'San José de Gracia', 'lat': 22.1500, 'lon': -102.4150},
+    {'id': 'tepezala', 'nombre': 'Tepezalá', 'lat': 22.2236, 'lon': -102.1692},
+]
+
+# La que se sirve cuando no se pide ninguna
+CIUDAD_PREDETERMINADA = 'aguascalientes'
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distancia sobre la superficie de la Tierra (haversine)"""
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    delta_fi = fi2 - fi1
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_fi / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class IndiceCiudades:
+    """Rejilla en memoria para encontrar la ciudad más cercana"""
+
+    def __init__(self, ciudades, celda_km=10):
+        self.ciudades = {ciudad['id']: ciudad for ciudad in ciudades}
+        self.celda_km = celda_km
+        latitud_media = sum(ciudad['lat'] for ciudad in ciudades) / len(ciudades)
+        self._km_por_grado_lon = 111.32 * math.cos(math.radians(latitud_media))
+        self._celdas = {}
+        for ciudad in ciudades:
+            x, y = self._proyectar(ciudad['lat'], ciudad['lon'])
+            self._celdas.setdefault(self._celda(x, y), []).append((x, y, ciudad))
+        columnas = [celda[0] for celda in self._celdas]
+        filas = [celda[1] for celda in self._celdas]
+        self._limites = (min(columnas), max(columnas), min(filas), max(filas))
+        self._lock = threading.Lock()
+        self.busquedas = 0
+        self.celdas_revisadas = 0
+
+    def _proyectar(self, lat, lon):
+        return lon * self._km_por_grado_lon, lat * KM_POR_GRADO_LAT
+
+    def _celda(self, x, y):
+        return math.floor(x / self.celda_km), math.floor(y / self.celda_km)
+
+    def _anillo(self, columna, fila, anillo):
+        # Celdas a exactamente `anillo` celdas de distancia, solo dentro de la rejilla
+        min_columna, max_columna, min_fila, max_fila = self._limites
+        if anillo == 0:
+            yield columna, fila
+            return
+        for x in range(max(columna - anillo, min_columna), min(columna + anillo, max_columna) + 1):
+            for y in (fila - anillo, fila + anillo):
+                if min_fila <= y <= max_fila:
+                    yield x, y
+        for y in range(max(fila - anillo + 1, min_fila), min(fila + anillo - 1, max_fila) + 1):
+            for x in (columna - anillo, columna + anillo):
+                if min_columna <= x <= max_columna:
+                    yield x, y
+
+    def obtener(self, ciudad_id):
+        return self.ciudades.get(ciudad_id)
+
+    def cercana(self, lat, lon):
+        """Regresa (ciudad, distancia_km) de la ciudad más cercana al punto"""
+        x, y = self._proyectar(lat, lon)
+        columna, fila = self._celda(x, y)
+        min_columna, max_columna, min_fila, max_fila = self._limites
+        # Antes del primer anillo que toca la rejilla no hay ciudades; después del último tampoco
+        primero = max(min_columna - columna, columna - max_columna, min_fila - fila, fila - max_fila, 0)
+        ultimo = max(abs(columna - min_columna), abs(columna - max_columna),
+                     abs(fila - min_fila), abs(fila - max_fila))
+
+        mejor = None
+        mejor_distancia = math.inf
+        revisadas = 0
+        for anillo in range(primero, ultimo + 1):
+            # Todo lo que esté en este anillo o más lejos queda al menos a (anillo - 1) celdas
+            if mejor is not None and (anillo - 1) * self.celda_km >= mejor_distancia:
+                break
+            for celda in self._anillo(columna, fila, anillo):
+                revisadas += 1
+                for cx, cy, ciudad in self._celdas.get(celda, ()):
+                    distancia = math.hypot(cx - x, cy - y)
+                    if distancia < mejor_distancia:
+                        mejor, mejor_distancia = ciudad, distancia
+
+        with self._lock:
+            self.busquedas += 1
+            self.celdas_revisadas += revisadas
+        return mejor, distancia_km(lat, lon, mejor['lat'], mejor['lon'])
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'ciudades': len(self.ciudades),
+                'celdas': len(self._celdas),
+                'celda_km': self.celda_km,
+                'busquedas': self.busquedas,
+                'celdas_revisadas_promedio': (
+                    round(self.celdas_revisadas / self.busquedas, 2) if self.busquedas else 0.0),
+            }
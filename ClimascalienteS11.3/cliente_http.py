@@ -0,0 +1,201 @@
+"""Cliente HTTP compartido para servicios externos (OpenWeatherMap).
+
+Una sesión de requests por proceso reutiliza las conexiones (keep-alive):
+solo la primera petición a un host paga DNS, TCP y TLS. Incluye:
+
+- timeouts separados de conexión y de lectura, recortados al presupuesto
+  de tiempo que le quede a quien llama
+- reintentos acotados con espera exponencial y variación aleatoria, solo
+  para GET (idempotente) y solo ante fallos de conexión o 502/503/504
+- un límite de peticiones en vuelo por worker: las que no consiguen lugar
+  dentro de su presupuesto fallan con ClienteSaturado
+- métricas de tiempo separando conexión (DNS + TCP + TLS) y transferencia
+  (envío, espera del servidor y lectura de la respuesta)
+
+La sesión, el semáforo y las conexiones se crean de nuevo en cada
+proceso (tras un fork los sockets heredados son del padre).
+"""
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Tiempo de conexión de la petición en curso (por hilo)
+_medicion = threading.local()
+
+REINTENTAR_ESTADOS = (502, 503, 504)
+
+
+class ClienteSaturado(requests.exceptions.RequestException):
+    """Se alcanzó el límite de peticiones en vuelo de este worker"""
+
+
+class _MideConexion:
+    """Suma al hilo actual el tiempo que tarda en abrirse cada conexión"""
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _medicion.conexion = getattr(_medicion, 'conexion', 0.0) + time.perf_counter() - inicio
+            _medicion.nuevas = getattr(_medicion, 'nuevas', 0) + 1
+
+
+class _ConexionHTTP(_MideConexion, HTTPConnection):
+    pass
+
+
+class _ConexionHTTPS(_MideConexion, HTTPSConnection):
+    pass
+
+
+class _PoolHTTP(HTTPConnectionPool):
+    ConnectionCls = _ConexionHTTP
+
+
+class _PoolHTTPS(HTTPSConnectionPool):
+    ConnectionCls = _ConexionHTTPS
+
+
+class _Adaptador(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _PoolHTTP, 'https': _PoolHTTPS}
+
+
+class ClienteHTTP:
+    """Sesión keep-alive por proceso con reintentos y límite de concurrencia"""
+
+    def __init__(self, nombre, conexiones=10, timeout_conexion=2.0, timeout_lectura=5.0,
+                 reintentos=1, espera_reintento=0.2, max_en_vuelo=6):
+        self.nombre = nombre
+        self.conexiones = conexiones
+        self.timeout_conexion = timeout_conexion
+        self.timeout_lectura = timeout_lectura
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self.max_en_vuelo = max_en_vuelo
+        self._lock = threading.Lock()
+        self._pid = None
+        self._sesion = None
+        self._cupo = None
+        self.en_vuelo = 0
+        self.contadores = {'peticiones': 0, 'reintentos': 0, 'errores': 0, 'saturadas': 0,
+                           'conexiones_nuevas': 0, 'reutilizadas': 0}
+        self.tiempo_conexion = 0.0
+        self.tiempo_transferencia = 0.0
+        self.tiempo_espera = 0.0
+
+    def _estado(self):
+        # Tras un fork la sesión, sus sockets y el semáforo son del padre
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                sesion = requests.Session()
+                adaptador = _Adaptador(pool_connections=4, pool_maxsize=self.conexiones, max_retries=0)
+                sesion.mount('https://', adaptador)
+                sesion.mount('http://', adaptador)
+                self._sesion = sesion
+                self._cupo = threading.BoundedSemaphore(self.max_en_vuelo)
+                self.en_vuelo = 0
+            return self._sesion, self._cupo
+
+    def reiniciar(self):
+        """Olvida la sesión actual (se crea otra en la siguiente petición)"""
+        with self._lock:
+            self._pid = None
+            self._sesion = None
+
+    def _contar(self, contador, cantidad=1):
+        with self._lock:
+            self.contadores[contador] += cantidad
+
+    def get(self, url, params=None, limite=None):
+        """GET con reintentos; limite es el time.monotonic() máximo para terminar.
+
+        Regresa la respuesta (cualquier código HTTP) o lanza una excepción
+        de requests si no hubo respuesta dentro del presupuesto.
+        """
+        if limite is None:
+            limite = time.monotonic() + self.timeout_conexion + self.timeout_lectura
+        sesion, cupo = self._estado()
+
+        inicio = time.monotonic()
+        if not cupo.acquire(timeout=max(limite - inicio, 0)):
+            self._contar('saturadas')
+            raise ClienteSaturado(f'{self.nombre}: {self.max_en_vuelo} peticiones en vuelo')
+        with self._lock:
+            self.en_vuelo += 1
+            self.tiempo_espera += time.monotonic() - inicio
+        try:
+            intento = 0
+            while True:
+                respuesta = None
+                try:
+                    respuesta = self._un_intento(sesion, url, params, limite)
+                    if respuesta.status_code not in REINTENTAR_ESTADOS:
+                        return respuesta
+                    error = None
+                except requests.exceptions.ConnectionError as e:
+                    # Incluye ConnectTimeout; un ReadTimeout ya gastó el presupuesto y no se repite
+                    error = e
+                # Espera exponencial con variación para no sincronizar reintentos
+                espera = self.espera_reintento * (2 ** intento) * random.uniform(0.5, 1.5)
+                if intento >= self.reintentos or time.monotonic() + espera >= limite:
+                    if error is not None:
+                        raise error
+                    return respuesta
+                intento += 1
+                self._contar('reintentos')
+                time.sleep(espera)
+        except requests.exceptions.RequestException:
+            self._contar('errores')
+            raise
+        finally:
+            with self._lock:
+                self.en_vuelo -= 1
+            cupo.release()
+
+    def _un_intento(self, sesion, url, params, limite):
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            raise requests.exceptions.ConnectTimeout(f'{self.nombre}: sin tiempo para conectar')
+        timeout = (min(self.timeout_conexion, restante), min(self.timeout_lectura, restante))
+        _medicion.conexion = 0.0
+        _medicion.nuevas = 0
+        inicio = time.perf_counter()
+        try:
+            respuesta = sesion.get(url, params=params, timeout=timeout)
+            # Leer el cuerpo aquí para que la transferencia cuente completa
+            respuesta.content
+        finally:
+            total = time.perf_counter() - inicio
+            with self._lock:
+                self.contadores['peticiones'] += 1
+                self.contadores['conexiones_nuevas'] += _medicion.nuevas
+                self.tiempo_conexion += _medicion.conexion
+                self.tiempo_transferencia += total - _medicion.conexion
+        if not _medicion.nuevas:
+            self._contar('reutilizadas')
+        return respuesta
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self.contadores)
+            nuevas = datos['conexiones_nuevas']
+            peticiones = datos['peticiones']
+            datos['en_vuelo'] = self.en_vuelo
+            datos['max_en_vuelo'] = self.max_en_vuelo
+            datos['ms_conexion_promedio'] = round(self.tiempo_conexion * 1000 / nuevas, 2) if nuevas else 0.0
+            datos['ms_transferencia_promedio'] = (
+                round(self.tiempo_transferencia * 1000 / peticiones, 2) if peticiones else 0.0)
+            datos['ms_espera_cupo_total'] = round(self.tiempo_espera * 1000, 2)
+        datos['nombre'] = self.nombre
+        datos['timeouts'] = {'conexion': self.timeout_conexion, 'lectura': self.timeout_lectura}
+        return datos
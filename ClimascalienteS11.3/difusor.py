@@ -0,0 +1,133 @@
+"""Difusión de cambios a clientes conectados con Server-Sent Events.
+
+Un solo hilo por proceso revisa el valor publicado (una lectura barata
+de la caché compartida) y despierta a todos los suscriptores cuando
+cambia; los clientes nunca generan consultas al API externo.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+_inicio_lock = threading.Lock()
+
+
+class Difusor:
+    """Reparte el valor actual a N suscriptores SSE"""
+
+    def __init__(self, nombre, obtener_actual, intervalo_revision=1.0, keepalive=15):
+        self.nombre = nombre
+        # Debe regresar (valor, marca_de_tiempo) o None
+        self._obtener_actual = obtener_actual
+        self.intervalo_revision = intervalo_revision
+        self.keepalive = keepalive
+        self._condicion = threading.Condition()
+        self._pid = None
+        self._valor = None
+        self._id = None
+        self.suscriptores = 0
+        self.eventos_enviados = 0
+
+    def _iniciar(self):
+        # Un hilo vigilante por proceso (los hilos no sobreviven a un fork)
+        if self._pid == os.getpid():
+            return
+        with _inicio_lock:
+            if self._pid == os.getpid():
+                return
+            self._condicion = threading.Condition()
+            self._pid = os.getpid()
+        self._revisar()
+        threading.Thread(target=self._vigilar, name=f'difusor-{self.nombre}', daemon=True).start()
+
+    def _revisar(self):
+        actual = self._obtener_actual()
+        if actual is None:
+            return
+        valor, marca = actual
+        # Solo se considera cambio si el contenido es distinto
+        if valor == self._valor:
+            return
+        with self._condicion:
+            self._valor = valor
+            self._id = str(int(marca * 1000))
+            self._condicion.notify_all()
+
+    def _vigilar(self):
+        pid = os.getpid()
+        while pid == self._pid:
+            time.sleep(self.intervalo_revision)
+            try:
+                self._revisar()
+            except Exception as e:
+                print(f"Error revisando {self.nombre} para difusión: {e}")
+
+    @staticmethod
+    def _evento(id_evento, valor):
+        datos = json.dumps(valor, ensure_ascii=False)
+        return f'id: {id_evento}\ndata: {datos}\n\n'
+
+    def suscribir(self, ultimo_id=None):
+        """Generador de mensajes SSE para un cliente.
+
+        Si el cliente se reconecta con Last-Event-ID y no hubo cambios, no
+        se le reenvía el valor; mientras no haya cambios se manda un
+        comentario cada `keepalive` segundos para mantener viva la conexión.
+        """
+        self._iniciar()
+        with self._condicion:
+            self.suscriptores += 1
+        try:
+            yield f'retry: {self.keepalive * 1000}\n\n'
+            enviado = ultimo_id
+            while True:
+                with self._condicion:
+                    if self._id == enviado:
+                        self._condicion.wait(self.keepalive)
+                    id_actual, valor = self._id, self._valor
+                if id_actual is not None and id_actual != enviado:
+                    enviado = id_actual
+                    self.eventos_enviados += 1
+                    yield self._evento(id_actual, valor)
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            with self._condicion:
+                self.suscriptores -= 1
+
+    async def suscribir_async(self, ultimo_id=None):
+        """Como suscribir() pero sin ocupar un hilo por cliente (modo ASGI).
+
+        Cada cliente revisa el valor publicado por el vigilante cada
+        `intervalo_revision` segundos en lugar de esperar la condición.
+        """
+        self._iniciar()
+        with self._condicion:
+            self.suscriptores += 1
+        try:
+            yield f'retry: {self.keepalive * 1000}\n\n'
+            enviado = ultimo_id
+            ultimo_envio = time.monotonic()
+            while True:
+                id_actual, valor = self._id, self._valor
+                if id_actual is not None and id_actual != enviado:
+                    enviado = id_actual
+                    ultimo_envio = time.monotonic()
+                    self.eventos_enviados += 1
+                    yield self._evento(id_actual, valor)
+                elif time.monotonic() - ultimo_envio >= self.keepalive:
+                    ultimo_envio = time.monotonic()
+                    yield ': keepalive\n\n'
+                await asyncio.sleep(self.intervalo_revision)
+        finally:
+            with self._condicion:
+                self.suscriptores -= 1
+
+    def estadisticas(self):
+        return {
+            'nombre': self.nombre,
+            'suscriptores': self.suscriptores,
+            'eventos_enviados': self.eventos_enviados,
+            'id_actual': self._id,
+        }
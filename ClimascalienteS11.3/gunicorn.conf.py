@@ -0,0 +1,93 @@
+"""Configuración de gunicorn para producción.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Modo asíncrono (rutas de API en asyncio, el resto en Flask; ver asgi.py):
+
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn -c gunicorn.conf.py asgi:aplicacion
+
+Variables de entorno:
+
+- WEB_CONCURRENCY: número de workers (por defecto 2 por CPU + 1, máximo 8)
+- GUNICORN_WORKER_CLASS: gevent (por defecto), gthread, sync o uvicorn (solo con asgi:aplicacion)
+- GUNICORN_THREADS: hilos por worker con gthread (8)
+- GUNICORN_CONEXIONES: clientes simultáneos por worker con gevent (200)
+- GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE (segundos)
+- GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER: reciclaje de workers
+- GUNICORN_PRELOAD=0: cada worker importa la aplicación por su cuenta
+
+Cada worker abre hasta DB_POOL_MAX conexiones por base de datos, así que
+WEB_CONCURRENCY × DB_POOL_MAX no debe pasar del límite del servidor. Con
+gthread cada cliente de /api/weather/stream ocupa un hilo mientras está
+conectado (clima.html abre uno por pestaña), por eso el valor por
+defecto es gevent. Con sync el stream responde 204 y la página consulta
+/api/weather cada 5 minutos.
+
+Resultados por clase de worker en BENCHMARK_SERVIDOR.md.
+"""
+import multiprocessing
+import os
+import sys
+
+
+def _cpus():
+    # Solo las CPUs que este proceso puede usar (contenedores con límite)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+if worker_class == 'uvicorn':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(_cpus() * 2 + 1, 8)))
+# Con threads > 1 gunicorn convierte sync en gthread: solo se usan con gthread
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_CONEXIONES', 200))
+
+# El clima tiene un presupuesto de 4 s; más de 30 s es un worker atorado
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Reciclar workers de vez en cuando, sin que todos se reinicien a la vez
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# La aplicación se importa una vez en el maestro y los workers la heredan
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# El latido de los workers en memoria y no en el disco del contenedor
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+
+if worker_class == 'gevent':
+    # Antes de importar la aplicación, para que sus candados, sockets e hilos
+    # sean cooperativos; psycopg2 necesita además que libpq ceda al esperar
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def _aplicacion():
+    # Con preload_app el maestro ya importó app; sin él aún no hay nada que reiniciar
+    return sys.modules.get('app')
+
+
+def post_fork(server, worker):
+    aplicacion = _aplicacion()
+    if aplicacion is not None:
+        aplicacion.reiniciar_tras_fork()
+
+
+def worker_exit(server, worker):
+    aplicacion = _aplicacion()
+    if aplicacion is not None:
+        aplicacion.cerrar_worker()
@@ -0,0 +1,34 @@
+-- Datos iniciales (solo en una base de datos nueva)
+--
+-- Los hashes ya vienen calculados para no gastar CPU al arrancar.
+-- ADMINS: admin / admin123, superuser / Super2024!, administrador / AdminAgs123
+-- USUARIOS: juanperez / JuanPassword1, mariagarcia / MariaSecure2,
+--           carloslopez / CarlosPass3, anatorres / AnaClave456, robertosmith / Robert789
+INSERT INTO usuarios (username, email, password, rol) VALUES
+('admin', 'admin@sistema.com', 'pbkdf2:sha256:600000$HpupH7dkL4QB0qdV$2f80d2e8f75c75272c27e0acb727f8345efec3d01abdc5d2f12e73aa4f16bf97', 'admin'),
+('superuser', 'super@empresa.com', 'pbkdf2:sha256:600000$NPEH5YLnBH4rS5zS$ac1640c2916a7c88134efbefb447d9a98177fb1fd38d8e36f5ed0e47f45f7dfb', 'admin'),
+('administrador', 'admin@aguascalientes.com', 'pbkdf2:sha256:600000$lpd2vtbUnyKEnxO2$27b539bbc79560e05e63153f130a96be4feb7d61f2fe1ff208b721e4ef780a71', 'admin'),
+('juanperez', 'juan@correo.com', 'pbkdf2:sha256:600000$t5ZUstwmP4JCEbAi$2f277ba2c750ed0670ea04882c2dcdeac92fadada74adf2604745cd630fd9920', 'user'),
+('mariagarcia', 'maria@correo.com', 'pbkdf2:sha256:600000$rdI0rlcPk0JhYVVi$3152af974461334efdde68eb0170f9dfbe76eaad1d556533d283f043e18ba85a', 'user'),
+('carloslopez', 'carlos@correo.com', 'pbkdf2:sha256:600000$BklUNxBTG78zKXiZ$f37f7922e587797204466174ae638959a26d14476762f8d4a5fcd0965e673297', 'user'),
+('anatorres', 'ana@correo.com', 'pbkdf2:sha256:600000$QIriMGIMvqTpUWCU$81314a6315a16953d1c6df6bd1ed7c59d6694bd7c2d00201d064b6d76d01e76a', 'user'),
+('robertosmith', 'roberto@correo.com', 'pbkdf2:sha256:600000$Xx0dHbiHjfCP77UP$be0c1b9ea1d39a0030a9038b7716ae04616f242d15f9035538d09289cd5803c8', 'user');
+
+INSERT INTO personas (nombre, email, telefono) VALUES
+('Juan Pérez', 'juan@ejemplo.com', '555-1234'),
+('María García', 'maria@ejemplo.com', '555-5678'),
+('Carlos López', 'carlos@ejemplo.com', '555-9012');
+
+INSERT INTO numeros_emergencia (nombre, numero, descripcion, icono, categoria, badge) VALUES
+('Emergencias', '911', 'Número único para emergencias de policía, bomberos y ambulancia', '🚓', 'policia', 'Urgente'),
+('Cruz Roja', '065', 'Atención médica de emergencia y servicios de ambulancia', '🏥', 'hospital', 'Médico'),
+('Bomberos', '068', 'Servicio de bomberos, rescate y emergencias por incendio', '🚒', 'bomberos', 'Incendio'),
+('Protección Civil Aguascalientes', '4499151515', 'Emergencias por fenómenos naturales y desastres', '🛡️', 'proteccion', 'Protección');
+
+INSERT INTO consejos_clima (titulo, descripcion, icono, etiquetas) VALUES
+('Hidratación Constante', 'Bebe al menos 2-3 litros de agua al día. En días calurosos aumenta el consumo para mantenerte hidratado.', '💧', 'Calor,Verano'),
+('Protector Solar', 'Aplica FPS 50+ cada 2 horas cuando estés al aire libre. No olvides orejas, cuello y empeines.', '☀️', 'Radiación,Exterior'),
+('Horarios Inteligentes', 'Evita exposición solar entre 10:00 am y 4:00 pm cuando los rayos UV son más intensos.', '⏰', 'Horario,Precaución'),
+('Vestimenta Adecuada', 'Usa ropa ligera, de colores claros y telas transpirables como algodón o lino.', '👕', 'Confort,Temperatura'),
+('Actividades al Aire Libre', 'Planifica caminatas y ejercicios en las mañanas temprano o tardes cuando la temperatura es más fresca.', '🚶‍♂️', 'Ejercicio,Horario'),
+('Protección Extra', 'Usa sombrero de ala ancha y gafas de sol con protección UV para proteger cara y ojos.', '🧢', 'Protección,Visual');
@@ -0,0 +1,4 @@
+-- Búsqueda por prefijo del dashboard
+--
+-- En MySQL la colación no distingue mayúsculas y los índices UNIQUE de
+-- username y email ya sirven para LIKE 'prefijo%': no hay nada que crear.
@@ -0,0 +1,25 @@
+-- Índices para las consultas frecuentes del catálogo público y del panel
+--
+-- MySQL no tiene índices parciales: la columna activo/activa va primero
+-- y después las columnas del ORDER BY, así no hay que ordenar en memoria.
+CREATE INDEX idx_emergencia_activos
+    ON numeros_emergencia (activo, categoria, nombre);
+
+CREATE INDEX idx_consejos_activos
+    ON consejos_clima (activo, fecha_creacion);
+
+CREATE INDEX idx_frases_activas
+    ON frases_dia (activa, fecha_publicacion);
+
+-- Listados completos del panel de administración
+CREATE INDEX idx_emergencia_categoria
+    ON numeros_emergencia (categoria, nombre);
+
+CREATE INDEX idx_consejos_fecha
+    ON consejos_clima (fecha_creacion);
+
+CREATE INDEX idx_frases_fecha
+    ON frases_dia (fecha_publicacion);
+
+-- Las búsquedas por username/email de login y registro usan los índices
+-- UNIQUE de la tabla usuarios.
@@ -0,0 +1,22 @@
+-- Vigencia explícita de las frases del día
+--
+-- expira guarda el momento (epoch, segundos) en que la frase deja de
+-- mostrarse; la app lo compara al leer, sin un proceso que las desactive.
+-- NULL = no vence.
+ALTER TABLE frases_dia ADD COLUMN expira BIGINT NULL;
+
+-- Las frases existentes vencían a las 12 horas de publicadas
+UPDATE frases_dia
+SET expira = UNIX_TIMESTAMP(fecha_publicacion) + 43200
+WHERE expira IS NULL;
+
+-- Frase vigente: recorre las activas de la más reciente a la más antigua
+-- y descarta las vencidas con el mismo índice
+DROP INDEX idx_frases_activas ON frases_dia;
+
+CREATE INDEX idx_frases_vigentes
+    ON frases_dia (activa, fecha_publicacion, expira);
+
+-- Archivado opcional de las vencidas
+CREATE INDEX idx_frases_por_vencer
+    ON frases_dia (activa, expira);
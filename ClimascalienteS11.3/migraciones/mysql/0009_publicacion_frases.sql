@@ -0,0 +1,17 @@
+-- Publicación programada de las frases del día
+--
+-- publica guarda el momento (epoch, segundos) desde el que se muestra la
+-- frase. La frase del día es la publicada más recientemente mientras no
+-- venza: publicar (o programar) una frase es un solo INSERT y no hay que
+-- desactivar las anteriores.
+ALTER TABLE frases_dia ADD COLUMN publica BIGINT NOT NULL DEFAULT 0;
+
+UPDATE frases_dia
+SET publica = UNIX_TIMESTAMP(fecha_publicacion)
+WHERE publica = 0;
+
+-- Frase actual (la última con publica <= ahora) y siguiente programada
+DROP INDEX idx_frases_vigentes ON frases_dia;
+
+CREATE INDEX idx_frases_publicacion
+    ON frases_dia (publica, id);
@@ -0,0 +1,38 @@
+-- Historial del clima: observaciones y resúmenes por hora y por día
+--
+-- clima_observaciones solo recibe INSERT (una fila por lectura nueva del
+-- API). clima_resumenes se actualiza en la misma transacción con un
+-- upsert por periodo: mínimo, máximo, suma y número de muestras, así el
+-- promedio sale de suma / muestras sin volver a leer las observaciones.
+CREATE TABLE IF NOT EXISTS clima_observaciones (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    ciudad VARCHAR(64) NOT NULL,
+    observado BIGINT NOT NULL,
+    temperatura FLOAT NOT NULL,
+    sensacion FLOAT,
+    humedad FLOAT,
+    presion FLOAT,
+    viento FLOAT,
+    descripcion VARCHAR(100)
+);
+
+CREATE INDEX idx_observaciones_ciudad
+    ON clima_observaciones (ciudad, observado);
+
+-- periodo: 'hora' o 'dia'; inicio: comienzo del periodo (segundos desde 1970)
+CREATE TABLE IF NOT EXISTS clima_resumenes (
+    ciudad VARCHAR(64) NOT NULL,
+    periodo VARCHAR(4) NOT NULL,
+    inicio BIGINT NOT NULL,
+    muestras INT NOT NULL,
+    temp_min FLOAT NOT NULL,
+    temp_max FLOAT NOT NULL,
+    temp_suma DOUBLE NOT NULL,
+    humedad_min FLOAT NOT NULL,
+    humedad_max FLOAT NOT NULL,
+    humedad_suma DOUBLE NOT NULL,
+    viento_min FLOAT NOT NULL,
+    viento_max FLOAT NOT NULL,
+    viento_suma DOUBLE NOT NULL,
+    PRIMARY KEY (ciudad, periodo, inicio)
+);
@@ -0,0 +1,11 @@
+-- Última lectura del clima publicada por el planificador
+--
+-- El proceso que tiene el candado del planificador (en cualquier
+-- servidor) guarda aquí cada lectura nueva. Los demás servidores la
+-- copian a su caché local cuando la suya vence, sin llamar al API.
+-- Una fila por clave de la caché del clima; guardado en epoch (segundos).
+CREATE TABLE IF NOT EXISTS clima_publicado (
+    clave VARCHAR(100) PRIMARY KEY,
+    datos TEXT NOT NULL,
+    guardado DOUBLE NOT NULL
+);
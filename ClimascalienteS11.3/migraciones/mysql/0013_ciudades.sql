@@ -0,0 +1,25 @@
+-- Ciudades de la región (cabeceras municipales del estado de Aguascalientes)
+--
+-- La app las lee al arrancar cada worker; ciudades.CIUDADES es la misma
+-- lista y se usa solo mientras no se ha podido leer la tabla. El id es el
+-- de la URL (?city=) y el de la caché y el historial del clima.
+CREATE TABLE IF NOT EXISTS ciudades (
+    id VARCHAR(64) PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    lat DOUBLE NOT NULL,
+    lon DOUBLE NOT NULL,
+    activa BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+INSERT IGNORE INTO ciudades (id, nombre, lat, lon) VALUES
+('aguascalientes', 'Aguascalientes', 21.8853, -102.2916),
+('asientos', 'Asientos', 22.2383, -102.0894),
+('calvillo', 'Calvillo', 21.8467, -102.7186),
+('cosio', 'Cosío', 22.3656, -102.3003),
+('el-llano', 'El Llano', 21.9167, -101.9667),
+('jesus-maria', 'Jesús María', 21.9614, -102.3436),
+('pabellon-de-arteaga', 'Pabellón de Arteaga', 22.1497, -102.2761),
+('rincon-de-romos', 'Rincón de Romos', 22.2306, -102.3217),
+('san-francisco-de-los-romo', 'San Francisco de los Romo', 22.0753, -102.2706),
+('san-jose-de-gracia', 'San José de Gracia', 22.1500, -102.4150),
+('tepezala', 'Tepezalá', 22.2236, -102.1692);
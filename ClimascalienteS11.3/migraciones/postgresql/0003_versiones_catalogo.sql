@@ -0,0 +1,15 @@
+-- Versión de cada tabla del contenido público (invalida el caché de la app)
+CREATE TABLE IF NOT EXISTS versiones_catalogo (
+    tabla VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    actualizado BIGINT NOT NULL DEFAULT 0
+);
+
+-- Bases creadas antes de que existiera la columna
+ALTER TABLE versiones_catalogo ADD COLUMN IF NOT EXISTS actualizado BIGINT NOT NULL DEFAULT 0;
+
+INSERT INTO versiones_catalogo (tabla) VALUES
+('numeros_emergencia'),
+('consejos_clima'),
+('frases_dia')
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,6 @@
+-- Búsqueda por prefijo del dashboard: lower(...) LIKE 'prefijo%'
+CREATE INDEX IF NOT EXISTS idx_usuarios_username_prefijo
+    ON usuarios (lower(username) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_usuarios_email_prefijo
+    ON usuarios (lower(email) text_pattern_ops);
@@ -0,0 +1,8 @@
+-- basededatos.text insertaba admin, usuario1, demo y superadmin con un
+-- hash de ejemplo que no corresponde a ninguna contraseña; antes se
+-- corregían en cada arranque (actualizar_contraseñas). Se hace una vez:
+-- contraseña 123456, solo si siguen teniendo el hash de ejemplo.
+UPDATE usuarios
+SET password = 'pbkdf2:sha256:600000$27oJJAEVuea5wnM1$0cd4611492b933765805d9000cf7ff5740d409532d22fc79ce274badf497e5f8'
+WHERE username IN ('admin', 'superadmin', 'demo', 'usuario1')
+AND password LIKE 'scrypt:32768:8:1$Kqk9pCFv4vJ2t0jH$%';
@@ -0,0 +1,25 @@
+-- Índices para las consultas frecuentes del catálogo público y del panel
+--
+-- Las APIs públicas solo leen filas activas: índices parciales con el
+-- mismo orden que el ORDER BY, así no hay que ordenar en memoria.
+CREATE INDEX IF NOT EXISTS idx_emergencia_activos
+    ON numeros_emergencia (categoria, nombre) WHERE activo;
+
+CREATE INDEX IF NOT EXISTS idx_consejos_activos
+    ON consejos_clima (fecha_creacion DESC) WHERE activo;
+
+CREATE INDEX IF NOT EXISTS idx_frases_activas
+    ON frases_dia (fecha_publicacion DESC) WHERE activa;
+
+-- Listados completos del panel de administración
+CREATE INDEX IF NOT EXISTS idx_emergencia_categoria
+    ON numeros_emergencia (categoria, nombre);
+
+CREATE INDEX IF NOT EXISTS idx_consejos_fecha
+    ON consejos_clima (fecha_creacion);
+
+CREATE INDEX IF NOT EXISTS idx_frases_fecha
+    ON frases_dia (fecha_publicacion);
+
+-- Las búsquedas por username/email de login y registro usan los índices
+-- UNIQUE de la tabla usuarios.
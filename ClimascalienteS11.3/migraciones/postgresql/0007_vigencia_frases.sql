@@ -0,0 +1,22 @@
+-- Vigencia explícita de las frases del día
+--
+-- expira guarda el momento (epoch, segundos) en que la frase deja de
+-- mostrarse; la app lo compara al leer, sin un proceso que las desactive.
+-- NULL = no vence.
+ALTER TABLE frases_dia ADD COLUMN IF NOT EXISTS expira BIGINT;
+
+-- Las frases existentes vencían a las 12 horas de publicadas
+UPDATE frases_dia
+SET expira = EXTRACT(EPOCH FROM fecha_publicacion::timestamptz)::BIGINT + 43200
+WHERE expira IS NULL;
+
+-- Frase vigente: recorre las activas de la más reciente a la más antigua
+-- y descarta las vencidas con el mismo índice
+DROP INDEX IF EXISTS idx_frases_activas;
+
+CREATE INDEX IF NOT EXISTS idx_frases_vigentes
+    ON frases_dia (fecha_publicacion DESC, expira) WHERE activa;
+
+-- Archivado opcional de las vencidas
+CREATE INDEX IF NOT EXISTS idx_frases_por_vencer
+    ON frases_dia (expira) WHERE activa;
@@ -0,0 +1,15 @@
+-- Registro de las tareas programadas (planificador.py)
+--
+-- Una fila por tarea: la escribe el proceso que tiene el candado del
+-- planificador y de aquí retoma la cadencia el siguiente líder.
+CREATE TABLE IF NOT EXISTS tareas_programadas (
+    nombre VARCHAR(100) PRIMARY KEY,
+    ultima_ejecucion BIGINT,
+    ultimo_exito BIGINT,
+    duracion_ms INTEGER,
+    retraso_ms INTEGER,
+    ejecuciones BIGINT NOT NULL DEFAULT 0,
+    fallos BIGINT NOT NULL DEFAULT 0,
+    ultimo_error TEXT,
+    ejecutor VARCHAR(255)
+);
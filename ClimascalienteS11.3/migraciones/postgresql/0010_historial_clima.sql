@@ -0,0 +1,38 @@
+-- Historial del clima: observaciones y resúmenes por hora y por día
+--
+-- clima_observaciones solo recibe INSERT (una fila por lectura nueva del
+-- API). clima_resumenes se actualiza en la misma transacción con un
+-- upsert por periodo: mínimo, máximo, suma y número de muestras, así el
+-- promedio sale de suma / muestras sin volver a leer las observaciones.
+CREATE TABLE IF NOT EXISTS clima_observaciones (
+    id BIGSERIAL PRIMARY KEY,
+    ciudad VARCHAR(64) NOT NULL,
+    observado BIGINT NOT NULL,
+    temperatura REAL NOT NULL,
+    sensacion REAL,
+    humedad REAL,
+    presion REAL,
+    viento REAL,
+    descripcion VARCHAR(100)
+);
+
+CREATE INDEX IF NOT EXISTS idx_observaciones_ciudad
+    ON clima_observaciones (ciudad, observado);
+
+-- periodo: 'hora' o 'dia'; inicio: comienzo del periodo (segundos desde 1970)
+CREATE TABLE IF NOT EXISTS clima_resumenes (
+    ciudad VARCHAR(64) NOT NULL,
+    periodo VARCHAR(4) NOT NULL,
+    inicio BIGINT NOT NULL,
+    muestras INTEGER NOT NULL,
+    temp_min REAL NOT NULL,
+    temp_max REAL NOT NULL,
+    temp_suma DOUBLE PRECISION NOT NULL,
+    humedad_min REAL NOT NULL,
+    humedad_max REAL NOT NULL,
+    humedad_suma DOUBLE PRECISION NOT NULL,
+    viento_min REAL NOT NULL,
+    viento_max REAL NOT NULL,
+    viento_suma DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (ciudad, periodo, inicio)
+);
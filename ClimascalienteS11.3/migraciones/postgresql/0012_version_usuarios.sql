@@ -0,0 +1,8 @@
+-- Versión de la tabla de usuarios
+--
+-- Las altas y bajas la incrementan igual que los cambios del catálogo,
+-- así cada worker sabe cuándo recalcular el total del panel de
+-- administración aunque el cambio lo haya hecho otro proceso.
+INSERT INTO versiones_catalogo (tabla) VALUES
+('usuarios')
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,168 @@
+"""Migraciones versionadas del esquema de la base de datos.
+
+Cada cambio es un archivo migraciones/<dialecto>/NNNN_descripcion.sql
+(mysql o postgresql) con el mismo número en ambos dialectos. La tabla
+schema_version guarda los números ya aplicados, así que al arrancar
+basta una consulta (MAX(version)) para saber que no hay nada pendiente.
+
+Las migraciones pendientes se aplican con un candado de la base de
+datos (pg_advisory_lock / GET_LOCK) para que solo un worker las corra.
+En PostgreSQL cada migración es una transacción; en MySQL el DDL hace
+commit implícito, así que si una migración se interrumpe, al repetirla
+se ignoran las tablas, columnas e índices que ya se habían creado.
+"""
+import os
+import re
+import time
+
+CREAR_TABLA = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        nombre VARCHAR(255) NOT NULL,
+        aplicada BIGINT NOT NULL
+    )
+'''
+
+# Identificador del candado de migraciones (pg_advisory_lock usa un entero)
+CANDADO_PG = 7240311
+CANDADO_MYSQL = 'climas_migraciones'
+
+# MySQL: la tabla, la columna o el índice ya existen (o ya se borró)
+ERRORES_YA_APLICADOS = {1050, 1060, 1061, 1091}
+
+
+def _sentencias(sql):
+    """Separa un archivo en sentencias (terminan con ; al final de la línea)"""
+    sentencias = []
+    for bloque in re.split(r';[ \t]*$', sql, flags=re.MULTILINE):
+        lineas = [linea for linea in bloque.splitlines()
+                  if linea.strip() and not linea.strip().startswith('--')]
+        if lineas:
+            sentencias.append('\n'.join(lineas))
+    return sentencias
+
+
+class Migrador:
+    """Aplica en orden las migraciones que faltan en la base de datos"""
+
+    def __init__(self, directorio, version_base=2, tabla_base='usuarios'):
+        self.directorio = directorio
+        # Una base creada con basededatos.text ya tiene el esquema y los
+        # datos iniciales: se registra hasta version_base sin ejecutarlas
+        self.version_base = version_base
+        self.tabla_base = tabla_base
+        self._archivos = {}
+
+    def archivos(self, dialecto):
+        """[(version, nombre, ruta)] ordenadas por versión"""
+        if dialecto not in self._archivos:
+            carpeta = os.path.join(self.directorio, dialecto)
+            encontrados = []
+            for nombre in os.listdir(carpeta):
+                coincidencia = re.match(r'(\d+)_.+\.sql$', nombre)
+                if coincidencia:
+                    encontrados.append((int(coincidencia.group(1)), nombre, os.path.join(carpeta, nombre)))
+            # Por número y no por nombre: 10_x.sql va después de 9_x.sql
+            self._archivos[dialecto] = sorted(encontrados)
+        return self._archivos[dialecto]
+
+    def ultima(self, dialecto):
+        archivos = self.archivos(dialecto)
+        return archivos[-1][0] if archivos else 0
+
+    def version_actual(self, conexion):
+        """Última migración aplicada (0 si la tabla schema_version no existe)"""
+        cursor = conexion.cursor()
+        try:
+            cursor.execute('SELECT MAX(version) FROM schema_version')
+            fila = cursor.fetchone()
+            return (fila[0] or 0) if fila else 0
+        except Exception:
+            conexion.rollback()
+            return 0
+        finally:
+            cursor.close()
+
+    def migrar(self, conexion, dialecto):
+        """Aplica las migraciones pendientes y devuelve sus nombres"""
+        # Camino rápido: una sola consulta si ya está al día
+        if self.version_actual(conexion) >= self.ultima(dialecto):
+            return []
+
+        cursor = conexion.cursor()
+        self._bloquear(cursor, dialecto)
+        try:
+            cursor.execute(CREAR_TABLA)
+            conexion.commit()
+            # Otro worker pudo migrar mientras esperábamos el candado
+            actual = self.version_actual(conexion)
+            if actual == 0 and self._tabla_existe(cursor, dialecto):
+                self._registrar_base(cursor, dialecto)
+                conexion.commit()
+                actual = self.version_base
+
+            aplicadas = []
+            for version, nombre, ruta in self.archivos(dialecto):
+                if version <= actual:
+                    continue
+                with open(ruta, encoding='utf-8') as archivo:
+                    sql = archivo.read()
+                try:
+                    for sentencia in _sentencias(sql):
+                        self._ejecutar(cursor, sentencia, dialecto)
+                    cursor.execute('INSERT INTO schema_version (version, nombre, aplicada) VALUES (%s, %s, %s)',
+                                   (version, nombre, int(time.time())))
+                    conexion.commit()
+                except Exception:
+                    conexion.rollback()
+                    print(f"❌ Error aplicando la migración {nombre}")
+                    raise
+                print(f"✓ Migración aplicada: {nombre}")
+                aplicadas.append(nombre)
+            return aplicadas
+        finally:
+            self._desbloquear(cursor, dialecto)
+            cursor.close()
+
+    def _ejecutar(self, cursor, sentencia, dialecto):
+        try:
+            cursor.execute(sentencia)
+        except Exception as e:
+            if dialecto == 'mysql' and getattr(e, 'errno', None) in ERRORES_YA_APLICADOS:
+                print(f"ℹ Ya aplicado, se omite: {e}")
+                return
+            raise
+
+    def _tabla_existe(self, cursor, dialecto):
+        if dialecto == 'postgresql':
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL', (self.tabla_base,))
+        else:
+            cursor.execute('''
+                SELECT COUNT(*) > 0 FROM information_schema.tables
+                WHERE table_schema = DATABASE() AND table_name = %s
+            ''', (self.tabla_base,))
+        return bool(cursor.fetchone()[0])
+
+    def _registrar_base(self, cursor, dialecto):
+        print(f"ℹ Base de datos existente: se registra el esquema hasta la versión {self.version_base}")
+        for version, nombre, _ruta in self.archivos(dialecto):
+            if version <= self.version_base:
+                cursor.execute('INSERT INTO schema_version (version, nombre, aplicada) VALUES (%s, %s, %s)',
+                               (version, nombre, int(time.time())))
+
+    def _bloquear(self, cursor, dialecto):
+        if dialecto == 'postgresql':
+            cursor.execute('SELECT pg_advisory_lock(%s)', (CANDADO_PG,))
+        else:
+            cursor.execute('SELECT GET_LOCK(%s, 60)', (CANDADO_MYSQL,))
+        cursor.fetchone()
+
+    def _desbloquear(self, cursor, dialecto):
+        try:
+            if dialecto == 'postgresql':
+                cursor.execute('SELECT pg_advisory_unlock(%s)', (CANDADO_PG,))
+            else:
+                cursor.execute('SELECT RELEASE_LOCK(%s)', (CANDADO_MYSQL,))
+            cursor.fetchone()
+        except Exception as e:
+            print(f"Error liberando el candado de migraciones: {e}")
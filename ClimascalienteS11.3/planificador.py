@@ -0,0 +1,411 @@
+"""Tareas periódicas con un solo ejecutor en todo el despliegue.
+
+Todos los workers arrancan el hilo del planificador, pero solo el que
+obtiene el candado de la base de datos (pg_try_advisory_lock / GET_LOCK)
+corre las tareas. El candado vive en una conexión dedicada: si el líder
+muere o pierde la conexión, otro worker (de este u otro servidor) lo
+toma en el siguiente reintento. Mientras otro proceso lo tenga, el
+reintento solo revisa con una conexión del pool si el candado sigue
+tomado; la conexión dedicada se abre cuando está libre.
+
+Si la base de datos no está disponible se elige un ejecutor por servidor
+con un candado de archivo (flock) para que el clima se siga refrescando;
+cuando la base de datos vuelve se usa otra vez su candado.
+
+Cada ejecución se registra en la tabla tareas_programadas (última
+ejecución, duración, fallos) y de ahí retoma la cadencia un nuevo líder.
+"""
+import os
+import socket
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin base de datos cada proceso ejecuta sus tareas
+    fcntl = None
+
+CANDADO_PG = 7240312
+CANDADO_MYSQL = 'climas_planificador'
+
+GUARDAR_PG = '''
+    INSERT INTO tareas_programadas
+        (nombre, ultima_ejecucion, ultimo_exito, duracion_ms, retraso_ms, ejecuciones, fallos, ultimo_error, ejecutor)
+    VALUES (%s, %s, %s, %s, %s, 1, %s, %s, %s)
+    ON CONFLICT (nombre) DO UPDATE SET
+        ultima_ejecucion = EXCLUDED.ultima_ejecucion,
+        ultimo_exito = COALESCE(EXCLUDED.ultimo_exito, tareas_programadas.ultimo_exito),
+        duracion_ms = EXCLUDED.duracion_ms,
+        retraso_ms = EXCLUDED.retraso_ms,
+        ejecuciones = tareas_programadas.ejecuciones + 1,
+        fallos = tareas_programadas.fallos + EXCLUDED.fallos,
+        ultimo_error = EXCLUDED.ultimo_error,
+        ejecutor = EXCLUDED.ejecutor
+'''
+
+GUARDAR_MYSQL = '''
+    INSERT INTO tareas_programadas
+        (nombre, ultima_ejecucion, ultimo_exito, duracion_ms, retraso_ms, ejecuciones, fallos, ultimo_error, ejecutor)
+    VALUES (%s, %s, %s, %s, %s, 1, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        ultima_ejecucion = VALUES(ultima_ejecucion),
+        ultimo_exito = COALESCE(VALUES(ultimo_exito), ultimo_exito),
+        duracion_ms = VALUES(duracion_ms),
+        retraso_ms = VALUES(retraso_ms),
+        ejecuciones = ejecuciones + 1,
+        fallos = fallos + VALUES(fallos),
+        ultimo_error = VALUES(ultimo_error),
+        ejecutor = VALUES(ejecutor)
+'''
+
+
+class Tarea:
+    """Una función que se ejecuta cada `intervalo` segundos con cadencia fija"""
+
+    def __init__(self, nombre, funcion, intervalo):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo = intervalo
+        self.proxima = 0.0
+        self.en_curso = False
+        self.ejecuciones = 0
+        self.fallos = 0
+        self.omitidas = 0
+        self.ultima_ejecucion = None
+        self.ultimo_exito = None
+        self.duracion = None
+        self.retraso = None
+        self.ultimo_error = None
+
+    def estado(self):
+        return {
+            'intervalo': self.intervalo,
+            'en_curso': self.en_curso,
+            'ejecuciones': self.ejecuciones,
+            'fallos': self.fallos,
+            'omitidas': self.omitidas,
+            'ultima_ejecucion': self.ultima_ejecucion,
+            'ultimo_exito': self.ultimo_exito,
+            'duracion_ms': round(self.duracion * 1000) if self.duracion is not None else None,
+            'retraso_ms': round(self.retraso * 1000) if self.retraso is not None else None,
+            'ultimo_error': self.ultimo_error,
+            'proxima': self.proxima or None,
+        }
+
+
+class Planificador:
+    """Ejecuta las tareas registradas en un solo proceso del despliegue"""
+
+    def __init__(self, conectar, obtener_conexion, es_postgresql, directorio, reintento=10, ping=30):
+        # conectar() -> conexión nueva, solo para el candado y el registro
+        self._conectar = conectar
+        # obtener_conexion() -> context manager del pool, para leer el registro
+        self._obtener_conexion = obtener_conexion
+        self._es_postgresql = es_postgresql
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._ruta_candado = os.path.join(directorio, 'planificador.lock')
+        self.reintento = reintento
+        self.ping = ping
+        self.tareas = {}
+        self.ejecutor = f'{socket.gethostname()}:{os.getpid()}'
+        self._lock = threading.Lock()
+        self._lock_conexion = threading.Lock()
+        self._pid = None
+        self._detener = threading.Event()
+        self._conexion = None
+        self._archivo = None
+        self._siguiente_intento = 0.0
+        self._ultimo_ping = 0.0
+        self._sin_base_de_datos = False
+        # 'base_de_datos', 'archivo' o None si otro proceso es el líder
+        self.modo = None
+
+    def registrar(self, nombre, funcion, intervalo):
+        self.tareas[nombre] = Tarea(nombre, funcion, intervalo)
+
+    # ------------------------------------------------
+    # Arranque (una vez por proceso)
+    # ------------------------------------------------
+    def iniciar(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Tras un fork la conexión y los candados del padre no son de este proceso
+            self._pid = os.getpid()
+            self.ejecutor = f'{socket.gethostname()}:{self._pid}'
+            self._conexion = None
+            self._archivo = None
+            self.modo = None
+            self._siguiente_intento = 0.0
+            self._detener = threading.Event()
+        if self.tareas:
+            threading.Thread(target=self._ciclo, name='planificador', daemon=True).start()
+
+    def detener(self):
+        self._detener.set()
+
+    def es_lider(self):
+        return self.modo is not None and self._pid == os.getpid()
+
+    # ------------------------------------------------
+    # Elección del ejecutor
+    # ------------------------------------------------
+    def _tomar_liderazgo(self):
+        ahora = time.monotonic()
+        if self.modo == 'base_de_datos':
+            if ahora - self._ultimo_ping < self.ping or self._sigue_conectado():
+                return True
+            print("⚠ El planificador perdió la conexión del candado")
+            self._soltar_conexion()
+
+        if ahora < self._siguiente_intento:
+            return self.modo is not None
+        self._siguiente_intento = ahora + self.reintento
+
+        if self._candado_libre() is False:
+            # Otro proceso del despliegue tiene el candado
+            self._soltar_archivo()
+            self.modo = None
+            return False
+
+        try:
+            conexion = self._conectar()
+            self._sin_base_de_datos = False
+        except Exception as e:
+            conexion = None
+            if not self._sin_base_de_datos:
+                print(f"Planificador sin base de datos: {e}")
+            self._sin_base_de_datos = True
+
+        if conexion is not None:
+            if self._candado_base_de_datos(conexion):
+                self._soltar_archivo()
+                self._conexion = conexion
+                self._ultimo_ping = ahora
+                self.modo = 'base_de_datos'
+                print(f"✓ Planificador: {self.ejecutor} ejecuta las tareas programadas")
+                self._retomar_cadencia()
+                return True
+            # Otro proceso del despliegue tiene el candado
+            conexion.close()
+            self._soltar_archivo()
+            self.modo = None
+            return False
+
+        # Sin base de datos: un ejecutor por servidor
+        if self.modo == 'archivo' or self._candado_archivo():
+            self.modo = 'archivo'
+            return True
+        return False
+
+    def _candado_base_de_datos(self, conexion):
+        try:
+            conexion.autocommit = True
+            cursor = conexion.cursor()
+            if self._es_postgresql(conexion):
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', (CANDADO_PG,))
+            else:
+                cursor.execute('SELECT GET_LOCK(%s, 0)', (CANDADO_MYSQL,))
+            obtenido = bool(cursor.fetchone()[0])
+            cursor.close()
+            return obtenido
+        except Exception as e:
+            print(f"Error pidiendo el candado del planificador: {e}")
+            return False
+
+    def _candado_libre(self):
+        """Revisa con una conexión del pool si nadie tiene el candado (None si no se sabe)"""
+        try:
+            with self._obtener_conexion() as conexion:
+                if conexion is None:
+                    return None
+                cursor = conexion.cursor()
+                if self._es_postgresql(conexion):
+                    # Candado de un entero de 64 bits: classid = 32 bits altos, objid = 32 bajos
+                    cursor.execute('''
+                        SELECT NOT EXISTS (
+                            SELECT 1 FROM pg_locks
+                            WHERE locktype = 'advisory' AND classid = 0 AND objid = %s AND objsubid = 1
+                              AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+                        )
+                    ''', (CANDADO_PG,))
+                else:
+                    cursor.execute('SELECT IS_FREE_LOCK(%s)', (CANDADO_MYSQL,))
+                libre = bool(cursor.fetchone()[0])
+                cursor.close()
+            return libre
+        except Exception as e:
+            print(f"Error revisando el candado del planificador: {e}")
+            return None
+
+    def _sigue_conectado(self):
+        self._ultimo_ping = time.monotonic()
+        try:
+            with self._lock_conexion:
+                cursor = self._conexion.cursor()
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _soltar_conexion(self):
+        # Al cerrar la conexión la base de datos libera el candado
+        try:
+            self._conexion.close()
+        except Exception:
+            pass
+        self._conexion = None
+        self.modo = None
+
+    def _candado_archivo(self):
+        if fcntl is None:
+            return True
+        archivo = open(self._ruta_candado, 'a')
+        try:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        self._archivo = archivo
+        return True
+
+    def _soltar_archivo(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    # ------------------------------------------------
+    # Ciclo principal
+    # ------------------------------------------------
+    def _ciclo(self):
+        pid = os.getpid()
+        while pid == self._pid and not self._detener.is_set():
+            espera = self.reintento
+            try:
+                if self._tomar_liderazgo():
+                    ahora = time.time()
+                    for tarea in list(self.tareas.values()):
+                        if tarea.proxima <= ahora:
+                            self._lanzar(tarea, ahora)
+                    # Dormir justo hasta la siguiente tarea (sin pasar del ping)
+                    siguiente = min(tarea.proxima for tarea in self.tareas.values())
+                    espera = min(max(siguiente - time.time(), 0.01), self.ping)
+            except Exception as e:
+                print(f"Error en el planificador: {e}")
+            self._detener.wait(espera)
+
+    def _lanzar(self, tarea, ahora):
+        programada = tarea.proxima
+        # Cadencia fija: la siguiente ejecución no se corre por la duración
+        tarea.proxima = programada + tarea.intervalo
+        if tarea.proxima <= ahora:
+            tarea.proxima = ahora + tarea.intervalo
+        if tarea.en_curso:
+            tarea.omitidas += 1
+            return
+        tarea.en_curso = True
+        threading.Thread(target=self._ejecutar, args=(tarea, programada),
+                         name=f'tarea-{tarea.nombre}', daemon=True).start()
+
+    def _ejecutar(self, tarea, programada):
+        inicio = time.time()
+        try:
+            exito = tarea.funcion() is not False
+            error = None if exito else 'sin resultado'
+        except Exception as e:
+            exito = False
+            error = str(e)
+            print(f"Error en la tarea {tarea.nombre}: {e}")
+
+        with self._lock:
+            tarea.en_curso = False
+            tarea.ejecuciones += 1
+            tarea.ultima_ejecucion = inicio
+            tarea.duracion = time.time() - inicio
+            tarea.retraso = inicio - programada if programada else 0.0
+            tarea.ultimo_error = error
+            if exito:
+                tarea.ultimo_exito = time.time()
+            else:
+                tarea.fallos += 1
+        self._guardar_registro(tarea, exito)
+
+    # ------------------------------------------------
+    # Registro compartido en la base de datos
+    # ------------------------------------------------
+    def _guardar_registro(self, tarea, exito):
+        if self.modo != 'base_de_datos':
+            return
+        try:
+            with self._lock_conexion:
+                cursor = self._conexion.cursor()
+                cursor.execute(GUARDAR_PG if self._es_postgresql(self._conexion) else GUARDAR_MYSQL, (
+                    tarea.nombre,
+                    int(tarea.ultima_ejecucion),
+                    int(tarea.ultimo_exito) if exito else None,
+                    round(tarea.duracion * 1000),
+                    round(tarea.retraso * 1000),
+                    0 if exito else 1,
+                    tarea.ultimo_error,
+                    self.ejecutor,
+                ))
+                cursor.close()
+        except Exception as e:
+            print(f"Error registrando la tarea {tarea.nombre}: {e}")
+
+    def _retomar_cadencia(self):
+        # Un líder nuevo continúa desde la última ejecución registrada
+        try:
+            with self._lock_conexion:
+                cursor = self._conexion.cursor()
+                cursor.execute('SELECT nombre, ultima_ejecucion FROM tareas_programadas')
+                ultimas = dict(cursor.fetchall())
+                cursor.close()
+        except Exception as e:
+            print(f"Error leyendo el registro de tareas: {e}")
+            return
+        for nombre, tarea in self.tareas.items():
+            if ultimas.get(nombre):
+                tarea.proxima = ultimas[nombre] + tarea.intervalo
+
+    def registro(self):
+        """Filas de tareas_programadas (visibles desde cualquier worker)"""
+        with self._obtener_conexion() as conexion:
+            if conexion is None:
+                return {}
+            cursor = conexion.cursor()
+            cursor.execute('''
+                SELECT nombre, ultima_ejecucion, ultimo_exito, duracion_ms, retraso_ms,
+                       ejecuciones, fallos, ultimo_error, ejecutor
+                FROM tareas_programadas
+            ''')
+            columnas = [columna[0] for columna in cursor.description]
+            filas = {fila[0]: dict(zip(columnas, fila)) for fila in cursor.fetchall()}
+            cursor.close()
+        return filas
+
+    def estadisticas(self):
+        try:
+            registro = self.registro()
+        except Exception as e:
+            print(f"Error leyendo el registro de tareas: {e}")
+            registro = {}
+        tareas = {}
+        for nombre, tarea in self.tareas.items():
+            datos = {'intervalo': tarea.intervalo}
+            datos.update(registro.get(nombre) or {})
+            if self.es_lider():
+                datos['local'] = tarea.estado()
+            ultimo_exito = datos.get('ultimo_exito') or tarea.ultimo_exito
+            # Antigüedad del último resultado bueno
+            datos['lag'] = round(time.time() - ultimo_exito, 3) if ultimo_exito else None
+            tareas[nombre] = datos
+        return {
+            'ejecutor': self.ejecutor,
+            'lider_en_este_proceso': self.es_lider(),
+            'modo': self.modo,
+            'tareas': tareas,
+        }
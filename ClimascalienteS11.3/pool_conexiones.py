@@ -0,0 +1,231 @@
+"""Pool de conexiones reutilizables para PostgreSQL y MySQL.
+
+Cada backend tiene su propio pool con un número máximo de conexiones.
+Las conexiones se verifican al tomarlas del pool, se reciclan tras cierto
+número de usos o de tiempo de vida y se descartan al hacer fork (gunicorn)
+para que cada proceso trabaje con sus propias conexiones.
+"""
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class _Entrada:
+    """Conexión del pool junto con sus datos de uso"""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.creada = time.monotonic()
+        self.ultimo_uso = self.creada
+        self.usos = 0
+
+
+# Todos los pools creados en este proceso (para reiniciarlos tras un fork)
+_POOLS = weakref.WeakSet()
+
+
+class PoolConexiones:
+    """Pool acotado de conexiones para un backend de base de datos"""
+
+    def __init__(self, nombre, crear_conexion, tamano_maximo=5, espera_maxima=5.0,
+                 max_usos=1000, max_edad=1800, ping_inactividad=30):
+        self.nombre = nombre
+        self._crear_conexion = crear_conexion
+        self.tamano_maximo = tamano_maximo
+        self.espera_maxima = espera_maxima
+        self.max_usos = max_usos
+        self.max_edad = max_edad
+        self.ping_inactividad = ping_inactividad
+        self._reiniciar_estado()
+        _POOLS.add(self)
+
+    def _reiniciar_estado(self):
+        """Deja el pool vacío (las conexiones heredadas no se cierran)"""
+        self._lock = threading.Lock()
+        self._disponible = threading.Condition(self._lock)
+        self._libres = []
+        self._en_uso = {}
+        self._abiertas = 0
+        self._esperando = 0
+        self._pid = os.getpid()
+        self._stats = {
+            'checkouts': 0,
+            'creadas': 0,
+            'descartadas': 0,
+            'agotado': 0,
+            'latencia_total': 0.0,
+            'latencia_max': 0.0,
+        }
+
+    # ------------------------------------------------
+    # Validación y ciclo de vida de las conexiones
+    # ------------------------------------------------
+    def _expirada(self, entrada):
+        if self.max_usos and entrada.usos >= self.max_usos:
+            return True
+        return bool(self.max_edad) and time.monotonic() - entrada.creada >= self.max_edad
+
+    def _responde(self, entrada):
+        """Hace un ping a la conexión si lleva tiempo sin usarse"""
+        if time.monotonic() - entrada.ultimo_uso < self.ping_inactividad:
+            return True
+        try:
+            cursor = entrada.conexion.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            entrada.conexion.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _cerrar(self, entrada):
+        try:
+            entrada.conexion.close()
+        except Exception:
+            pass
+
+    # ------------------------------------------------
+    # API pública
+    # ------------------------------------------------
+    def obtener(self):
+        """Toma una conexión del pool (o abre una nueva si hay espacio)"""
+        if self._pid != os.getpid():
+            self._reiniciar_estado()
+
+        inicio = time.perf_counter()
+        limite = inicio + self.espera_maxima
+        entrada = None
+
+        with self._lock:
+            while True:
+                if self._libres:
+                    entrada = self._libres.pop()
+                    break
+                if self._abiertas < self.tamano_maximo:
+                    self._abiertas += 1
+                    break
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    self._stats['agotado'] += 1
+                    raise PoolAgotado(f'Pool {self.nombre} sin conexiones libres')
+                self._esperando += 1
+                try:
+                    self._disponible.wait(restante)
+                finally:
+                    self._esperando -= 1
+
+        # La red se usa fuera del lock: el espacio ya quedó reservado
+        descartadas = 0
+        nueva = entrada is None
+        try:
+            if entrada is not None and (self._expirada(entrada) or not self._responde(entrada)):
+                self._cerrar(entrada)
+                descartadas = 1
+                entrada = None
+                nueva = True
+            if entrada is None:
+                entrada = _Entrada(self._crear_conexion())
+        except Exception:
+            with self._lock:
+                self._abiertas -= 1
+                self._stats['descartadas'] += descartadas
+                self._disponible.notify()
+            raise
+
+        entrada.usos += 1
+        latencia = time.perf_counter() - inicio
+        with self._lock:
+            self._en_uso[id(entrada.conexion)] = entrada
+            self._stats['checkouts'] += 1
+            self._stats['creadas'] += int(nueva)
+            self._stats['descartadas'] += descartadas
+            self._stats['latencia_total'] += latencia
+            self._stats['latencia_max'] = max(self._stats['latencia_max'], latencia)
+        return entrada.conexion
+
+    def devolver(self, conexion, descartar=False):
+        """Regresa una conexión al pool, cerrándola si ya no sirve"""
+        with self._lock:
+            entrada = self._en_uso.pop(id(conexion), None)
+        if entrada is None:
+            # Conexión de otro proceso o de antes de un reinicio del pool
+            return
+
+        if not descartar:
+            try:
+                # Nunca dejar transacciones abiertas para el siguiente uso
+                conexion.rollback()
+            except Exception:
+                descartar = True
+
+        with self._lock:
+            if not descartar and not self._expirada(entrada):
+                entrada.ultimo_uso = time.monotonic()
+                self._libres.append(entrada)
+                self._disponible.notify()
+                return
+
+        # Cerrar puede tardar (red): fuera del lock para no frenar a los demás
+        self._cerrar(entrada)
+        with self._lock:
+            self._stats['descartadas'] += 1
+            self._abiertas -= 1
+            self._disponible.notify()
+
+    @contextmanager
+    def conexion(self):
+        """Context manager que toma y devuelve una conexión del pool"""
+        conexion = self.obtener()
+        try:
+            yield conexion
+        except Exception:
+            self.devolver(conexion, descartar=True)
+            raise
+        else:
+            self.devolver(conexion)
+
+    def cerrar_todo(self):
+        """Cierra las conexiones libres (las que están en uso se cierran al devolverse)"""
+        with self._lock:
+            libres, self._libres = self._libres, []
+            self._stats['descartadas'] += len(libres)
+            self._abiertas -= len(libres)
+        for entrada in libres:
+            self._cerrar(entrada)
+
+    def estadisticas(self):
+        """Estado actual del pool para dimensionarlo bajo carga"""
+        with self._lock:
+            checkouts = self._stats['checkouts']
+            return {
+                'backend': self.nombre,
+                'tamano_maximo': self.tamano_maximo,
+                'abiertas': self._abiertas,
+                'en_uso': len(self._en_uso),
+                'libres': len(self._libres),
+                'esperando': self._esperando,
+                'checkouts': checkouts,
+                'creadas': self._stats['creadas'],
+                'descartadas': self._stats['descartadas'],
+                'agotado': self._stats['agotado'],
+                'latencia_checkout_ms_promedio': round(
+                    self._stats['latencia_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+                'latencia_checkout_ms_max': round(self._stats['latencia_max'] * 1000, 3),
+            }
+
+
+def reiniciar_pools():
+    """Descarta las conexiones heredadas del proceso padre"""
+    for pool in list(_POOLS):
+        pool._reiniciar_estado()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reiniciar_pools)
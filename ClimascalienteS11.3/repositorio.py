@@ -0,0 +1,595 @@
+"""Acceso a datos de las tablas de la aplicación.
+
+Un repositorio por tabla (usuarios, numeros_emergencia, consejos_clima,
+frases_dia, ciudades, el historial del clima y la última lectura
+publicada) con todo su SQL en un solo lugar. Las filas se entregan como dict con los
+dos drivers (RealDictCursor en psycopg2, cursor dictionary en
+mysql.connector) y cada consulta se prepara en el servidor una sola vez
+por conexión del pool:
+
+- PostgreSQL: PREPARE nombre AS ... y después EXECUTE nombre (...).
+- MySQL: un cursor preparado (COM_STMT_PREPARE) por consulta y conexión.
+
+Las sentencias preparadas viven lo mismo que la conexión: cuando el pool
+la descarta se olvidan con ella. Las columnas se listan explícitamente
+(sin SELECT *) para que una migración que agrega columnas no invalide
+las sentencias ya preparadas. DB_PREPARED=0 desactiva la preparación
+(p. ej. detrás de pgbouncer en modo transacción).
+
+Las consultas con preparar=False se envían siempre con los valores ya
+escritos: la búsqueda por prefijo (LIKE 'abc%') solo usa los índices
+text_pattern_ops si el planificador de PostgreSQL ve el patrón, y un
+plan genérico de una sentencia preparada no lo ve.
+"""
+import json
+import os
+import threading
+import weakref
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+PREPARAR = os.environ.get('DB_PREPARED', '1') == '1'
+
+# Todas las consultas por nombre (el nombre es el de la sentencia preparada)
+CONSULTAS = {}
+
+# Sentencias ya preparadas en cada conexión: {conexión: {nombre: cursor o True}}
+_preparadas = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_contadores = {'preparadas': 0, 'reutilizadas': 0, 'sin_preparar': 0}
+
+
+def es_postgresql(conexion):
+    return isinstance(conexion, psycopg2.extensions.connection)
+
+
+class Consulta:
+    """Sentencia SQL con nombre; `mysql` la reemplaza si el dialecto difiere"""
+
+    def __init__(self, nombre, sql, mysql=None, preparar=True):
+        if nombre in CONSULTAS:
+            raise ValueError(f'Consulta duplicada: {nombre}')
+        CONSULTAS[nombre] = self
+        self.nombre = nombre
+        self.sql = sql
+        self.sql_mysql = mysql or sql
+        self.preparar = preparar
+        # PREPARE de PostgreSQL (y asyncpg) numeran los parámetros ($1, $2...) en lugar de %s
+        partes = sql.split('%s')
+        self.sql_numerado = ''.join(
+            parte + (f'${numero}' if numero < len(partes) else '')
+            for numero, parte in enumerate(partes, 1))
+        self.prepare_pg = f'PREPARE {nombre} AS {self.sql_numerado}'
+        parametros = len(partes) - 1
+        self.execute_pg = f'EXECUTE {nombre}' + (f" ({', '.join(['%s'] * parametros)})" if parametros else '')
+
+    def para(self, postgresql):
+        return self.sql if postgresql else self.sql_mysql
+
+
+def estadisticas():
+    with _lock:
+        return dict(_contadores)
+
+
+def _contar(contador):
+    with _lock:
+        _contadores[contador] += 1
+
+
+class Datos:
+    """Repositorios de la app sobre una conexión tomada del pool"""
+
+    def __init__(self, conexion, preparar=None):
+        self.conexion = conexion
+        self.postgresql = es_postgresql(conexion)
+        self.preparar = PREPARAR if preparar is None else preparar
+        self.usuarios = Usuarios(self)
+        self.emergencias = Emergencias(self)
+        self.consejos = Consejos(self)
+        self.frases = Frases(self)
+        self.historial = Historial(self)
+        self.publicado = ClimaPublicado(self)
+        self.ciudades = Ciudades(self)
+
+    def commit(self):
+        self.conexion.commit()
+
+    # ------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------
+    def _preparadas(self):
+        with _lock:
+            preparadas = _preparadas.get(self.conexion)
+            if preparadas is None:
+                preparadas = _preparadas[self.conexion] = {}
+            return preparadas
+
+    def _cursor(self):
+        if self.postgresql:
+            return self.conexion.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        return self.conexion.cursor(dictionary=True)
+
+    def _ejecutar(self, consulta, parametros):
+        """Ejecuta la consulta y regresa (cursor, cerrar_al_terminar)"""
+        if not self.preparar or not consulta.preparar:
+            _contar('sin_preparar')
+            cursor = self._cursor()
+            cursor.execute(consulta.para(self.postgresql), parametros)
+            return cursor, True
+
+        preparadas = self._preparadas()
+        if self.postgresql:
+            cursor = self._cursor()
+            if consulta.nombre not in preparadas:
+                cursor.execute(consulta.prepare_pg)
+                preparadas[consulta.nombre] = True
+                _contar('preparadas')
+            else:
+                _contar('reutilizadas')
+            cursor.execute(consulta.execute_pg, parametros)
+            return cursor, True
+
+        # MySQL: el cursor preparado se conserva; ejecutar el mismo texto
+        # otra vez solo envía los parámetros
+        cursor = preparadas.get(consulta.nombre)
+        if cursor is None:
+            cursor = self.conexion.cursor(prepared=True, dictionary=True)
+            preparadas[consulta.nombre] = cursor
+            _contar('preparadas')
+        else:
+            _contar('reutilizadas')
+        cursor.execute(consulta.sql_mysql, parametros)
+        return cursor, False
+
+    def todos(self, consulta, parametros=()):
+        cursor, cerrar = self._ejecutar(consulta, parametros)
+        filas = cursor.fetchall()
+        if cerrar:
+            cursor.close()
+        return filas
+
+    def uno(self, consulta, parametros=()):
+        # Se leen todas las filas para no dejar resultados pendientes en MySQL
+        filas = self.todos(consulta, parametros)
+        return filas[0] if filas else None
+
+    def ejecutar(self, consulta, parametros=()):
+        """INSERT/UPDATE/DELETE; regresa el número de filas afectadas"""
+        cursor, cerrar = self._ejecutar(consulta, parametros)
+        afectadas = cursor.rowcount
+        if cerrar:
+            cursor.close()
+        return afectadas
+
+
+# ----------------------------------------------------
+# USUARIOS
+# ----------------------------------------------------
+COLUMNAS_USUARIO = 'id, username, email, password, rol, fecha_registro'
+
+USUARIO_POR_USERNAME = Consulta('usuario_por_username',
+                                f'SELECT {COLUMNAS_USUARIO} FROM usuarios WHERE username = %s')
+USUARIO_POR_ID = Consulta('usuario_por_id', f'SELECT {COLUMNAS_USUARIO} FROM usuarios WHERE id = %s')
+USUARIO_EXISTE = Consulta('usuario_existe', 'SELECT id FROM usuarios WHERE username = %s OR email = %s LIMIT 1')
+USUARIO_AGREGAR = Consulta('usuario_agregar',
+                           'INSERT INTO usuarios (username, email, password, rol) VALUES (%s, %s, %s, %s)')
+USUARIO_ACTUALIZAR = Consulta('usuario_actualizar',
+                              'UPDATE usuarios SET username = %s, email = %s, rol = %s WHERE id = %s')
+USUARIO_ACTUALIZAR_CON_PASSWORD = Consulta(
+    'usuario_actualizar_con_password',
+    'UPDATE usuarios SET username = %s, email = %s, rol = %s, password = %s WHERE id = %s')
+# Solo si nadie cambió la contraseña mientras tanto
+USUARIO_CAMBIAR_HASH = Consulta('usuario_cambiar_hash',
+                                'UPDATE usuarios SET password = %s WHERE id = %s AND password = %s')
+USUARIO_ELIMINAR = Consulta('usuario_eliminar', 'DELETE FROM usuarios WHERE id = %s')
+USUARIOS_TOTAL = Consulta('usuarios_total', 'SELECT COUNT(*) AS total FROM usuarios')
+
+# Páginas del dashboard: una consulta por combinación de filtro y dirección
+_FILTROS_PAGINA = {
+    'todos': ('', ''),
+    'id': ('id = %s', 'id = %s'),
+    # Prefijo de usuario o email (usa los índices de prefijo)
+    'prefijo': ('(lower(username) LIKE %s OR lower(email) LIKE %s)', '(username LIKE %s OR email LIKE %s)'),
+}
+# anterior = ids mayores (página previa), siguiente = ids menores
+_DIRECCIONES_PAGINA = {
+    'primera': ('', 'DESC'),
+    'siguiente': ('id < %s', 'DESC'),
+    'anterior': ('id > %s', 'ASC'),
+}
+
+
+def _consulta_pagina(filtro, direccion):
+    condicion_pg, condicion_mysql = _FILTROS_PAGINA[filtro]
+    limite, orden = _DIRECCIONES_PAGINA[direccion]
+
+    def sql(condicion):
+        condiciones = [c for c in (condicion, limite) if c]
+        where = ('WHERE ' + ' AND '.join(condiciones)) if condiciones else ''
+        return f'''
+            SELECT id, username, email, rol, fecha_registro FROM usuarios
+            {where}
+            ORDER BY id {orden}
+            LIMIT %s
+        '''
+    # Con un patrón LIKE como parámetro el plan genérico no usa los índices de prefijo
+    return Consulta(f'usuarios_pagina_{filtro}_{direccion}', sql(condicion_pg), mysql=sql(condicion_mysql),
+                    preparar=filtro != 'prefijo')
+
+
+PAGINAS_USUARIOS = {(filtro, direccion): _consulta_pagina(filtro, direccion)
+                    for filtro in _FILTROS_PAGINA for direccion in _DIRECCIONES_PAGINA}
+
+
+class Usuarios:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def por_username(self, username):
+        return self.datos.uno(USUARIO_POR_USERNAME, (username,))
+
+    def por_id(self, usuario_id):
+        return self.datos.uno(USUARIO_POR_ID, (usuario_id,))
+
+    def existe(self, username, email):
+        """True si el usuario o el email ya están registrados"""
+        return self.datos.uno(USUARIO_EXISTE, (username, email)) is not None
+
+    def agregar(self, username, email, password_hash, rol):
+        self.datos.ejecutar(USUARIO_AGREGAR, (username, email, password_hash, rol))
+
+    def actualizar(self, usuario_id, username, email, rol, password_hash=None):
+        if password_hash:
+            self.datos.ejecutar(USUARIO_ACTUALIZAR_CON_PASSWORD,
+                                (username, email, rol, password_hash, usuario_id))
+        else:
+            self.datos.ejecutar(USUARIO_ACTUALIZAR, (username, email, rol, usuario_id))
+
+    def cambiar_hash(self, usuario_id, nuevo, anterior):
+        return self.datos.ejecutar(USUARIO_CAMBIAR_HASH, (nuevo, usuario_id, anterior))
+
+    def eliminar(self, usuario_id):
+        return self.datos.ejecutar(USUARIO_ELIMINAR, (usuario_id,))
+
+    def total(self):
+        return self.datos.uno(USUARIOS_TOTAL)['total']
+
+    def pagina(self, busqueda, antes, despues, tamano):
+        """Una página de usuarios ordenada por id descendente.
+
+        `antes` pide la página siguiente (ids menores) y `despues` la anterior
+        (ids mayores). Regresa (usuarios, hay_anterior, hay_siguiente).
+        """
+        parametros = []
+        if busqueda.isdigit():
+            # Un número busca el ID exacto
+            filtro = 'id'
+            parametros.append(int(busqueda))
+        elif busqueda:
+            filtro = 'prefijo'
+            prefijo = busqueda.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            if self.datos.postgresql:
+                prefijo = prefijo.lower()
+            parametros.extend([prefijo, prefijo])
+        else:
+            filtro = 'todos'
+
+        if despues is not None:
+            direccion = 'anterior'
+            parametros.append(despues)
+        elif antes is not None:
+            direccion = 'siguiente'
+            parametros.append(antes)
+        else:
+            direccion = 'primera'
+
+        # Se pide una fila de más para saber si hay otra página
+        usuarios = self.datos.todos(PAGINAS_USUARIOS[filtro, direccion], parametros + [tamano + 1])
+        hay_mas = len(usuarios) > tamano
+        usuarios = usuarios[:tamano]
+        if despues is not None:
+            usuarios.reverse()
+            return usuarios, hay_mas, True
+        return usuarios, antes is not None, hay_mas
+
+
+# ----------------------------------------------------
+# NÚMEROS DE EMERGENCIA
+# ----------------------------------------------------
+COLUMNAS_EMERGENCIA = 'id, nombre, numero, descripcion, icono, categoria, badge, activo, fecha_creacion'
+
+EMERGENCIAS_ACTIVAS = Consulta(
+    'emergencias_activas',
+    f'SELECT {COLUMNAS_EMERGENCIA} FROM numeros_emergencia WHERE activo = TRUE ORDER BY categoria, nombre')
+EMERGENCIAS_TODAS = Consulta(
+    'emergencias_todas', f'SELECT {COLUMNAS_EMERGENCIA} FROM numeros_emergencia ORDER BY categoria, nombre')
+EMERGENCIA_POR_ID = Consulta('emergencia_por_id',
+                             f'SELECT {COLUMNAS_EMERGENCIA} FROM numeros_emergencia WHERE id = %s')
+EMERGENCIA_AGREGAR = Consulta('emergencia_agregar', '''
+    INSERT INTO numeros_emergencia (nombre, numero, descripcion, icono, categoria, badge)
+    VALUES (%s, %s, %s, %s, %s, %s)
+''')
+EMERGENCIA_ACTUALIZAR = Consulta('emergencia_actualizar', '''
+    UPDATE numeros_emergencia
+    SET nombre = %s, numero = %s, descripcion = %s, icono = %s, categoria = %s, badge = %s, activo = %s
+    WHERE id = %s
+''')
+EMERGENCIA_ELIMINAR = Consulta('emergencia_eliminar', 'DELETE FROM numeros_emergencia WHERE id = %s')
+
+
+class Emergencias:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def activas(self):
+        return self.datos.todos(EMERGENCIAS_ACTIVAS)
+
+    def todas(self):
+        return self.datos.todos(EMERGENCIAS_TODAS)
+
+    def por_id(self, numero_id):
+        return self.datos.uno(EMERGENCIA_POR_ID, (numero_id,))
+
+    def agregar(self, nombre, numero, descripcion, icono, categoria, badge):
+        self.datos.ejecutar(EMERGENCIA_AGREGAR, (nombre, numero, descripcion, icono, categoria, badge))
+
+    def actualizar(self, numero_id, nombre, numero, descripcion, icono, categoria, badge, activo):
+        self.datos.ejecutar(EMERGENCIA_ACTUALIZAR,
+                            (nombre, numero, descripcion, icono, categoria, badge, activo, numero_id))
+
+    def eliminar(self, numero_id):
+        return self.datos.ejecutar(EMERGENCIA_ELIMINAR, (numero_id,))
+
+
+# ----------------------------------------------------
+# CONSEJOS DEL CLIMA
+# ----------------------------------------------------
+COLUMNAS_CONSEJO = 'id, titulo, descripcion, icono, etiquetas, activo, fecha_creacion'
+
+CONSEJOS_ACTIVOS = Consulta(
+    'consejos_activos',
+    f'SELECT {COLUMNAS_CONSEJO} FROM consejos_clima WHERE activo = TRUE ORDER BY fecha_creacion DESC')
+CONSEJOS_TODOS = Consulta('consejos_todos',
+                          f'SELECT {COLUMNAS_CONSEJO} FROM consejos_clima ORDER BY fecha_creacion DESC')
+CONSEJO_POR_ID = Consulta('consejo_por_id', f'SELECT {COLUMNAS_CONSEJO} FROM consejos_clima WHERE id = %s')
+CONSEJO_AGREGAR = Consulta('consejo_agregar', '''
+    INSERT INTO consejos_clima (titulo, descripcion, icono, etiquetas)
+    VALUES (%s, %s, %s, %s)
+''')
+CONSEJO_ACTUALIZAR = Consulta('consejo_actualizar', '''
+    UPDATE consejos_clima
+    SET titulo = %s, descripcion = %s, icono = %s, etiquetas = %s, activo = %s
+    WHERE id = %s
+''')
+CONSEJO_ELIMINAR = Consulta('consejo_eliminar', 'DELETE FROM consejos_clima WHERE id = %s')
+
+
+class Consejos:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def activos(self):
+        return self.datos.todos(CONSEJOS_ACTIVOS)
+
+    def todos(self):
+        return self.datos.todos(CONSEJOS_TODOS)
+
+    def por_id(self, consejo_id):
+        return self.datos.uno(CONSEJO_POR_ID, (consejo_id,))
+
+    def agregar(self, titulo, descripcion, icono, etiquetas):
+        self.datos.ejecutar(CONSEJO_AGREGAR, (titulo, descripcion, icono, etiquetas))
+
+    def actualizar(self, consejo_id, titulo, descripcion, icono, etiquetas, activo):
+        self.datos.ejecutar(CONSEJO_ACTUALIZAR, (titulo, descripcion, icono, etiquetas, activo, consejo_id))
+
+    def eliminar(self, consejo_id):
+        return self.datos.ejecutar(CONSEJO_ELIMINAR, (consejo_id,))
+
+
+# ----------------------------------------------------
+# FRASES DEL DÍA
+# ----------------------------------------------------
+COLUMNAS_FRASE = 'id, frase, autor, fecha_publicacion, activa, publica, expira'
+
+FRASES_TODAS = Consulta('frases_todas',
+                        f'SELECT {COLUMNAS_FRASE} FROM frases_dia ORDER BY fecha_publicacion DESC')
+# La publicada más recientemente (la frase del día si no ha vencido)
+FRASE_PUBLICADA = Consulta('frase_publicada', f'''
+    SELECT {COLUMNAS_FRASE} FROM frases_dia
+    WHERE publica <= %s
+    ORDER BY publica DESC, id DESC
+    LIMIT 1
+''')
+FRASE_SIGUIENTE = Consulta('frase_siguiente', '''
+    SELECT publica FROM frases_dia
+    WHERE publica > %s
+    ORDER BY publica, id
+    LIMIT 1
+''')
+# La última programada (para poner una frase en cola después de ella)
+FRASE_ULTIMA = Consulta('frase_ultima', '''
+    SELECT expira FROM frases_dia
+    ORDER BY publica DESC, id DESC
+    LIMIT 1
+''')
+FRASE_AGREGAR = Consulta('frase_agregar', '''
+    INSERT INTO frases_dia (frase, autor, activa, publica, expira)
+    VALUES (%s, %s, TRUE, %s, %s)
+''')
+FRASE_ELIMINAR = Consulta('frase_eliminar', 'DELETE FROM frases_dia WHERE id = %s')
+FRASES_ARCHIVAR = Consulta('frases_archivar', '''
+    UPDATE frases_dia SET activa = FALSE
+    WHERE id IN (
+        SELECT id FROM frases_dia
+        WHERE activa = TRUE AND expira <= %s
+        LIMIT %s
+    )
+''', mysql='''
+    UPDATE frases_dia SET activa = FALSE
+    WHERE activa = TRUE AND expira <= %s
+    LIMIT %s
+''')
+
+
+class Frases:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def todas(self):
+        return self.datos.todos(FRASES_TODAS)
+
+    def publicada(self, ahora):
+        return self.datos.uno(FRASE_PUBLICADA, (ahora,))
+
+    def siguiente(self, ahora):
+        """Momento en que se publica la siguiente frase programada (o None)"""
+        fila = self.datos.uno(FRASE_SIGUIENTE, (ahora,))
+        return fila['publica'] if fila else None
+
+    def fin_de_la_cola(self):
+        """Vencimiento de la última frase programada (o None)"""
+        fila = self.datos.uno(FRASE_ULTIMA)
+        return fila['expira'] if fila else None
+
+    def agregar(self, frase, autor, publica, expira):
+        self.datos.ejecutar(FRASE_AGREGAR, (frase, autor, publica, expira))
+
+    def eliminar(self, frase_id):
+        return self.datos.ejecutar(FRASE_ELIMINAR, (frase_id,))
+
+    def archivar_vencidas(self, ahora, lote):
+        """Desactiva hasta `lote` frases vencidas; regresa cuántas"""
+        return self.datos.ejecutar(FRASES_ARCHIVAR, (ahora, lote))
+
+
+# ----------------------------------------------------
+# HISTORIAL DEL CLIMA
+# ----------------------------------------------------
+# Duración de cada periodo de los resúmenes (segundos)
+PERIODOS = {'hora': 3600, 'dia': 86400}
+# Los días de los resúmenes empiezan a medianoche de esta zona (centro de México: UTC-6 todo el año)
+HISTORIAL_UTC_OFFSET = int(float(os.environ.get('HISTORIAL_UTC_OFFSET_HORAS', -6)) * 3600)
+
+COLUMNAS_RESUMEN = '''inicio, muestras, temp_min, temp_max, temp_suma, humedad_min, humedad_max, humedad_suma,
+           viento_min, viento_max, viento_suma'''
+
+OBSERVACION_AGREGAR = Consulta('observacion_agregar', '''
+    INSERT INTO clima_observaciones (ciudad, observado, temperatura, sensacion, humedad, presion, viento, descripcion)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+''')
+# Suma una muestra al resumen de su periodo (lo crea si es la primera)
+RESUMEN_SUMAR = Consulta('resumen_sumar', '''
+    INSERT INTO clima_resumenes AS r (ciudad, periodo, inicio, muestras, temp_min, temp_max, temp_suma,
+                                      humedad_min, humedad_max, humedad_suma, viento_min, viento_max, viento_suma)
+    VALUES (%s, %s, %s, 1, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (ciudad, periodo, inicio) DO UPDATE SET
+        muestras = r.muestras + 1,
+        temp_min = LEAST(r.temp_min, EXCLUDED.temp_min),
+        temp_max = GREATEST(r.temp_max, EXCLUDED.temp_max),
+        temp_suma = r.temp_suma + EXCLUDED.temp_suma,
+        humedad_min = LEAST(r.humedad_min, EXCLUDED.humedad_min),
+        humedad_max = GREATEST(r.humedad_max, EXCLUDED.humedad_max),
+        humedad_suma = r.humedad_suma + EXCLUDED.humedad_suma,
+        viento_min = LEAST(r.viento_min, EXCLUDED.viento_min),
+        viento_max = GREATEST(r.viento_max, EXCLUDED.viento_max),
+        viento_suma = r.viento_suma + EXCLUDED.viento_suma
+''', mysql='''
+    INSERT INTO clima_resumenes (ciudad, periodo, inicio, muestras, temp_min, temp_max, temp_suma,
+                                 humedad_min, humedad_max, humedad_suma, viento_min, viento_max, viento_suma)
+    VALUES (%s, %s, %s, 1, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        muestras = muestras + 1,
+        temp_min = LEAST(temp_min, VALUES(temp_min)),
+        temp_max = GREATEST(temp_max, VALUES(temp_max)),
+        temp_suma = temp_suma + VALUES(temp_suma),
+        humedad_min = LEAST(humedad_min, VALUES(humedad_min)),
+        humedad_max = GREATEST(humedad_max, VALUES(humedad_max)),
+        humedad_suma = humedad_suma + VALUES(humedad_suma),
+        viento_min = LEAST(viento_min, VALUES(viento_min)),
+        viento_max = GREATEST(viento_max, VALUES(viento_max)),
+        viento_suma = viento_suma + VALUES(viento_suma)
+''')
+RESUMENES_RANGO = Consulta('resumenes_rango', f'''
+    SELECT {COLUMNAS_RESUMEN}
+    FROM clima_resumenes
+    WHERE ciudad = %s AND periodo = %s AND inicio >= %s AND inicio < %s
+    ORDER BY inicio
+''')
+
+
+def inicio_periodo(momento, periodo):
+    """Comienzo (segundos desde 1970) del periodo que contiene `momento`"""
+    duracion = PERIODOS[periodo]
+    return (int(momento) + HISTORIAL_UTC_OFFSET) // duracion * duracion - HISTORIAL_UTC_OFFSET
+
+
+class Historial:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def registrar(self, ciudad, observado, weather_data):
+        """Guarda una observación y la suma a sus resúmenes por hora y por día"""
+        temperatura = weather_data['temperature']
+        humedad = weather_data['humidity']
+        viento = weather_data['wind_speed']
+        self.datos.ejecutar(OBSERVACION_AGREGAR, (
+            ciudad, int(observado), temperatura, weather_data.get('feels_like'), humedad,
+            weather_data.get('pressure'), viento, weather_data.get('description')))
+        for periodo in PERIODOS:
+            self.datos.ejecutar(RESUMEN_SUMAR, (
+                ciudad, periodo, inicio_periodo(observado, periodo),
+                temperatura, temperatura, temperatura, humedad, humedad, humedad, viento, viento, viento))
+
+    def rango(self, ciudad, periodo, desde, hasta):
+        """Resúmenes de los periodos que se traslapan con [desde, hasta)"""
+        return self.datos.todos(RESUMENES_RANGO, (ciudad, periodo, inicio_periodo(desde, periodo), int(hasta)))
+
+
+# ----------------------------------------------------
+# CLIMA PUBLICADO
+# ----------------------------------------------------
+# Una lectura más vieja que la guardada no la reemplaza (líder anterior tardío)
+PUBLICADO_GUARDAR = Consulta('publicado_guardar', '''
+    INSERT INTO clima_publicado AS p (clave, datos, guardado) VALUES (%s, %s, %s)
+    ON CONFLICT (clave) DO UPDATE SET datos = EXCLUDED.datos, guardado = EXCLUDED.guardado
+    WHERE p.guardado < EXCLUDED.guardado
+''', mysql='''
+    INSERT INTO clima_publicado (clave, datos, guardado) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        datos = IF(VALUES(guardado) > guardado, VALUES(datos), datos),
+        guardado = GREATEST(guardado, VALUES(guardado))
+''')
+PUBLICADO_LEER = Consulta('publicado_leer', 'SELECT datos, guardado FROM clima_publicado WHERE clave = %s')
+
+
+class ClimaPublicado:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def guardar(self, clave, weather_data, guardado):
+        self.datos.ejecutar(PUBLICADO_GUARDAR, (clave, json.dumps(weather_data, ensure_ascii=False), guardado))
+
+    def leer(self, clave):
+        """(weather_data, guardado) de la clave o None"""
+        fila = self.datos.uno(PUBLICADO_LEER, (clave,))
+        return (json.loads(fila['datos']), float(fila['guardado'])) if fila else None
+
+
+# ----------------------------------------------------
+# CIUDADES
+# ----------------------------------------------------
+CIUDADES_ACTIVAS = Consulta('ciudades_activas',
+                            'SELECT id, nombre, lat, lon FROM ciudades WHERE activa = TRUE ORDER BY id')
+
+
+class Ciudades:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def activas(self):
+        return [dict(fila, lat=float(fila['lat']), lon=float(fila['lon']))
+                for fila in self.datos.todos(CIUDADES_ACTIVAS)]
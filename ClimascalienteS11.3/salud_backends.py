@@ -0,0 +1,110 @@
+"""Disponibilidad de cada backend de base de datos (PostgreSQL / MySQL).
+
+Cuando un backend falla al conectar se marca como caído y no se vuelve
+a intentar hasta que pase su espera (backoff exponencial: 1 s, 2 s,
+4 s... hasta un máximo). Mientras tanto las peticiones van directo al
+siguiente backend o responden sin base de datos, sin pagar el tiempo
+de conexión en cada una. Al vencer la espera un solo hilo prueba de
+nuevo; si conecta, el backend vuelve a estar disponible.
+
+Solo los cambios de estado se imprimen y se cuentan en las métricas.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+
+class SaludBackend:
+    """Estado de un backend: disponible o caído con backoff exponencial"""
+
+    def __init__(self, nombre, backoff_inicial=1.0, backoff_max=60.0):
+        self.nombre = nombre
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._caido_desde = None
+        self._reintento = 0.0
+        self._backoff = 0.0
+        self._prueba_en_curso = False
+        self._fallos = 0
+        self.caidas = 0
+        self.recuperaciones = 0
+        self.omitidas = 0
+        self.ultimo_error = None
+        # Últimos cambios de estado: (epoch, estado, detalle)
+        self.transiciones = deque(maxlen=10)
+
+    def disponible(self):
+        with self._lock:
+            return self._caido_desde is None
+
+    def permitir(self):
+        """Indica si se puede intentar conectar a este backend ahora"""
+        with self._lock:
+            if self._caido_desde is None:
+                return True
+            if time.monotonic() >= self._reintento and not self._prueba_en_curso:
+                # Un solo hilo hace la prueba; los demás siguen de largo
+                self._prueba_en_curso = True
+                return True
+            self.omitidas += 1
+            return False
+
+    def registrar_exito(self):
+        with self._lock:
+            if self._caido_desde is None:
+                return
+            caido = time.monotonic() - self._caido_desde
+            self._caido_desde = None
+            self._prueba_en_curso = False
+            self._fallos = 0
+            self._backoff = 0.0
+            self.recuperaciones += 1
+            self.transiciones.append((time.time(), 'disponible', f'tras {caido:.1f}s'))
+        print(f"✓ Base de datos {self.nombre} disponible de nuevo (caída {caido:.1f}s)")
+
+    def cancelar_prueba(self):
+        """Libera la prueba sin juzgar al backend (no se llegó a conectar, p. ej. pool lleno)"""
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self, error):
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+            self.ultimo_error = str(error).strip()
+            nueva_caida = self._caido_desde is None
+            if nueva_caida:
+                self._caido_desde = time.monotonic()
+                self._backoff = self.backoff_inicial
+                self.caidas += 1
+                self.transiciones.append((time.time(), 'caido', self.ultimo_error))
+            else:
+                self._backoff = min(self._backoff * 2, self.backoff_max)
+            # Variación aleatoria para que los workers no prueben todos a la vez
+            espera = self._backoff * random.uniform(0.8, 1.2)
+            self._reintento = time.monotonic() + espera
+        if nueva_caida:
+            print(f"⚠ Base de datos {self.nombre} no disponible: {self.ultimo_error}")
+        print(f"  Siguiente intento con {self.nombre} en {espera:.1f}s")
+
+    def estadisticas(self):
+        with self._lock:
+            ahora = time.monotonic()
+            caido = self._caido_desde is not None
+            return {
+                'backend': self.nombre,
+                'estado': 'caido' if caido else 'disponible',
+                'caido_segundos': round(ahora - self._caido_desde, 1) if caido else 0,
+                'siguiente_intento_segundos': round(max(self._reintento - ahora, 0), 1) if caido else 0,
+                'fallos_consecutivos': self._fallos,
+                'caidas': self.caidas,
+                'recuperaciones': self.recuperaciones,
+                'omitidas': self.omitidas,
+                'ultimo_error': self.ultimo_error,
+                'transiciones': [
+                    {'epoch': round(epoch, 3), 'estado': estado, 'detalle': detalle}
+                    for epoch, estado, detalle in self.transiciones
+                ],
+            }
@@ -0,0 +1,451 @@
+"""Consulta del clima actual en OpenWeatherMap.
+
+Las ubicaciones alternativas se consultan de forma escalonada (hedging):
+se lanza la primera y, si no responde en RETRASO_COBERTURA segundos, se
+lanza la siguiente sin cancelar la anterior. Gana la primera respuesta
+válida de Aguascalientes/MX y toda la búsqueda tiene un presupuesto
+máximo de tiempo. Un corta-circuitos evita llamar al API durante un
+periodo de enfriamiento tras varios fallos consecutivos.
+
+La última lectura válida se guarda en disco (SnapshotClima) para que los
+workers recién iniciados y las caídas del API sirvan datos reales.
+
+Las peticiones salen por un ClienteHTTP compartido (keep-alive,
+reintentos y límite de peticiones en vuelo por worker).
+
+Las demás ciudades de la región (ciudades.py) se piden juntas al
+endpoint /group de OpenWeatherMap, que recibe ids del propio API. El id
+de cada ciudad se aprende de su primera consulta por coordenadas.
+"""
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+from ciudades import CIUDAD_PREDETERMINADA, distancia_km
+from cliente_http import ClienteHTTP
+
+URL_API = os.environ.get('WEATHER_API_URL', 'https://api.openweathermap.org/data/2.5/weather')
+# Varias ciudades por llamada, por id de OpenWeatherMap
+URL_GRUPO = os.environ.get('WEATHER_GROUP_URL', URL_API.rsplit('/', 1)[0] + '/group')
+# Máximo de ids que acepta /group en una llamada
+MAX_POR_GRUPO = 20
+# Una lectura de un punto más lejos que esto de la ciudad pedida se descarta
+DISTANCIA_MAX_KM = float(os.environ.get('WEATHER_DISTANCIA_MAX_KM', 25))
+
+LOCATIONS = [
+    {'city': 'Aguascalientes', 'state': 'Ags', 'country': 'MX'},
+    {'city': 'Aguascalientes', 'state': '', 'country': 'MX'},
+    {'lat': 21.8853, 'lon': -102.2916}
+]
+
+# Tiempo total máximo para conseguir el clima (segundos)
+PRESUPUESTO = float(os.environ.get('WEATHER_PRESUPUESTO', 4))
+# Espera antes de lanzar la siguiente ubicación en paralelo
+RETRASO_COBERTURA = float(os.environ.get('WEATHER_COBERTURA', 0.5))
+
+cliente = ClienteHTTP(
+    'openweathermap',
+    conexiones=int(os.environ.get('WEATHER_HTTP_CONEXIONES', 10)),
+    timeout_conexion=float(os.environ.get('WEATHER_TIMEOUT_CONEXION', 2)),
+    timeout_lectura=float(os.environ.get('WEATHER_TIMEOUT_LECTURA', 4)),
+    reintentos=int(os.environ.get('WEATHER_REINTENTOS', 1)),
+    max_en_vuelo=int(os.environ.get('WEATHER_HTTP_MAX_EN_VUELO', 6))
+)
+
+
+class CortaCircuitos:
+    """Deja de llamar al servicio externo tras varios fallos seguidos.
+
+    cerrado -> se llama normalmente
+    abierto -> no se llama hasta que pase el enfriamiento
+    semiabierto -> se permite una sola prueba; si sale bien se cierra
+    """
+
+    def __init__(self, umbral_fallos=3, enfriamiento=60):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+        self.aperturas = 0
+        self.omitidas = 0
+
+    def estado(self):
+        with self._lock:
+            return self._estado()
+
+    def _estado(self):
+        if self._abierto_desde is None:
+            return 'cerrado'
+        if time.monotonic() - self._abierto_desde < self.enfriamiento:
+            return 'abierto'
+        return 'semiabierto'
+
+    def permitir(self):
+        """Indica si se puede llamar al servicio en este momento"""
+        with self._lock:
+            estado = self._estado()
+            if estado == 'cerrado':
+                return True
+            if estado == 'semiabierto' and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            self.omitidas += 1
+            return False
+
+    def registrar_exito(self):
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+            if self._abierto_desde is not None or self._fallos >= self.umbral_fallos:
+                if self._abierto_desde is None:
+                    self.aperturas += 1
+                self._abierto_desde = time.monotonic()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'estado': self._estado(),
+                'fallos_consecutivos': self._fallos,
+                'aperturas': self.aperturas,
+                'omitidas': self.omitidas,
+            }
+
+
+corta_circuitos = CortaCircuitos(
+    umbral_fallos=int(os.environ.get('WEATHER_BREAKER_FALLOS', 3)),
+    enfriamiento=int(os.environ.get('WEATHER_BREAKER_ENFRIAMIENTO', 60))
+)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _obtener_executor():
+    # Los hilos no sobreviven a un fork: cada proceso crea el suyo
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=len(LOCATIONS) * 2,
+                                           thread_name_prefix='clima')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def reiniciar():
+    """Olvida el executor y la sesión HTTP heredados del proceso padre"""
+    global _executor, _executor_pid
+    _executor = None
+    _executor_pid = None
+    cliente.reiniciar()
+
+
+def _parametros(location, api_key):
+    parametros = {'appid': api_key, 'units': 'metric', 'lang': 'es'}
+    if location is None:
+        return parametros
+    if 'lat' in location and 'lon' in location:
+        parametros['lat'] = location['lat']
+        parametros['lon'] = location['lon']
+    else:
+        parametros['q'] = f'{location["city"]},{location["country"]}'
+    return parametros
+
+
+def convertir_respuesta(data):
+    """Convierte la respuesta de OpenWeatherMap al formato de /api/weather"""
+    return {
+        'temperature': round(data['main']['temp']),
+        'feels_like': round(data['main']['feels_like']),
+        'humidity': data['main']['humidity'],
+        'pressure': data['main']['pressure'],
+        'wind_speed': round(data['wind']['speed'] * 3.6),
+        'description': data['weather'][0]['description'].capitalize(),
+        'icon': data['weather'][0]['icon'],
+        'city': data['name'],
+        'country': data['sys']['country'],
+        'source': 'OpenWeatherMap'
+    }
+
+
+def _consultar_ubicacion(location, api_key, limite):
+    """Hace una consulta; devuelve el clima si es de Aguascalientes/MX"""
+    if limite <= time.monotonic():
+        return None
+    response = cliente.get(URL_API, params=_parametros(location, api_key), limite=limite)
+    if response.status_code != 200:
+        return None
+    return _validar_respuesta(response.json())
+
+
+def _validar_respuesta(data):
+    city_name = data.get('name', '').lower()
+    country = data.get('sys', {}).get('country', '')
+    if ('aguascalientes' in city_name or 'ags' in city_name) and country == 'MX':
+        return dict(convertir_respuesta(data), city_id=CIUDAD_PREDETERMINADA)
+    return None
+
+
+def consultar_openweather(api_key):
+    """Consulta el clima actual de Aguascalientes en OpenWeatherMap.
+
+    Devuelve None si ninguna ubicación dio un resultado válido dentro del
+    presupuesto de tiempo o si el corta-circuitos está abierto. Al terminar
+    se cancelan las consultas que aún no empiezan.
+    """
+    if not corta_circuitos.permitir():
+        return None
+
+    executor = _obtener_executor()
+    limite = time.monotonic() + PRESUPUESTO
+    pendientes = set()
+    siguiente = 0
+    try:
+        while True:
+            if siguiente < len(LOCATIONS):
+                pendientes.add(executor.submit(_consultar_ubicacion, LOCATIONS[siguiente], api_key, limite))
+                siguiente += 1
+            if not pendientes:
+                break
+
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            # Si aún quedan ubicaciones, solo esperamos hasta la siguiente cobertura
+            espera = min(restante, RETRASO_COBERTURA) if siguiente < len(LOCATIONS) else restante
+            terminadas, pendientes = wait(pendientes, timeout=espera, return_when=FIRST_COMPLETED)
+
+            for futuro in terminadas:
+                try:
+                    weather_data = futuro.result()
+                except Exception:
+                    # Errores de red, JSON inválido o campos faltantes/vacíos (IndexError, TypeError...):
+                    # cualquier excepción que escape dejaría al corta-circuitos en prueba para siempre
+                    weather_data = None
+                if weather_data:
+                    corta_circuitos.registrar_exito()
+                    return weather_data
+    finally:
+        for futuro in pendientes:
+            futuro.cancel()
+
+    corta_circuitos.registrar_fallo()
+    return None
+
+
+async def _consultar_ubicacion_async(cliente, location, api_key, limite):
+    restante = limite - time.monotonic()
+    if restante <= 0:
+        return None
+    response = await cliente.get(URL_API, params=_parametros(location, api_key), timeout=restante)
+    if response.status_code != 200:
+        return None
+    return _validar_respuesta(response.json())
+
+
+async def consultar_openweather_async(cliente, api_key):
+    """consultar_openweather() con un cliente HTTP asíncrono (httpx.AsyncClient).
+
+    Mismo escalonamiento, presupuesto y corta-circuitos; al terminar se
+    cancelan las consultas que sigan pendientes.
+    """
+    if not corta_circuitos.permitir():
+        return None
+
+    limite = time.monotonic() + PRESUPUESTO
+    pendientes = set()
+    siguiente = 0
+    try:
+        while True:
+            if siguiente < len(LOCATIONS):
+                pendientes.add(asyncio.ensure_future(
+                    _consultar_ubicacion_async(cliente, LOCATIONS[siguiente], api_key, limite)))
+                siguiente += 1
+            if not pendientes:
+                break
+
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            espera = min(restante, RETRASO_COBERTURA) if siguiente < len(LOCATIONS) else restante
+            terminadas, pendientes = await asyncio.wait(pendientes, timeout=espera,
+                                                        return_when=asyncio.FIRST_COMPLETED)
+
+            for futuro in terminadas:
+                try:
+                    weather_data = futuro.result()
+                except Exception:
+                    # Errores de red del cliente asíncrono, JSON inválido o campos faltantes
+                    weather_data = None
+                if weather_data:
+                    corta_circuitos.registrar_exito()
+                    return weather_data
+    finally:
+        for futuro in pendientes:
+            futuro.cancel()
+
+    corta_circuitos.registrar_fallo()
+    return None
+
+
+_ciudades_lock = threading.Lock()
+contadores_ciudades = {
+    'llamadas_grupo': 0,
+    'llamadas_coordenadas': 0,
+    'ciudades_actualizadas': 0,
+    'ids_aprendidos': 0,
+    'ids_descartados': 0,
+}
+
+
+def _contar_ciudades(contador, cantidad=1):
+    with _ciudades_lock:
+        contadores_ciudades[contador] += cantidad
+
+
+def _lectura_de_ciudad(ciudad, data):
+    """Clima de la ciudad si la lectura es de un punto cercano a ella"""
+    try:
+        coordenadas = data['coord']
+        distancia = distancia_km(ciudad['lat'], ciudad['lon'], coordenadas['lat'], coordenadas['lon'])
+        if distancia > DISTANCIA_MAX_KM:
+            return None
+        return dict(convertir_respuesta(data), city=ciudad['nombre'], city_id=ciudad['id'])
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _llamar(url, parametros, contador):
+    """Una llamada al API con el corta-circuitos; devuelve el JSON o None"""
+    if not corta_circuitos.permitir():
+        return None
+    try:
+        response = cliente.get(url, params=parametros, limite=time.monotonic() + PRESUPUESTO)
+        if response.status_code != 200:
+            raise ValueError(f'HTTP {response.status_code}')
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"⚠ Error consultando {url}: {e}")
+        corta_circuitos.registrar_fallo()
+        return None
+    corta_circuitos.registrar_exito()
+    _contar_ciudades(contador)
+    return data
+
+
+def consultar_ciudades(ciudades, api_key, ids_openweather):
+    """Clima de varias ciudades con el menor número de llamadas al API.
+
+    Las ciudades con id de OpenWeatherMap conocido (ids_openweather, por
+    id de ciudad) se piden a /group en lotes de MAX_POR_GRUPO; las demás
+    por coordenadas, y el id que regresa el API se agrega a
+    ids_openweather. Un id cuya lectura no corresponde a la ciudad se
+    quita para volver a aprenderlo. Regresa {ciudad_id: weather_data}
+    solo con lecturas válidas.
+    """
+    resultado = {}
+    conocidas = [ciudad for ciudad in ciudades if ciudad['id'] in ids_openweather]
+    for inicio in range(0, len(conocidas), MAX_POR_GRUPO):
+        # Dos ciudades cercanas pueden compartir la estación (el mismo id)
+        lote = {}
+        for ciudad in conocidas[inicio:inicio + MAX_POR_GRUPO]:
+            lote.setdefault(ids_openweather[ciudad['id']], []).append(ciudad)
+        parametros = dict(_parametros(None, api_key), id=','.join(str(owm_id) for owm_id in lote))
+        data = _llamar(URL_GRUPO, parametros, 'llamadas_grupo')
+        if data is None:
+            continue
+        for item in data.get('list', []):
+            for ciudad in lote.get(item.get('id'), []):
+                weather_data = _lectura_de_ciudad(ciudad, item)
+                if weather_data:
+                    resultado[ciudad['id']] = weather_data
+        for ciudad in itertools.chain.from_iterable(lote.values()):
+            if ciudad['id'] not in resultado:
+                ids_openweather.pop(ciudad['id'], None)
+                _contar_ciudades('ids_descartados')
+
+    # Las que no tienen id (o se les acaba de quitar) van por coordenadas
+    for ciudad in ciudades:
+        if ciudad['id'] in resultado or ciudad['id'] in ids_openweather:
+            continue
+        data = _llamar(URL_API, _parametros(ciudad, api_key), 'llamadas_coordenadas')
+        weather_data = _lectura_de_ciudad(ciudad, data) if data else None
+        if weather_data:
+            resultado[ciudad['id']] = weather_data
+            if data.get('id'):
+                ids_openweather[ciudad['id']] = data['id']
+                _contar_ciudades('ids_aprendidos')
+
+    _contar_ciudades('ciudades_actualizadas', len(resultado))
+    return resultado
+
+
+class SnapshotClima:
+    """Última lectura válida del clima guardada en un archivo JSON.
+
+    El archivo se reemplaza de forma atómica y cada proceso mantiene una
+    copia en memoria que solo vuelve a leer cuando cambia en disco.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._marca = None
+        self._datos = None
+        self._lock = threading.Lock()
+
+    def guardar(self, weather_data, guardado=None):
+        directorio = os.path.dirname(self.ruta) or '.'
+        os.makedirs(directorio, exist_ok=True)
+        contenido = {'guardado': guardado or time.time(), 'clima': weather_data}
+        fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as archivo:
+                json.dump(contenido, archivo, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temporal, self.ruta)
+        except BaseException:
+            try:
+                os.unlink(temporal)
+            except OSError:
+                pass
+            raise
+
+    def leer(self):
+        """Devuelve (weather_data, guardado) o None si no hay snapshot"""
+        try:
+            estado = os.stat(self.ruta)
+        except OSError:
+            return None
+        # El inodo cambia con cada rename aunque el mtime quede igual
+        marca = (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+        with self._lock:
+            if marca != self._marca:
+                try:
+                    with open(self.ruta, encoding='utf-8') as archivo:
+                        contenido = json.load(archivo)
+                    self._datos = (contenido['clima'], contenido['guardado'])
+                    self._marca = marca
+                except (OSError, ValueError, KeyError):
+                    return self._datos
+            return self._datos
+
+
+def estadisticas():
+    with _ciudades_lock:
+        ciudades = dict(contadores_ciudades)
+    return {'corta_circuitos': corta_circuitos.estadisticas(), 'http': cliente.estadisticas(),
+            'ciudades': ciudades}
@@ -0,0 +1,192 @@
+"""Hash y verificación de contraseñas fuera del hilo de la petición.
+
+Calcular un hash (pbkdf2/scrypt) cuesta decenas de milisegundos de CPU.
+Cada worker manda ese trabajo a un pool de procesos propio con un
+límite de tareas en espera: si el pool está lleno no se forma una cola
+infinita, se lanza ServicioSaturado y la ruta responde 503. Lo mismo si
+una tarea no termina en `tiempo_maximo` segundos.
+
+El método de hash es configurable (scrypt por omisión);
+rehacer_en_fondo() detecta los hashes guardados con parámetros
+distintos a los actuales y calcula el reemplazo tras un inicio de
+sesión correcto sin que la petición espere el resultado.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class ServicioSaturado(Exception):
+    """No hay lugar en la cola de hash: el cliente debe reintentar más tarde"""
+
+
+def _generar(password, metodo):
+    return generate_password_hash(password, method=metodo)
+
+
+def _verificar(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class ServicioHash:
+    """Pool de procesos acotado para generar y verificar contraseñas"""
+
+    def __init__(self, metodo='scrypt', procesos=2, max_pendientes=8,
+                 espera_maxima=1.0, tiempo_maximo=10.0):
+        self.metodo = metodo
+        # procesos=0 calcula en el mismo hilo (útil en desarrollo)
+        self.procesos = procesos
+        self.max_pendientes = max_pendientes
+        self.espera_maxima = espera_maxima
+        self.tiempo_maximo = tiempo_maximo
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._cupo = threading.BoundedSemaphore(max_pendientes)
+        self._prefijo = None
+        self.contadores = {'generados': 0, 'verificados': 0, 'rehechos': 0,
+                           'rechazados': 0, 'vencidos': 0, 'errores': 0}
+        self.tiempo_total = 0.0
+        self.pendientes = 0
+
+    def _obtener_executor(self):
+        # Los procesos hijos no sobreviven a un fork: cada worker crea los suyos.
+        # Con spawn no heredan hilos, candados ni conexiones del worker
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+                self._cupo = threading.BoundedSemaphore(self.max_pendientes)
+                self.pendientes = 0
+            return self._executor
+
+    def _contar(self, contador, duracion=0.0):
+        with self._lock:
+            self.contadores[contador] += 1
+            self.tiempo_total += duracion
+
+    def _enviar(self, funcion, args, espera):
+        """Manda la tarea al pool si hay cupo; regresa (executor, futuro)"""
+        executor = self._obtener_executor()
+        cupo = self._cupo
+        if not cupo.acquire(timeout=espera):
+            self._contar('rechazados')
+            raise ServicioSaturado('La cola de hash de contraseñas está llena')
+        with self._lock:
+            self.pendientes += 1
+
+        def liberar(_futuro):
+            with self._lock:
+                self.pendientes -= 1
+            cupo.release()
+
+        try:
+            futuro = executor.submit(funcion, *args)
+        except BaseException:
+            liberar(None)
+            raise
+        # El cupo se libera al terminar la tarea, aunque se venza la espera
+        futuro.add_done_callback(liberar)
+        return executor, futuro
+
+    def _descartar_executor(self, executor):
+        # Un hijo murió: se recrea el pool en la siguiente llamada
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        self._contar('errores')
+
+    def _ejecutar(self, funcion, *args):
+        if self.procesos <= 0:
+            return funcion(*args)
+
+        executor, futuro = self._enviar(funcion, args, self.espera_maxima)
+        try:
+            return futuro.result(timeout=self.tiempo_maximo)
+        except TiempoAgotado:
+            # La tarea sigue en el pool y ocupa su cupo hasta que termine
+            self._contar('vencidos')
+            raise ServicioSaturado('El hash de la contraseña tardó demasiado')
+        except BrokenProcessPool:
+            self._descartar_executor(executor)
+            raise
+
+    def generar(self, password):
+        """Hash de la contraseña con el método actual"""
+        inicio = time.perf_counter()
+        password_hash = self._ejecutar(_generar, password, self.metodo)
+        self._contar('generados', time.perf_counter() - inicio)
+        return password_hash
+
+    def verificar(self, password_hash, password):
+        """Compara la contraseña con el hash guardado"""
+        inicio = time.perf_counter()
+        correcta = self._ejecutar(_verificar, password_hash, password)
+        self._contar('verificados', time.perf_counter() - inicio)
+        return correcta
+
+    def rehacer_en_fondo(self, password_hash, password, guardar):
+        """Si el hash guardado usa otros parámetros, calcula el nuevo sin esperarlo.
+
+        guardar(nuevo) se llama al terminar, desde el hilo del pool. Si la
+        cola está llena no se espera cupo: se intentará en el siguiente
+        inicio de sesión. Regresa True si se mandó a calcular. Solo debe
+        llamarse después de verificar la contraseña.
+        """
+        if not self.necesita_rehash(password_hash):
+            return False
+        inicio = time.perf_counter()
+        if self.procesos <= 0:
+            nuevo = _generar(password, self.metodo)
+            self._contar('rehechos', time.perf_counter() - inicio)
+            guardar(nuevo)
+            return True
+
+        try:
+            executor, futuro = self._enviar(_generar, (password, self.metodo), 0)
+        except ServicioSaturado:
+            return False
+
+        def terminar(futuro):
+            try:
+                nuevo = futuro.result()
+            except BrokenProcessPool:
+                self._descartar_executor(executor)
+                return
+            except Exception as e:
+                print(f"⚠ Error rehaciendo el hash de una contraseña: {e}")
+                self._contar('errores')
+                return
+            self._contar('rehechos', time.perf_counter() - inicio)
+            try:
+                guardar(nuevo)
+            except Exception as e:
+                print(f"⚠ Error guardando el hash rehecho: {e}")
+
+        futuro.add_done_callback(terminar)
+        return True
+
+    def necesita_rehash(self, password_hash):
+        """True si el hash se generó con parámetros distintos a los actuales"""
+        if self._prefijo is None:
+            # 'scrypt' se guarda como 'scrypt:32768:8:1': se toma el prefijo real
+            self._prefijo = _generar('', self.metodo).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefijo
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self.contadores)
+            datos['pendientes'] = self.pendientes
+            operaciones = datos['generados'] + datos['verificados'] + datos['rehechos']
+            datos['ms_promedio'] = round(self.tiempo_total * 1000 / operaciones, 2) if operaciones else 0.0
+        datos['metodo'] = self.metodo
+        datos['procesos'] = self.procesos
+        datos['max_pendientes'] = self.max_pendientes
+        return datos
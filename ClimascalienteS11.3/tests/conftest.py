@@ -0,0 +1,19 @@
+"""Configuración de las pruebas que importan app.py"""
+import os
+import tempfile
+
+import pytest
+
+# app.py lee su configuración al importarse: sin refresco programado ni
+# pool de procesos de hash, y con las cachés en un directorio temporal
+os.environ.setdefault('WEATHER_POLLER_INTERVALO', '0')
+os.environ.setdefault('PASSWORD_HASH_PROCESOS', '0')
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='climas_pruebas_'))
+
+
+@pytest.fixture
+def aplicacion(monkeypatch):
+    """app.py sin las tareas de fondo del primer request (migraciones, planificador)"""
+    import app
+    monkeypatch.setitem(app.app.before_request_funcs, None, [])
+    return app
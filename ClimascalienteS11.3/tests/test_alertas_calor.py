@@ -0,0 +1,58 @@
+"""MotorAlertas: reglas de calor y consejos por etiqueta"""
+import pytest
+
+from alertas_calor import MotorAlertas, Regla
+
+CONSEJOS = [
+    {'id': 1, 'titulo': 'Hidratación', 'descripcion': 'Toma agua', 'icono': 'agua', 'etiquetas': 'Calor, Verano'},
+    {'id': 2, 'titulo': 'Protector', 'descripcion': 'Usa protector', 'icono': 'sol', 'etiquetas': 'Radiación'},
+    {'id': 3, 'titulo': 'Abrígate', 'descripcion': 'Usa chamarra', 'icono': 'frio', 'etiquetas': 'Frío'},
+    {'id': 4, 'titulo': 'Sin etiquetas', 'descripcion': '', 'icono': '', 'etiquetas': None},
+]
+
+
+@pytest.mark.parametrize('clima, nivel', [
+    ({'temperature': 22, 'feels_like': 22, 'humidity': 40, 'icon': '04n'}, 'normal'),
+    ({'temperature': 26, 'feels_like': 26, 'humidity': 40, 'icon': '01d'}, 'precaucion'),
+    ({'temperature': 34, 'feels_like': 31, 'humidity': 15, 'icon': '03n'}, 'alerta'),
+    ({'temperature': 31, 'feels_like': 36, 'humidity': 70, 'icon': '10d'}, 'alerta'),
+    ({'temperature': 40, 'feels_like': 39, 'humidity': 10, 'icon': '01d'}, 'peligro'),
+    # Sin los campos de una regla, esa regla no aplica
+    ({'temperature': 30, 'humidity': 10}, 'normal'),
+])
+def test_nivel(clima, nivel):
+    assert MotorAlertas().evaluar(clima)['level'] == nivel
+
+
+def test_motivos_y_etiquetas_sin_repetir():
+    alerta = MotorAlertas().evaluar({'temperature': 40, 'feels_like': 39, 'humidity': 10, 'icon': '01d'})
+    assert alerta['rank'] == 3
+    assert alerta['reasons'][0] == 'Temperatura de 40 °C'
+    assert len(alerta['reasons']) == len(set(alerta['reasons']))
+    assert len(alerta['tags']) == len(set(alerta['tags']))
+    assert 'Radiación' in alerta['tags']
+
+
+def test_rangos_con_extremos_incluidos():
+    regla = Regla('alerta', 'x', [], temperature=(30, 35))
+    assert regla.aplica({'temperature': 30})
+    assert regla.aplica({'temperature': 35})
+    assert not regla.aplica({'temperature': 35.1})
+
+
+def test_consejos_por_etiqueta():
+    elegidos = MotorAlertas().consejos(['Calor', 'Radiación'], CONSEJOS)
+    assert [consejo['id'] for consejo in elegidos] == [1, 2]
+    assert set(elegidos[0]) == {'id', 'titulo', 'descripcion', 'icono'}
+
+
+def test_consejos_se_reutilizan_con_la_misma_lista():
+    motor = MotorAlertas()
+    primera = motor.consejos(['Calor'], CONSEJOS)
+    assert motor.consejos(['Calor'], CONSEJOS) is primera
+    # El caché del catálogo reemplaza la lista cuando cambia la tabla
+    nueva = CONSEJOS + [{'id': 5, 'titulo': 'Sombra', 'descripcion': '', 'icono': '', 'etiquetas': 'Calor'}]
+    assert [consejo['id'] for consejo in motor.consejos(['Calor'], nueva)] == [1, 5]
+    datos = motor.estadisticas()
+    assert datos['consejos_calculados'] == 2
+    assert datos['consejos_reutilizados'] == 1
@@ -0,0 +1,154 @@
+"""CacheCatalogo y EscuchaNotificaciones con una fuente de versiones falsa"""
+import os
+import time
+from types import SimpleNamespace
+
+from cache_catalogo import CacheCatalogo, EscuchaNotificaciones
+
+
+class VersionesFalsas:
+    def __init__(self, **versiones):
+        self.versiones = {tabla: (version, 1700000000) for tabla, version in versiones.items()}
+        self.lecturas = 0
+
+    def __call__(self):
+        self.lecturas += 1
+        return dict(self.versiones)
+
+
+def crear_cache(**versiones):
+    fuente = VersionesFalsas(**versiones)
+    return CacheCatalogo(fuente, intervalo_revision=0), fuente
+
+
+def test_guarda_y_sirve_mientras_no_cambie_la_version():
+    cache, _fuente = crear_cache(consejos=1)
+    assert cache.obtener('consejos') is None
+    cache.guardar('consejos', cache.version('consejos'), ['a'], '["a"]')
+    assert cache.obtener('consejos') == (['a'], '["a"]')
+    assert cache.modificado('consejos') == 1700000000
+
+
+def test_nueva_version_invalida():
+    cache, fuente = crear_cache(consejos=1)
+    cache.guardar('consejos', cache.version('consejos'), ['a'], '["a"]')
+    fuente.versiones['consejos'] = (2, 1700000100)
+    assert cache.obtener('consejos') is None
+    assert cache.version('consejos') == 2
+    assert cache.estadisticas()['invalidaciones'] == 1
+
+
+def test_no_guarda_si_la_version_cambio_durante_la_lectura():
+    cache, fuente = crear_cache(consejos=1)
+    version = cache.version('consejos')
+    # Otro worker cambió la tabla mientras se leía
+    fuente.versiones['consejos'] = (2, 1700000100)
+    cache.version('consejos')
+    cache.guardar('consejos', version, ['viejo'], '["viejo"]')
+    assert cache.obtener('consejos') is None
+
+
+def test_revision_limitada_por_intervalo():
+    fuente = VersionesFalsas(consejos=1)
+    cache = CacheCatalogo(fuente, intervalo_revision=60)
+    for _ in range(5):
+        cache.version('consejos')
+    assert fuente.lecturas == 1
+
+
+def test_invalidar_con_y_sin_version():
+    cache, fuente = crear_cache(consejos=1)
+    cache.guardar('consejos', cache.version('consejos'), ['a'], '["a"]')
+    # Cambio hecho en este proceso: ya trae la versión nueva
+    cache.invalidar('consejos', 5, 1700000500)
+    assert cache._versiones['consejos'] == 5
+    assert cache.modificado('consejos') == 1700000500
+
+    # Sin versión se vuelve a consultar la fuente
+    cache.invalidar('consejos')
+    fuente.versiones['consejos'] = (6, 1700000600)
+    assert cache.version('consejos') == 6
+
+
+def test_copias_que_vencen():
+    cache, _fuente = crear_cache(frases=1)
+    cache.guardar('frases', cache.version('frases'), {'id': 1}, '{}', vence=time.time() - 1)
+    assert cache.obtener('frases') is None
+    cache.ttl = 0
+    cache.guardar('frases', cache.version('frases'), {'id': 1}, '{}')
+    assert cache.obtener('frases') is None
+
+
+def test_hilo_de_revision_en_lugar_de_revisar_al_leer():
+    fuente = VersionesFalsas(consejos=1)
+    cache = CacheCatalogo(fuente, intervalo_revision=0)
+    cache.iniciar_revision()
+    try:
+        limite = time.monotonic() + 5
+        while cache._versiones.get('consejos') != 1 and time.monotonic() < limite:
+            time.sleep(0.01)
+        lecturas = fuente.lecturas
+        for _ in range(20):
+            cache.obtener('consejos')
+            cache.version('consejos')
+        # Las lecturas no consultan la fuente (el hilo revisa cada segundo)
+        assert fuente.lecturas - lecturas <= 1
+        fuente.versiones['consejos'] = (2, 1700000100)
+        limite = time.monotonic() + 5
+        while cache.version('consejos') != 2 and time.monotonic() < limite:
+            time.sleep(0.05)
+        assert cache.version('consejos') == 2
+    finally:
+        cache._revision_pid = None
+
+
+class ConexionEscucha:
+    """Conexión de psycopg2 con LISTEN: un pipe avisa que hay notificaciones"""
+
+    def __init__(self):
+        self._leer, self._escribir = os.pipe()
+        self.notifies = []
+        self._pendientes = []
+        self.autocommit = False
+        self.ejecutadas = []
+
+    def fileno(self):
+        return self._leer
+
+    def cursor(self):
+        return SimpleNamespace(execute=self.ejecutadas.append)
+
+    def poll(self):
+        os.read(self._leer, 1024)
+        self.notifies.extend(self._pendientes)
+        self._pendientes.clear()
+
+    def avisar(self, payload):
+        self._pendientes.append(SimpleNamespace(payload=payload))
+        os.write(self._escribir, b'.')
+
+
+def test_escucha_notify_invalida_al_instante():
+    cache, _fuente = crear_cache(consejos=1)
+    cache.intervalo_revision = 60
+    cache.guardar('consejos', cache.version('consejos'), ['a'], '["a"]')
+    conexion = ConexionEscucha()
+    escucha = EscuchaNotificaciones(cache, lambda: conexion)
+    escucha.iniciar()
+    try:
+        limite = time.monotonic() + 5
+        while not escucha.activa() and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert escucha.activa()
+        assert conexion.ejecutadas == ['LISTEN catalogo']
+        cache.guardar('consejos', cache.version('consejos'), ['a'], '["a"]')
+
+        conexion.avisar('consejos:7:1700000700')
+        limite = time.monotonic() + 5
+        while cache._versiones.get('consejos') != 7 and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert cache.version('consejos') == 7
+        assert cache.modificado('consejos') == 1700000700
+        assert cache.obtener('consejos') is None
+    finally:
+        escucha._pid = None
@@ -0,0 +1,120 @@
+"""CacheArchivo: caché en archivos compartida entre procesos"""
+import os
+import time
+
+import pytest
+
+import cache_compartido
+from cache_compartido import CacheArchivo, _Candado
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheArchivo('prueba', ttl=60, ttl_obsoleto=60, directorio=str(tmp_path))
+
+
+def test_guardar_y_leer(cache):
+    guardado = cache.guardar('clima', {'temperature': 22})
+    assert cache.leer('clima') == ({'temperature': 22}, guardado)
+    assert cache.leer('otra') is None
+
+
+def test_obtener_calcula_una_vez(cache):
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        return {'temperature': 22}
+
+    assert cache.obtener('clima', calcular) == {'temperature': 22}
+    assert cache.obtener('clima', calcular) == {'temperature': 22}
+    assert len(llamadas) == 1
+    assert cache.contadores['fallos'] == 1
+    assert cache.contadores['aciertos'] == 1
+
+
+def test_obtener_sin_calcular_solo_lee(cache):
+    assert cache.obtener('clima', None) is None
+    assert cache.leer('clima') is None
+
+
+def test_calculo_fallido_no_se_guarda(cache):
+    def falla():
+        raise RuntimeError('API caída')
+
+    assert cache.obtener('clima', falla) is None
+    assert cache.obtener('clima', lambda: None) is None
+    assert cache.leer('clima') is None
+    assert cache.contadores['errores'] == 2
+
+
+def test_valor_obsoleto_se_sirve_y_el_vencido_no(cache):
+    cache.sembrar('clima', {'temperature': 20}, time.time() - 90)
+    assert cache.obtener('clima', None) == {'temperature': 20}
+    assert cache.contadores['aciertos_obsoletos'] == 1
+
+    cache.sembrar('viejo', {'temperature': 18}, time.time() - 200)
+    assert cache.obtener('viejo', None) is None
+
+
+def test_sembrar_no_reemplaza_un_valor_mas_reciente(cache):
+    guardado = cache.guardar('clima', {'temperature': 25})
+    cache.sembrar('clima', {'temperature': 20}, guardado - 30)
+    assert cache.leer('clima') == ({'temperature': 25}, guardado)
+    cache.sembrar('clima', {'temperature': 26}, guardado + 1)
+    assert cache.leer('clima') == ({'temperature': 26}, guardado + 1)
+
+
+def test_reescritura_con_el_mismo_mtime_se_detecta(cache):
+    cache.guardar('clima', {'temperature': 20})
+    assert cache.leer('clima')[0] == {'temperature': 20}
+    ruta = cache._ruta('clima')
+    anterior = os.stat(ruta)
+    cache.guardar('clima', {'temperature': 21})
+    # Sistema de archivos con mtime de baja resolución
+    os.utime(ruta, ns=(anterior.st_atime_ns, anterior.st_mtime_ns))
+    assert cache.leer('clima')[0] == {'temperature': 21}
+
+
+def test_escritura_fallida_no_deja_temporales(cache):
+    cache.guardar('clima', {'temperature': 20})
+    with pytest.raises(TypeError):
+        cache.guardar('clima', {'temperature': object()})
+    assert os.listdir(cache.directorio) == ['clima.json']
+    assert cache.leer('clima')[0] == {'temperature': 20}
+
+
+@pytest.mark.skipif(cache_compartido.fcntl is None, reason='sin flock')
+def test_candado_espera_cediendo_con_sleep(tmp_path, monkeypatch):
+    fcntl = cache_compartido.fcntl
+    ruta = str(tmp_path / 'clima.lock')
+    # Otro proceso (otra descripción de archivo) tiene el candado
+    otro = open(ruta, 'a')
+    fcntl.flock(otro.fileno(), fcntl.LOCK_EX)
+    esperas = []
+
+    def dormir(segundos):
+        # Con gevent time.sleep cede el worker; un flock bloqueante no
+        esperas.append(segundos)
+        if len(esperas) == 3:
+            fcntl.flock(otro.fileno(), fcntl.LOCK_UN)
+
+    monkeypatch.setattr(cache_compartido.time, 'sleep', dormir)
+    candado = _Candado(ruta)
+    assert candado.adquirir()
+    assert esperas == [0.005, 0.01, 0.02]
+    candado.liberar()
+    otro.close()
+
+
+@pytest.mark.skipif(cache_compartido.fcntl is None, reason='sin flock')
+def test_candado_sin_bloquear_no_espera(tmp_path):
+    fcntl = cache_compartido.fcntl
+    ruta = str(tmp_path / 'clima.lock')
+    with open(ruta, 'a') as otro:
+        fcntl.flock(otro.fileno(), fcntl.LOCK_EX)
+        assert not _Candado(ruta).adquirir(bloquear=False)
+    # Se liberó también el candado entre hilos
+    candado = _Candado(ruta)
+    assert candado.adquirir(bloquear=False)
+    candado.liberar()
@@ -0,0 +1,101 @@
+"""IndiceCiudades: ciudad más cercana con la rejilla, y su carga desde la base de datos"""
+import contextlib
+import math
+import random
+
+import pytest
+
+from ciudades import CIUDADES, IndiceCiudades, distancia_km
+
+
+def cercana_por_fuerza_bruta(lat, lon):
+    return min(CIUDADES, key=lambda ciudad: distancia_km(lat, lon, ciudad['lat'], ciudad['lon']))
+
+
+def test_distancia_km():
+    assert distancia_km(21.8853, -102.2916, 21.8853, -102.2916) == 0
+    # Aguascalientes - Calvillo, unos 44 km en línea recta
+    assert 40 < distancia_km(21.8853, -102.2916, 21.8467, -102.7186) < 48
+
+
+def test_cada_ciudad_es_la_mas_cercana_a_si_misma():
+    indice = IndiceCiudades(CIUDADES)
+    for ciudad in CIUDADES:
+        encontrada, distancia = indice.cercana(ciudad['lat'], ciudad['lon'])
+        assert encontrada['id'] == ciudad['id']
+        assert distancia == pytest.approx(0, abs=1e-6)
+
+
+@pytest.mark.parametrize('celda_km', [2, 10, 50])
+def test_igual_que_la_fuerza_bruta(celda_km):
+    indice = IndiceCiudades(CIUDADES, celda_km=celda_km)
+    azar = random.Random(7)
+    for _ in range(500):
+        # La región y sus alrededores, incluso puntos fuera de la rejilla
+        lat = azar.uniform(21.0, 23.2)
+        lon = azar.uniform(-103.4, -101.2)
+        encontrada, distancia = indice.cercana(lat, lon)
+        esperada = cercana_por_fuerza_bruta(lat, lon)
+        esperada_km = distancia_km(lat, lon, esperada['lat'], esperada['lon'])
+        # Empates dentro del error de la proyección plana
+        assert encontrada['id'] == esperada['id'] or math.isclose(distancia, esperada_km, rel_tol=0.01)
+
+
+def test_obtener_por_id():
+    indice = IndiceCiudades(CIUDADES)
+    assert indice.obtener('calvillo')['nombre'] == 'Calvillo'
+    assert indice.obtener('no-existe') is None
+
+
+class DatosCiudades:
+    """Datos() falso con solo el repositorio de ciudades"""
+
+    filas = []
+
+    def __init__(self, conexion):
+        self.ciudades = self
+
+    def activas(self):
+        return [dict(fila) for fila in self.filas]
+
+
+@pytest.fixture
+def base_de_ciudades(aplicacion, monkeypatch):
+    @contextlib.contextmanager
+    def obtener_conexion(lectura=False):
+        yield object()
+
+    monkeypatch.setattr(aplicacion, 'obtener_conexion', obtener_conexion)
+    monkeypatch.setattr(aplicacion, 'Datos', DatosCiudades)
+    monkeypatch.setattr(aplicacion, 'indice_ciudades', aplicacion.indice_ciudades)
+    return DatosCiudades
+
+
+def test_cargar_ciudades_de_la_tabla(aplicacion, base_de_ciudades, monkeypatch):
+    nueva = {'id': 'villa-juarez', 'nombre': 'Villa Juárez', 'lat': 22.10, 'lon': -102.06}
+    activas = [ciudad for ciudad in CIUDADES if ciudad['id'] != 'calvillo'] + [nueva]
+    monkeypatch.setattr(base_de_ciudades, 'filas', activas)
+    assert aplicacion.cargar_ciudades() is True
+    assert aplicacion.indice_ciudades.obtener('villa-juarez')['nombre'] == 'Villa Juárez'
+    # Una ciudad desactivada deja de encontrarse
+    assert aplicacion.indice_ciudades.obtener('calvillo') is None
+    ciudad, _, error = aplicacion.ciudad_de_peticion({'city': 'calvillo'})
+    assert error == ('Ciudad desconocida', 404)
+
+
+def test_sin_la_ciudad_predeterminada_conserva_las_incluidas(aplicacion, base_de_ciudades, monkeypatch):
+    monkeypatch.setattr(base_de_ciudades, 'filas', [c for c in CIUDADES if c['id'] != 'aguascalientes'])
+    anterior = aplicacion.indice_ciudades
+    assert aplicacion.cargar_ciudades() is False
+    assert aplicacion.indice_ciudades is anterior
+
+
+def test_sin_base_de_datos_conserva_las_incluidas(aplicacion, monkeypatch):
+    @contextlib.contextmanager
+    def sin_conexion(lectura=False):
+        yield None
+
+    monkeypatch.setattr(aplicacion, 'obtener_conexion', sin_conexion)
+    monkeypatch.setattr(aplicacion, 'indice_ciudades', aplicacion.indice_ciudades)
+    assert aplicacion.cargar_ciudades() is False
+    assert aplicacion.indice_ciudades.obtener('calvillo')['nombre'] == 'Calvillo'
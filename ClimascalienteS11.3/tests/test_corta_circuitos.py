@@ -0,0 +1,71 @@
+"""CortaCircuitos del API del clima"""
+import servicio_clima
+from servicio_clima import CortaCircuitos
+
+
+def test_se_abre_tras_el_umbral_de_fallos():
+    corta = CortaCircuitos(umbral_fallos=3, enfriamiento=60)
+    for _ in range(2):
+        corta.registrar_fallo()
+        assert corta.estado() == 'cerrado'
+        assert corta.permitir()
+    corta.registrar_fallo()
+    assert corta.estado() == 'abierto'
+    assert not corta.permitir()
+    assert corta.estadisticas()['aperturas'] == 1
+    assert corta.estadisticas()['omitidas'] == 1
+
+
+def test_un_exito_reinicia_los_fallos():
+    corta = CortaCircuitos(umbral_fallos=3, enfriamiento=60)
+    corta.registrar_fallo()
+    corta.registrar_fallo()
+    corta.registrar_exito()
+    corta.registrar_fallo()
+    assert corta.estado() == 'cerrado'
+    assert corta.estadisticas()['fallos_consecutivos'] == 1
+
+
+def test_semiabierto_permite_una_sola_prueba():
+    corta = CortaCircuitos(umbral_fallos=1, enfriamiento=0)
+    corta.registrar_fallo()
+    assert corta.estado() == 'semiabierto'
+    assert corta.permitir()
+    assert not corta.permitir()
+
+
+def test_prueba_exitosa_cierra():
+    corta = CortaCircuitos(umbral_fallos=1, enfriamiento=0)
+    corta.registrar_fallo()
+    assert corta.permitir()
+    corta.registrar_exito()
+    assert corta.estado() == 'cerrado'
+    assert corta.permitir()
+    assert corta.permitir()
+
+
+def test_prueba_fallida_vuelve_a_abrir():
+    corta = CortaCircuitos(umbral_fallos=1, enfriamiento=0)
+    corta.registrar_fallo()
+    assert corta.permitir()
+    corta.enfriamiento = 60
+    corta.registrar_fallo()
+    assert corta.estado() == 'abierto'
+    assert not corta.permitir()
+    # Reabrir no cuenta como una apertura nueva
+    assert corta.estadisticas()['aperturas'] == 1
+
+
+def test_error_inesperado_de_una_ubicacion_cuenta_como_fallo(monkeypatch):
+    corta = CortaCircuitos(umbral_fallos=1, enfriamiento=0)
+    corta.registrar_fallo()
+    monkeypatch.setattr(servicio_clima, 'corta_circuitos', corta)
+    monkeypatch.setattr(servicio_clima, 'RETRASO_COBERTURA', 0.01)
+
+    def respuesta_incompleta(location, api_key, limite):
+        raise IndexError('weather vacío')
+
+    monkeypatch.setattr(servicio_clima, '_consultar_ubicacion', respuesta_incompleta)
+    # La prueba del semiabierto termina en fallo y no queda en curso para siempre
+    assert servicio_clima.consultar_openweather('clave') is None
+    assert corta.permitir()
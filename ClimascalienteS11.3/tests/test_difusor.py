@@ -0,0 +1,82 @@
+"""Difusor: reparto del clima por Server-Sent Events"""
+import asyncio
+import json
+import time
+
+from difusor import Difusor
+
+
+def crear_difusor(keepalive=0.2):
+    actual = {'lectura': ({'temperature': 20}, 1000.0)}
+    difusor = Difusor('prueba', lambda: actual['lectura'], intervalo_revision=0.01, keepalive=keepalive)
+    return difusor, actual
+
+
+def evento(mensaje):
+    id_linea, datos_linea = mensaje.strip().split('\n')
+    return id_linea[len('id: '):], json.loads(datos_linea[len('data: '):])
+
+
+def test_envia_el_valor_actual_al_suscribirse():
+    difusor, _actual = crear_difusor()
+    mensajes = difusor.suscribir()
+    assert next(mensajes).startswith('retry: ')
+    assert evento(next(mensajes)) == ('1000000', {'temperature': 20})
+    assert difusor.estadisticas()['suscriptores'] == 1
+    mensajes.close()
+    assert difusor.estadisticas()['suscriptores'] == 0
+
+
+def test_despierta_al_publicar():
+    difusor, actual = crear_difusor(keepalive=5)
+    mensajes = difusor.suscribir()
+    next(mensajes)
+    next(mensajes)
+    actual['lectura'] = ({'temperature': 25}, 1060.0)
+    inicio = time.monotonic()
+    # Sin esperar al keepalive: el vigilante notifica a los suscriptores
+    assert evento(next(mensajes)) == ('1060000', {'temperature': 25})
+    assert time.monotonic() - inicio < 2
+    mensajes.close()
+
+
+def test_mismo_valor_no_se_reenvia():
+    difusor, actual = crear_difusor()
+    mensajes = difusor.suscribir()
+    next(mensajes)
+    next(mensajes)
+    # Otra marca con el mismo contenido no es un cambio
+    actual['lectura'] = ({'temperature': 20}, 1060.0)
+    assert next(mensajes) == ': keepalive\n\n'
+    mensajes.close()
+
+
+def test_reanuda_desde_last_event_id():
+    difusor, _actual = crear_difusor()
+    mensajes = difusor.suscribir('1000000')
+    next(mensajes)
+    # Ya tiene el valor actual: solo keepalive
+    assert next(mensajes) == ': keepalive\n\n'
+    mensajes.close()
+
+    # Con un id anterior recibe el valor actual de inmediato
+    mensajes = difusor.suscribir('999000')
+    next(mensajes)
+    assert evento(next(mensajes))[0] == '1000000'
+    mensajes.close()
+
+
+def test_suscribir_async():
+    difusor, actual = crear_difusor()
+
+    async def recibir():
+        mensajes = difusor.suscribir_async('1000000')
+        recibidos = [await mensajes.__anext__()]
+        actual['lectura'] = ({'temperature': 30}, 1120.0)
+        recibidos.append(await mensajes.__anext__())
+        await mensajes.aclose()
+        return recibidos
+
+    retry, mensaje = asyncio.run(asyncio.wait_for(recibir(), 5))
+    assert retry.startswith('retry: ')
+    assert evento(mensaje) == ('1120000', {'temperature': 30})
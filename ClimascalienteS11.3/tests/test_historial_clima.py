@@ -0,0 +1,132 @@
+"""Resúmenes por hora y por día del historial del clima y su escritura en fondo"""
+import os
+import queue
+import sqlite3
+import threading
+
+import pytest
+
+import repositorio
+from repositorio import Historial, inicio_periodo
+
+MIGRACION = os.path.join(os.path.dirname(__file__), '..', 'migraciones', 'postgresql', '0010_historial_clima.sql')
+
+# 2024-06-01 00:00 en el centro de México (UTC-6)
+MEDIANOCHE = 1717221600
+
+
+class DatosSqlite:
+    """Datos() sobre SQLite con el SQL de PostgreSQL (mismo upsert con ON CONFLICT)"""
+
+    def __init__(self):
+        self.conexion = sqlite3.connect(':memory:')
+        self.conexion.row_factory = sqlite3.Row
+        # LEAST y GREATEST de PostgreSQL son min y max de SQLite
+        self.conexion.create_function('LEAST', 2, min)
+        self.conexion.create_function('GREATEST', 2, max)
+        with open(MIGRACION, encoding='utf-8') as archivo:
+            self.conexion.executescript(archivo.read())
+        self.historial = Historial(self)
+
+    def ejecutar(self, consulta, parametros=()):
+        return self.conexion.execute(consulta.sql.replace('%s', '?'), parametros).rowcount
+
+    def todos(self, consulta, parametros=()):
+        filas = self.conexion.execute(consulta.sql.replace('%s', '?'), parametros).fetchall()
+        return [dict(fila) for fila in filas]
+
+
+def lectura(temperatura, humedad, viento):
+    return {'temperature': temperatura, 'humidity': humedad, 'wind_speed': viento,
+            'feels_like': temperatura, 'pressure': 1015, 'description': 'cielo claro'}
+
+
+@pytest.fixture
+def datos():
+    return DatosSqlite()
+
+
+def test_inicio_de_periodo_con_la_zona_del_historial():
+    assert repositorio.HISTORIAL_UTC_OFFSET == -6 * 3600
+    assert inicio_periodo(MEDIANOCHE, 'dia') == MEDIANOCHE
+    assert inicio_periodo(MEDIANOCHE + 86399, 'dia') == MEDIANOCHE
+    assert inicio_periodo(MEDIANOCHE - 1, 'dia') == MEDIANOCHE - 86400
+    assert inicio_periodo(MEDIANOCHE + 5400, 'hora') == MEDIANOCHE + 3600
+
+
+def test_cada_observacion_se_suma_a_su_hora_y_a_su_dia(datos):
+    datos.historial.registrar('calvillo', MEDIANOCHE + 600, lectura(20.0, 40, 2.0))
+    datos.historial.registrar('calvillo', MEDIANOCHE + 1200, lectura(24.0, 30, 4.0))
+    datos.historial.registrar('calvillo', MEDIANOCHE + 4000, lectura(30.0, 20, 1.0))
+
+    horas = datos.historial.rango('calvillo', 'hora', MEDIANOCHE, MEDIANOCHE + 86400)
+    assert [(hora['inicio'], hora['muestras']) for hora in horas] == [(MEDIANOCHE, 2), (MEDIANOCHE + 3600, 1)]
+    assert (horas[0]['temp_min'], horas[0]['temp_max'], horas[0]['temp_suma']) == (20.0, 24.0, 44.0)
+    assert (horas[0]['humedad_min'], horas[0]['humedad_max']) == (30, 40)
+
+    [dia] = datos.historial.rango('calvillo', 'dia', MEDIANOCHE, MEDIANOCHE + 86400)
+    assert dia['muestras'] == 3
+    assert (dia['temp_min'], dia['temp_max'], dia['temp_suma']) == (20.0, 30.0, 74.0)
+    assert (dia['viento_min'], dia['viento_max'], dia['viento_suma']) == (1.0, 4.0, 7.0)
+    observaciones = datos.conexion.execute('SELECT COUNT(*) FROM clima_observaciones').fetchone()[0]
+    assert observaciones == 3
+
+
+def test_resumenes_separados_por_ciudad_y_por_dia(datos):
+    datos.historial.registrar('calvillo', MEDIANOCHE - 60, lectura(15.0, 50, 1.0))
+    datos.historial.registrar('calvillo', MEDIANOCHE + 60, lectura(16.0, 50, 1.0))
+    datos.historial.registrar('asientos', MEDIANOCHE + 60, lectura(18.0, 50, 1.0))
+    dias = datos.historial.rango('calvillo', 'dia', MEDIANOCHE - 86400, MEDIANOCHE + 86400)
+    assert [(dia['inicio'], dia['muestras']) for dia in dias] == [(MEDIANOCHE - 86400, 1), (MEDIANOCHE, 1)]
+
+
+def test_el_rango_incluye_el_periodo_que_se_traslapa_con_el_inicio(datos):
+    datos.historial.registrar('calvillo', MEDIANOCHE + 600, lectura(20.0, 40, 2.0))
+    # Desde la mitad de la hora: la hora completa entra en el resultado
+    horas = datos.historial.rango('calvillo', 'hora', MEDIANOCHE + 1800, MEDIANOCHE + 7200)
+    assert [hora['inicio'] for hora in horas] == [MEDIANOCHE]
+    assert datos.historial.rango('calvillo', 'hora', MEDIANOCHE + 3600, MEDIANOCHE + 7200) == []
+
+
+def test_promedios_de_la_api(aplicacion, datos):
+    datos.historial.registrar('calvillo', MEDIANOCHE + 600, lectura(20.0, 40, 2.0))
+    datos.historial.registrar('calvillo', MEDIANOCHE + 1200, lectura(25.0, 31, 3.5))
+    [hora] = datos.historial.rango('calvillo', 'hora', MEDIANOCHE, MEDIANOCHE + 3600)
+    assert aplicacion._promedios(hora) == {
+        'start': MEDIANOCHE,
+        'samples': 2,
+        'temperature': {'min': 20.0, 'max': 25.0, 'avg': 22.5},
+        'humidity': {'min': 31, 'max': 40, 'avg': 35.5},
+        'wind_speed': {'min': 2.0, 'max': 3.5, 'avg': 2.8},
+    }
+
+
+def test_un_solo_hilo_escribe_el_historial_en_orden(aplicacion, monkeypatch):
+    escritas = []
+    listas = threading.Event()
+
+    def registrar(lecturas, observado):
+        escritas.append((lecturas, observado, threading.current_thread().name))
+        if len(escritas) == 3:
+            listas.set()
+
+    monkeypatch.setattr(aplicacion, 'registrar_observaciones', registrar)
+    monkeypatch.setattr(aplicacion, '_historial_pid', None)
+    hilos_antes = threading.active_count()
+    for numero in range(3):
+        aplicacion.registrar_en_fondo({'calvillo': numero})
+    assert listas.wait(timeout=5)
+    assert [lecturas for lecturas, _, _ in escritas] == [{'calvillo': 0}, {'calvillo': 1}, {'calvillo': 2}]
+    assert {hilo for _, _, hilo in escritas} == {'historial-clima'}
+    # El momento es el de la lectura, tomado al encolar
+    assert all(observado is not None for _, observado, _ in escritas)
+    assert threading.active_count() == hilos_antes + 1
+
+
+def test_con_la_cola_llena_se_descarta_sin_esperar(aplicacion, monkeypatch):
+    llena = queue.Queue(maxsize=1)
+    llena.put_nowait(({}, 0))
+    monkeypatch.setattr(aplicacion, '_historial_pid', os.getpid())
+    monkeypatch.setattr(aplicacion, '_historial_cola', llena)
+    aplicacion.registrar_en_fondo({'calvillo': 1})
+    assert llena.qsize() == 1
@@ -0,0 +1,87 @@
+"""Reparto de lecturas entre réplicas y primaria según la sesión"""
+import time
+
+import pytest
+
+from salud_backends import SaludBackend
+
+
+class PoolFalso:
+    def __init__(self, backend, disponible=True):
+        self.backend = backend
+        self.disponible = disponible
+
+    def obtener(self):
+        if not self.disponible:
+            raise ConnectionError(f'{self.backend} no responde')
+        return {'backend': self.backend}
+
+    def devolver(self, conexion, descartar=False):
+        pass
+
+
+@pytest.fixture
+def replicas(aplicacion, monkeypatch):
+    """Una primaria y dos réplicas falsas; regresa sus pools por nombre"""
+    pools = {nombre: PoolFalso(nombre) for nombre in ('primaria', 'replica1', 'replica2')}
+    monkeypatch.setattr(aplicacion, 'BACKENDS', ['primaria'])
+    monkeypatch.setattr(aplicacion, 'REPLICAS', ['replica1', 'replica2'])
+    monkeypatch.setattr(aplicacion, 'salud_backends', {nombre: SaludBackend(nombre) for nombre in pools})
+    monkeypatch.setattr(aplicacion, 'obtener_pool', pools.__getitem__)
+    monkeypatch.setattr(aplicacion, 'lecturas', dict.fromkeys(aplicacion.lecturas, 0))
+    return pools
+
+
+def leer_de(aplicacion):
+    with aplicacion.obtener_conexion(lectura=True) as conexion:
+        return conexion['backend']
+
+
+def test_lecturas_por_turnos_entre_replicas(aplicacion, replicas):
+    with aplicacion.app.test_request_context():
+        leidos = {leer_de(aplicacion) for _ in range(4)}
+    assert leidos == {'replica1', 'replica2'}
+    assert aplicacion.lecturas['replica'] == 4
+
+
+def test_escrituras_siempre_a_la_primaria(aplicacion, replicas):
+    with aplicacion.app.test_request_context():
+        with aplicacion.obtener_conexion() as conexion:
+            assert conexion['backend'] == 'primaria'
+
+
+def test_despues_de_escribir_la_sesion_lee_de_la_primaria(aplicacion, replicas, monkeypatch):
+    monkeypatch.setattr(aplicacion, 'REPLICA_STICKY_SEGUNDOS', 0.2)
+    with aplicacion.app.test_request_context():
+        aplicacion.marcar_escritura()
+        assert leer_de(aplicacion) == 'primaria'
+        assert leer_de(aplicacion) == 'primaria'
+        assert aplicacion.lecturas['primaria_sesion'] == 2
+        # Al vencer primaria_hasta vuelve a las réplicas
+        time.sleep(0.25)
+        assert leer_de(aplicacion).startswith('replica')
+        assert aplicacion.lecturas['replica'] == 1
+
+
+def test_otra_sesion_sigue_leyendo_de_las_replicas(aplicacion, replicas):
+    with aplicacion.app.test_request_context():
+        aplicacion.marcar_escritura()
+    with aplicacion.app.test_request_context():
+        assert leer_de(aplicacion).startswith('replica')
+
+
+def test_fuera_de_una_peticion_no_hay_sesion_que_marcar(aplicacion, replicas):
+    # Tareas de fondo: marcar_escritura no hace nada y se lee de las réplicas
+    aplicacion.marcar_escritura()
+    assert leer_de(aplicacion).startswith('replica')
+
+
+def test_sin_replicas_disponibles_lee_de_la_primaria(aplicacion, replicas):
+    replicas['replica1'].disponible = False
+    replicas['replica2'].disponible = False
+    with aplicacion.app.test_request_context():
+        assert leer_de(aplicacion) == 'primaria'
+        assert aplicacion.lecturas['primaria_sin_replica'] == 1
+        # La réplica caída queda en backoff y no se vuelve a intentar de inmediato
+        replicas['replica1'].disponible = True
+        assert leer_de(aplicacion) == 'primaria'
@@ -0,0 +1,106 @@
+"""Migrador: orden y registro de las migraciones"""
+import pytest
+
+from migrador import Migrador
+
+
+class CursorFalso:
+    def __init__(self, base):
+        self.base = base
+        self._fila = None
+
+    def execute(self, sql, parametros=None):
+        base = self.base
+        self._fila = None
+        if 'MAX(version)' in sql:
+            if not base.tabla_version:
+                raise RuntimeError('no existe schema_version')
+            self._fila = (max(base.versiones, default=None),)
+        elif 'CREATE TABLE IF NOT EXISTS schema_version' in sql:
+            base.tabla_version = True
+        elif 'to_regclass' in sql:
+            self._fila = (base.tabla_base,)
+        elif sql.startswith('INSERT INTO schema_version'):
+            base.versiones.append(parametros[0])
+        elif 'advisory' in sql:
+            self._fila = (True,)
+        else:
+            if sql in base.fallan:
+                raise RuntimeError(f'error en {sql}')
+            base.ejecutadas.append(sql)
+
+    def fetchone(self):
+        return self._fila
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, tabla_base=False):
+        self.tabla_version = False
+        self.tabla_base = tabla_base
+        self.versiones = []
+        self.ejecutadas = []
+        self.fallan = set()
+        self.rollbacks = 0
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    carpeta = tmp_path / 'postgresql'
+    carpeta.mkdir()
+    for nombre, sql in [('10_diez.sql', 'SELECT 10;'), ('2_dos.sql', 'SELECT 2;'),
+                        ('1_uno.sql', '-- comentario\nSELECT 1;\nSELECT 11;'), ('9_nueve.sql', 'SELECT 9;'),
+                        ('notas.md', 'no es migración')]:
+        (carpeta / nombre).write_text(sql, encoding='utf-8')
+    return str(tmp_path)
+
+
+def test_archivos_ordenados_por_numero(directorio):
+    migrador = Migrador(directorio)
+    assert [version for version, _nombre, _ruta in migrador.archivos('postgresql')] == [1, 2, 9, 10]
+    assert migrador.ultima('postgresql') == 10
+
+
+def test_base_nueva_aplica_todo_en_orden(directorio):
+    conexion = ConexionFalsa()
+    aplicadas = Migrador(directorio).migrar(conexion, 'postgresql')
+    assert aplicadas == ['1_uno.sql', '2_dos.sql', '9_nueve.sql', '10_diez.sql']
+    assert conexion.ejecutadas == ['SELECT 1', 'SELECT 11', 'SELECT 2', 'SELECT 9', 'SELECT 10']
+    assert conexion.versiones == [1, 2, 9, 10]
+
+
+def test_al_dia_no_hace_nada(directorio):
+    conexion = ConexionFalsa()
+    Migrador(directorio).migrar(conexion, 'postgresql')
+    conexion.ejecutadas.clear()
+    assert Migrador(directorio).migrar(conexion, 'postgresql') == []
+    assert conexion.ejecutadas == []
+
+
+def test_base_existente_registra_la_version_base_sin_ejecutarla(directorio):
+    conexion = ConexionFalsa(tabla_base=True)
+    aplicadas = Migrador(directorio, version_base=2).migrar(conexion, 'postgresql')
+    assert aplicadas == ['9_nueve.sql', '10_diez.sql']
+    assert conexion.ejecutadas == ['SELECT 9', 'SELECT 10']
+    assert conexion.versiones == [1, 2, 9, 10]
+
+
+def test_error_detiene_las_siguientes(directorio):
+    conexion = ConexionFalsa()
+    conexion.fallan.add('SELECT 9')
+    with pytest.raises(RuntimeError):
+        Migrador(directorio).migrar(conexion, 'postgresql')
+    assert conexion.versiones == [1, 2]
+    assert 'SELECT 10' not in conexion.ejecutadas
+    assert conexion.rollbacks >= 1
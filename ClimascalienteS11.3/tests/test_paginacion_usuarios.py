@@ -0,0 +1,122 @@
+"""Paginación por keyset del panel de usuarios y su total en caché"""
+from repositorio import PAGINAS_USUARIOS, Usuarios
+
+
+class DatosFalsos:
+    """Regresa filas fijas y anota la consulta y los parámetros recibidos"""
+
+    def __init__(self, filas, postgresql=True):
+        self.filas = filas
+        self.postgresql = postgresql
+        self.llamadas = []
+
+    def todos(self, consulta, parametros):
+        self.llamadas.append((consulta, parametros))
+        return list(self.filas)
+
+
+def filas(*ids):
+    return [{'id': usuario_id} for usuario_id in ids]
+
+
+def ids(usuarios):
+    return [usuario['id'] for usuario in usuarios]
+
+
+def test_primera_pagina_pide_una_fila_de_mas():
+    datos = DatosFalsos(filas(10, 9, 8, 7))
+    usuarios, hay_anterior, hay_siguiente = Usuarios(datos).pagina('', None, None, 3)
+    assert ids(usuarios) == [10, 9, 8]
+    assert (hay_anterior, hay_siguiente) == (False, True)
+    assert datos.llamadas == [(PAGINAS_USUARIOS['todos', 'primera'], [4])]
+
+
+def test_primera_pagina_completa_sin_siguiente():
+    datos = DatosFalsos(filas(10, 9, 8))
+    usuarios, hay_anterior, hay_siguiente = Usuarios(datos).pagina('', None, None, 3)
+    assert ids(usuarios) == [10, 9, 8]
+    assert (hay_anterior, hay_siguiente) == (False, False)
+
+
+def test_pagina_siguiente_avanza_desde_el_ultimo_id():
+    datos = DatosFalsos(filas(7, 6, 5, 4))
+    usuarios, hay_anterior, hay_siguiente = Usuarios(datos).pagina('', 8, None, 3)
+    assert ids(usuarios) == [7, 6, 5]
+    assert (hay_anterior, hay_siguiente) == (True, True)
+    assert datos.llamadas == [(PAGINAS_USUARIOS['todos', 'siguiente'], [8, 4])]
+
+
+def test_ultima_pagina_no_tiene_siguiente():
+    datos = DatosFalsos(filas(2, 1))
+    usuarios, hay_anterior, hay_siguiente = Usuarios(datos).pagina('', 3, None, 3)
+    assert ids(usuarios) == [2, 1]
+    assert (hay_anterior, hay_siguiente) == (True, False)
+
+
+def test_pagina_anterior_se_lee_ascendente_y_se_invierte():
+    # La consulta de la página anterior ordena por id ascendente desde `despues`
+    datos = DatosFalsos(filas(8, 9, 10, 11))
+    usuarios, hay_anterior, hay_siguiente = Usuarios(datos).pagina('', None, 7, 3)
+    assert ids(usuarios) == [10, 9, 8]
+    assert (hay_anterior, hay_siguiente) == (True, True)
+    assert datos.llamadas == [(PAGINAS_USUARIOS['todos', 'anterior'], [7, 4])]
+
+
+def test_pagina_anterior_al_llegar_al_inicio():
+    datos = DatosFalsos(filas(8, 9))
+    usuarios, hay_anterior, hay_siguiente = Usuarios(datos).pagina('', None, 7, 3)
+    assert ids(usuarios) == [9, 8]
+    assert (hay_anterior, hay_siguiente) == (False, True)
+
+
+def test_busqueda_numerica_filtra_por_id():
+    datos = DatosFalsos(filas(42))
+    Usuarios(datos).pagina('42', None, None, 25)
+    assert datos.llamadas == [(PAGINAS_USUARIOS['id', 'primera'], [42, 26])]
+
+
+class VersionFalsa:
+    def __init__(self, version):
+        self.actual = version
+
+    def version(self, tabla):
+        assert tabla == 'usuarios'
+        return self.actual
+
+
+class ContadorFalso:
+    def __init__(self):
+        self.usuarios = self
+        self.valor = 0
+        self.consultas = 0
+
+    def total(self):
+        self.consultas += 1
+        return self.valor
+
+
+def test_total_se_recalcula_al_cambiar_la_version(aplicacion, monkeypatch):
+    versiones = VersionFalsa(3)
+    monkeypatch.setattr(aplicacion, 'cache_catalogo', versiones)
+    monkeypatch.setattr(aplicacion, '_total_usuarios', {'valor': None, 'version': None, 'expira': 0.0})
+    datos = ContadorFalso()
+    datos.valor = 10
+    assert aplicacion.total_usuarios(datos) == 10
+    # Mientras la versión no cambie se usa el valor guardado
+    datos.valor = 11
+    assert aplicacion.total_usuarios(datos) == 10
+    assert datos.consultas == 1
+    # Un alta en otro worker sube la versión en la base de datos
+    versiones.actual = 4
+    assert aplicacion.total_usuarios(datos) == 11
+    assert datos.consultas == 2
+
+
+def test_total_se_recalcula_al_vencer(aplicacion, monkeypatch):
+    monkeypatch.setattr(aplicacion, 'cache_catalogo', VersionFalsa(None))
+    monkeypatch.setattr(aplicacion, '_total_usuarios', {'valor': None, 'version': None, 'expira': 0.0})
+    monkeypatch.setattr(aplicacion, 'DASHBOARD_COUNT_TTL', 0)
+    datos = ContadorFalso()
+    aplicacion.total_usuarios(datos)
+    aplicacion.total_usuarios(datos)
+    assert datos.consultas == 2
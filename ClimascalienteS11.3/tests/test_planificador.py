@@ -0,0 +1,204 @@
+"""Elección del ejecutor del Planificador con un candado de base de datos falso"""
+import contextlib
+
+import pytest
+
+from planificador import Planificador
+
+
+class BaseFalsa:
+    """Candado asesor de PostgreSQL y tabla tareas_programadas en memoria"""
+
+    def __init__(self):
+        self.disponible = True
+        self.dueno = None
+        self.registro = {}
+
+
+class CursorFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.base = conexion.base
+        self.filas = []
+        self.description = None
+
+    def execute(self, sql, parametros=None):
+        if self.conexion.caida:
+            raise ConnectionError('conexión perdida')
+        if 'pg_try_advisory_lock' in sql:
+            obtenido = self.base.dueno in (None, self.conexion)
+            if obtenido:
+                self.base.dueno = self.conexion
+            self.filas = [(obtenido,)]
+        elif 'pg_locks' in sql:
+            self.filas = [(self.base.dueno is None,)]
+        elif sql.strip().startswith('INSERT INTO tareas_programadas'):
+            (nombre, ultima, exito, duracion, retraso, fallos, error, ejecutor) = parametros
+            anterior = self.base.registro.get(nombre, {'ejecuciones': 0, 'fallos': 0, 'ultimo_exito': None})
+            self.base.registro[nombre] = {
+                'nombre': nombre, 'ultima_ejecucion': ultima,
+                'ultimo_exito': exito or anterior['ultimo_exito'],
+                'duracion_ms': duracion, 'retraso_ms': retraso,
+                'ejecuciones': anterior['ejecuciones'] + 1, 'fallos': anterior['fallos'] + fallos,
+                'ultimo_error': error, 'ejecutor': ejecutor,
+            }
+        elif 'SELECT nombre, ultima_ejecucion FROM' in sql:
+            self.filas = [(nombre, fila['ultima_ejecucion']) for nombre, fila in self.base.registro.items()]
+        elif 'FROM tareas_programadas' in sql:
+            columnas = ['nombre', 'ultima_ejecucion', 'ultimo_exito', 'duracion_ms', 'retraso_ms',
+                        'ejecuciones', 'fallos', 'ultimo_error', 'ejecutor']
+            self.description = [(columna,) for columna in columnas]
+            self.filas = [tuple(fila[columna] for columna in columnas) for fila in self.base.registro.values()]
+        else:
+            self.filas = [(1,)]
+
+    def fetchone(self):
+        return self.filas[0]
+
+    def fetchall(self):
+        return list(self.filas)
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, base):
+        self.base = base
+        self.caida = False
+        self.autocommit = False
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def close(self):
+        # Al cerrar la conexión la base de datos libera el candado
+        if self.base.dueno is self:
+            self.base.dueno = None
+
+
+def planificador(base, directorio):
+    def conectar():
+        if not base.disponible:
+            raise ConnectionError('sin base de datos')
+        return ConexionFalsa(base)
+
+    @contextlib.contextmanager
+    def obtener_conexion():
+        yield ConexionFalsa(base) if base.disponible else None
+
+    # reintento=0: cada llamada a _tomar_liderazgo vuelve a intentar
+    return Planificador(conectar, obtener_conexion, lambda conexion: True, str(directorio),
+                        reintento=0, ping=0)
+
+
+@pytest.fixture
+def base():
+    return BaseFalsa()
+
+
+def test_un_solo_lider_con_el_candado_de_la_base(base, tmp_path):
+    primero = planificador(base, tmp_path)
+    segundo = planificador(base, tmp_path)
+    assert primero._tomar_liderazgo() is True
+    assert primero.modo == 'base_de_datos'
+    assert segundo._tomar_liderazgo() is False
+    assert segundo.modo is None
+    # El líder sigue siéndolo mientras su conexión responda
+    assert primero._tomar_liderazgo() is True
+
+
+def test_otro_proceso_toma_el_candado_si_el_lider_lo_suelta(base, tmp_path):
+    primero = planificador(base, tmp_path)
+    segundo = planificador(base, tmp_path)
+    primero._tomar_liderazgo()
+    primero._soltar_conexion()
+    assert segundo._tomar_liderazgo() is True
+    assert segundo.modo == 'base_de_datos'
+    assert base.dueno is segundo._conexion
+
+
+def test_conexion_perdida_del_lider(base, tmp_path):
+    primero = planificador(base, tmp_path)
+    segundo = planificador(base, tmp_path)
+    primero._tomar_liderazgo()
+    conexion = primero._conexion
+    conexion.caida = True
+    # El ping falla: se cierra la conexión (la base suelta el candado) y se vuelve a pedir
+    assert primero._tomar_liderazgo() is True
+    assert primero._conexion is not conexion
+    assert segundo._tomar_liderazgo() is False
+
+
+def test_sin_base_de_datos_un_ejecutor_por_servidor_con_flock(base, tmp_path):
+    base.disponible = False
+    primero = planificador(base, tmp_path)
+    segundo = planificador(base, tmp_path)
+    assert primero._tomar_liderazgo() is True
+    assert primero.modo == 'archivo'
+    assert segundo._tomar_liderazgo() is False
+    assert segundo.modo is None
+
+
+def test_vuelve_al_candado_de_la_base_y_suelta_el_archivo(base, tmp_path):
+    base.disponible = False
+    primero = planificador(base, tmp_path)
+    segundo = planificador(base, tmp_path)
+    primero._tomar_liderazgo()
+    base.disponible = True
+    assert segundo._tomar_liderazgo() is True
+    assert segundo.modo == 'base_de_datos'
+    # El candado de la base ya está tomado: el anterior deja de ejecutar y suelta el archivo
+    assert primero._tomar_liderazgo() is False
+    assert primero._archivo is None
+    base.disponible = False
+    tercero = planificador(base, tmp_path)
+    assert tercero._candado_archivo() is True
+
+
+def test_registro_de_ejecuciones_en_tareas_programadas(base, tmp_path):
+    lider = planificador(base, tmp_path)
+    lider.registrar('bien', lambda: True, 60)
+    lider.registrar('mal', lambda: False, 60)
+
+    def falla():
+        raise RuntimeError('API caída')
+
+    lider.registrar('error', falla, 60)
+    lider._tomar_liderazgo()
+    for tarea in lider.tareas.values():
+        lider._ejecutar(tarea, 0.0)
+    lider._ejecutar(lider.tareas['bien'], 0.0)
+
+    assert base.registro['bien']['ejecuciones'] == 2
+    assert base.registro['bien']['fallos'] == 0
+    assert base.registro['bien']['ultimo_exito'] is not None
+    assert base.registro['bien']['ejecutor'] == lider.ejecutor
+    assert base.registro['mal']['fallos'] == 1
+    assert base.registro['mal']['ultimo_error'] == 'sin resultado'
+    assert base.registro['error']['ultimo_error'] == 'API caída'
+    assert base.registro['error']['ultimo_exito'] is None
+    # El registro se lee desde cualquier proceso con una conexión del pool
+    otro = planificador(base, tmp_path)
+    otro.registrar('bien', lambda: True, 60)
+    assert otro.estadisticas()['tareas']['bien']['ejecuciones'] == 2
+
+
+def test_sin_candado_de_la_base_no_se_registra(base, tmp_path):
+    base.disponible = False
+    lider = planificador(base, tmp_path)
+    lider.registrar('bien', lambda: True, 60)
+    lider._tomar_liderazgo()
+    lider._ejecutar(lider.tareas['bien'], 0.0)
+    assert lider.tareas['bien'].ejecuciones == 1
+    assert base.registro == {}
+
+
+def test_un_lider_nuevo_retoma_la_cadencia_registrada(base, tmp_path):
+    base.registro['bien'] = {'ultima_ejecucion': 1000}
+    lider = planificador(base, tmp_path)
+    lider.registrar('bien', lambda: True, 60)
+    lider.registrar('nueva', lambda: True, 60)
+    lider._tomar_liderazgo()
+    assert lider.tareas['bien'].proxima == 1060
+    assert lider.tareas['nueva'].proxima == 0.0
@@ -0,0 +1,191 @@
+"""PoolConexiones con una conexión falsa"""
+import os
+import threading
+import time
+
+import pytest
+
+from pool_conexiones import PoolAgotado, PoolConexiones
+
+
+class CursorFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, sql):
+        if self.conexion.caida:
+            raise ConnectionError('servidor cerró la conexión')
+        self.conexion.pings += 1
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, pool=None):
+        self.pool = pool
+        self.caida = False
+        self.cerrada = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.lock_tomado_al_cerrar = None
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def rollback(self):
+        if self.caida:
+            raise ConnectionError('servidor cerró la conexión')
+        self.rollbacks += 1
+
+    def close(self):
+        if self.pool is not None:
+            self.lock_tomado_al_cerrar = self.pool._lock.locked()
+        self.cerrada = True
+
+
+def crear_pool(**opciones):
+    creadas = []
+    pool = None
+
+    def crear():
+        conexion = ConexionFalsa(pool)
+        creadas.append(conexion)
+        return conexion
+
+    opciones.setdefault('ping_inactividad', 60)
+    pool = PoolConexiones('prueba', crear, **opciones)
+    return pool, creadas
+
+
+def test_reutiliza_la_conexion_y_hace_rollback_al_devolver():
+    pool, creadas = crear_pool()
+    with pool.conexion() as primera:
+        pass
+    with pool.conexion() as segunda:
+        pass
+    assert primera is segunda
+    assert len(creadas) == 1
+    assert primera.rollbacks == 2
+    datos = pool.estadisticas()
+    assert (datos['checkouts'], datos['creadas'], datos['libres'], datos['en_uso']) == (2, 1, 1, 0)
+
+
+def test_recicla_por_numero_de_usos():
+    pool, creadas = crear_pool(max_usos=2)
+    for _ in range(3):
+        with pool.conexion():
+            pass
+    assert len(creadas) == 2
+    assert creadas[0].cerrada and not creadas[1].cerrada
+    assert pool.estadisticas()['descartadas'] == 1
+
+
+def test_recicla_por_edad():
+    pool, creadas = crear_pool(max_edad=0.05)
+    with pool.conexion():
+        pass
+    time.sleep(0.06)
+    with pool.conexion() as conexion:
+        assert conexion is creadas[1]
+    assert creadas[0].cerrada
+
+
+def test_ping_de_conexiones_inactivas():
+    pool, creadas = crear_pool(ping_inactividad=0)
+    with pool.conexion():
+        pass
+    with pool.conexion() as conexion:
+        assert conexion is creadas[0]
+    assert creadas[0].pings == 1
+
+    # Si no responde se descarta y se abre otra
+    creadas[0].caida = True
+    with pool.conexion() as conexion:
+        assert conexion is creadas[1]
+    assert creadas[0].cerrada
+
+
+def test_sin_ping_si_se_uso_hace_poco():
+    pool, creadas = crear_pool(ping_inactividad=60)
+    for _ in range(3):
+        with pool.conexion():
+            pass
+    assert creadas[0].pings == 0
+
+
+def test_error_en_la_peticion_descarta_la_conexion():
+    pool, creadas = crear_pool()
+    with pytest.raises(ValueError):
+        with pool.conexion():
+            raise ValueError('consulta inválida')
+    assert creadas[0].cerrada
+    assert pool.estadisticas()['abiertas'] == 0
+
+
+def test_rollback_fallido_descarta_la_conexion():
+    pool, creadas = crear_pool()
+    conexion = pool.obtener()
+    conexion.caida = True
+    pool.devolver(conexion)
+    assert conexion.cerrada
+    assert pool.estadisticas()['libres'] == 0
+
+
+def test_cierra_fuera_del_lock():
+    pool, creadas = crear_pool()
+    conexion = pool.obtener()
+    pool.devolver(conexion, descartar=True)
+    assert conexion.lock_tomado_al_cerrar is False
+    with pool.conexion():
+        pass
+    pool.cerrar_todo()
+    assert creadas[1].cerrada and creadas[1].lock_tomado_al_cerrar is False
+
+
+def test_pool_agotado():
+    pool, _creadas = crear_pool(tamano_maximo=1, espera_maxima=0.05)
+    conexion = pool.obtener()
+    with pytest.raises(PoolAgotado):
+        pool.obtener()
+    assert pool.estadisticas()['agotado'] == 1
+    pool.devolver(conexion)
+    assert pool.obtener() is conexion
+
+
+def test_quien_espera_recibe_la_conexion_devuelta():
+    pool, creadas = crear_pool(tamano_maximo=1, espera_maxima=5)
+    conexion = pool.obtener()
+    recibida = []
+    hilo = threading.Thread(target=lambda: recibida.append(pool.obtener()))
+    hilo.start()
+    time.sleep(0.05)
+    assert pool.estadisticas()['esperando'] == 1
+    pool.devolver(conexion)
+    hilo.join(timeout=5)
+    assert recibida == [conexion]
+    assert len(creadas) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='sin fork')
+def test_tras_fork_el_hijo_no_usa_las_conexiones_del_padre():
+    pool, creadas = crear_pool()
+    with pool.conexion():
+        pass
+    pid = os.fork()
+    if pid == 0:
+        # Hijo: register_at_fork ya vació el pool
+        ok = False
+        try:
+            ok = pool.estadisticas()['abiertas'] == 0
+            with pool.conexion() as conexion:
+                ok = ok and conexion is not creadas[0] and not creadas[0].cerrada
+        finally:
+            os._exit(0 if ok else 1)
+    _, estado = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(estado) == 0
+    # En el padre la conexión sigue en el pool
+    assert pool.estadisticas()['libres'] == 1
@@ -0,0 +1,104 @@
+"""Traducción de parámetros de Consulta y ejecución preparada o no en Datos"""
+from repositorio import PAGINAS_USUARIOS, USUARIOS_TOTAL, Consulta, Datos, Usuarios
+
+
+def test_placeholders_numerados_para_postgresql():
+    consulta = Consulta('prueba_numerada', 'SELECT * FROM t WHERE a = %s AND b > %s LIMIT %s')
+    assert consulta.sql_numerado == 'SELECT * FROM t WHERE a = $1 AND b > $2 LIMIT $3'
+    assert consulta.prepare_pg == 'PREPARE prueba_numerada AS SELECT * FROM t WHERE a = $1 AND b > $2 LIMIT $3'
+    assert consulta.execute_pg == 'EXECUTE prueba_numerada (%s, %s, %s)'
+
+
+def test_consulta_sin_parametros():
+    consulta = Consulta('prueba_sin_parametros', 'SELECT 1')
+    assert consulta.prepare_pg == 'PREPARE prueba_sin_parametros AS SELECT 1'
+    assert consulta.execute_pg == 'EXECUTE prueba_sin_parametros'
+
+
+def test_sql_por_dialecto():
+    comun = Consulta('prueba_comun', 'SELECT %s')
+    distinta = Consulta('prueba_distinta', 'SELECT lower(a) FROM t WHERE a LIKE %s',
+                        mysql='SELECT a FROM t WHERE a LIKE %s')
+    assert comun.para(True) == comun.para(False) == 'SELECT %s'
+    assert distinta.para(True) == 'SELECT lower(a) FROM t WHERE a LIKE %s'
+    assert distinta.para(False) == 'SELECT a FROM t WHERE a LIKE %s'
+    # PREPARE solo se usa en PostgreSQL: numera el SQL de PostgreSQL
+    assert 'lower(a)' in distinta.prepare_pg
+
+
+class CursorFalso:
+    def __init__(self, conexion, preparado):
+        self.conexion = conexion
+        self.preparado = preparado
+        self.rowcount = 0
+
+    def execute(self, sql, parametros=None):
+        self.conexion.ejecutadas.append((self.preparado, sql, parametros))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.ejecutadas = []
+
+    def cursor(self, prepared=False, **opciones):
+        return CursorFalso(self, prepared)
+
+
+def datos_falsos(postgresql):
+    datos = Datos(ConexionFalsa(), preparar=True)
+    datos.postgresql = postgresql
+    return datos
+
+
+def test_postgresql_prepara_una_vez_por_conexion():
+    datos = datos_falsos(postgresql=True)
+    datos.todos(USUARIOS_TOTAL)
+    datos.todos(USUARIOS_TOTAL)
+    assert datos.conexion.ejecutadas == [
+        (False, USUARIOS_TOTAL.prepare_pg, None),
+        (False, USUARIOS_TOTAL.execute_pg, ()),
+        (False, USUARIOS_TOTAL.execute_pg, ()),
+    ]
+
+
+def test_postgresql_busqueda_por_prefijo_sin_preparar():
+    datos = datos_falsos(postgresql=True)
+    Usuarios(datos).pagina('adm', None, None, 25)
+    consulta = PAGINAS_USUARIOS['prefijo', 'primera']
+    assert datos.conexion.ejecutadas == [(False, consulta.sql, ['adm%', 'adm%', 26])]
+
+
+def test_mysql_busqueda_por_prefijo_sin_cursor_preparado():
+    datos = datos_falsos(postgresql=False)
+    Usuarios(datos).pagina('adm', None, None, 25)
+    Usuarios(datos).pagina('', None, None, 25)
+    prefijo = PAGINAS_USUARIOS['prefijo', 'primera']
+    todos = PAGINAS_USUARIOS['todos', 'primera']
+    assert datos.conexion.ejecutadas == [
+        (False, prefijo.sql_mysql, ['adm%', 'adm%', 26]),
+        (True, todos.sql_mysql, [26]),
+    ]
+
+
+def parametros_de_busqueda(busqueda, postgresql):
+    datos = datos_falsos(postgresql)
+    Usuarios(datos).pagina(busqueda, None, None, 25)
+    return datos.conexion.ejecutadas[0][2]
+
+
+def test_prefijo_escapa_comodines_de_like():
+    assert parametros_de_busqueda('a_b%c', False) == ['a\\_b\\%c%', 'a\\_b\\%c%', 26]
+    assert parametros_de_busqueda('a\\b', False) == ['a\\\\b%', 'a\\\\b%', 26]
+
+
+def test_prefijo_en_minusculas_solo_en_postgresql():
+    # PostgreSQL compara contra lower(...) con índices text_pattern_ops; la
+    # intercalación de MySQL ya ignora mayúsculas
+    assert parametros_de_busqueda('Ad_', True)[:2] == ['ad\\_%', 'ad\\_%']
+    assert parametros_de_busqueda('Ad_', False)[:2] == ['Ad\\_%', 'Ad\\_%']
@@ -0,0 +1,66 @@
+"""ETag, Last-Modified y 304 de las APIs públicas (cliente de pruebas de Flask)"""
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cache_catalogo import CacheCatalogo
+
+
+@pytest.fixture
+def catalogo(aplicacion, monkeypatch):
+    versiones = {'numeros_emergencia': (3, 1700000000),
+                 'frases_dia': (1, 1700000000)}
+    cache = CacheCatalogo(lambda: dict(versiones), intervalo_revision=0)
+    monkeypatch.setattr(aplicacion, 'cache_catalogo', cache)
+    leidas = []
+    contenido = {'numeros_emergencia': [{'nombre': 'Emergencias', 'numero': '911'}],
+                 'frases_dia': {'id': 8, 'frase': 'Hola', 'vigente_hasta': time.time() + 3600}}
+
+    def leer_catalogo(*tablas):
+        leidas.extend(tablas)
+        return {tabla: (contenido[tabla], json.dumps(contenido[tabla])) for tabla in tablas}
+
+    monkeypatch.setattr(aplicacion, 'leer_catalogo', leer_catalogo)
+    return SimpleNamespace(cliente=aplicacion.app.test_client(), versiones=versiones, leidas=leidas)
+
+
+def test_etag_y_last_modified(catalogo):
+    respuesta = catalogo.cliente.get('/api/emergencia')
+    assert respuesta.status_code == 200
+    assert respuesta.headers['ETag'] == '"numeros_emergencia-3"'
+    assert respuesta.headers['Last-Modified'] == 'Tue, 14 Nov 2023 22:13:20 GMT'
+    assert respuesta.headers['Cache-Control'].startswith('public, max-age=')
+    assert respuesta.json == [{'nombre': 'Emergencias', 'numero': '911'}]
+
+
+def test_if_none_match_responde_304_sin_leer_la_tabla(catalogo):
+    respuesta = catalogo.cliente.get('/api/emergencia', headers={'If-None-Match': '"numeros_emergencia-3"'})
+    assert respuesta.status_code == 304
+    assert respuesta.get_data() == b''
+    assert respuesta.headers['ETag'] == '"numeros_emergencia-3"'
+    assert catalogo.leidas == []
+
+
+def test_if_modified_since_responde_304(catalogo):
+    respuesta = catalogo.cliente.get('/api/emergencia',
+                                     headers={'If-Modified-Since': 'Tue, 14 Nov 2023 22:13:20 GMT'})
+    assert respuesta.status_code == 304
+
+
+def test_version_nueva_responde_200(catalogo):
+    catalogo.versiones['numeros_emergencia'] = (4, 1700000100)
+    respuesta = catalogo.cliente.get('/api/emergencia', headers={'If-None-Match': '"numeros_emergencia-3"'})
+    assert respuesta.status_code == 200
+    assert respuesta.headers['ETag'] == '"numeros_emergencia-4"'
+
+
+def test_frase_con_vigencia_incluye_su_id_y_expira(catalogo):
+    respuesta = catalogo.cliente.get('/api/frase_dia')
+    assert respuesta.headers['ETag'] == '"frases_dia-1-8"'
+    # La frase puede vencer sin cambio de versión: no se responde 304 solo con la versión
+    respuesta = catalogo.cliente.get('/api/frase_dia', headers={'If-None-Match': '"frases_dia-1"'})
+    assert respuesta.status_code == 200
+    respuesta = catalogo.cliente.get('/api/frase_dia', headers={'If-None-Match': '"frases_dia-1-8"'})
+    assert respuesta.status_code == 304
@@ -0,0 +1,57 @@
+"""SaludBackend: backends caídos con backoff exponencial"""
+from salud_backends import SaludBackend
+
+
+def test_disponible_hasta_el_primer_fallo():
+    salud = SaludBackend('postgresql', backoff_inicial=60)
+    assert salud.disponible()
+    assert salud.permitir()
+    salud.registrar_fallo(ConnectionError('sin servidor'))
+    assert not salud.disponible()
+    assert not salud.permitir()
+    datos = salud.estadisticas()
+    assert datos['estado'] == 'caido'
+    assert datos['caidas'] == 1
+    assert datos['omitidas'] == 1
+    assert datos['ultimo_error'] == 'sin servidor'
+
+
+def test_backoff_exponencial_con_maximo():
+    salud = SaludBackend('postgresql', backoff_inicial=10, backoff_max=30)
+    esperas = []
+    for _ in range(4):
+        salud.registrar_fallo(ConnectionError('sin servidor'))
+        esperas.append(salud.estadisticas()['siguiente_intento_segundos'])
+    # Cada espera lleva ±20% de variación aleatoria
+    for espera, base in zip(esperas, [10, 20, 30, 30]):
+        assert base * 0.8 - 0.1 <= espera <= base * 1.2
+    assert salud.estadisticas()['caidas'] == 1
+
+
+def test_una_sola_prueba_al_vencer_la_espera():
+    salud = SaludBackend('mysql', backoff_inicial=0)
+    salud.registrar_fallo(ConnectionError('sin servidor'))
+    assert salud.permitir()
+    assert not salud.permitir()
+
+
+def test_prueba_exitosa_recupera():
+    salud = SaludBackend('mysql', backoff_inicial=0)
+    salud.registrar_fallo(ConnectionError('sin servidor'))
+    assert salud.permitir()
+    salud.registrar_exito()
+    assert salud.disponible()
+    assert salud.permitir() and salud.permitir()
+    datos = salud.estadisticas()
+    assert datos['recuperaciones'] == 1
+    assert [t['estado'] for t in datos['transiciones']] == ['caido', 'disponible']
+
+
+def test_prueba_cancelada_la_puede_tomar_otro():
+    salud = SaludBackend('mysql', backoff_inicial=0)
+    salud.registrar_fallo(ConnectionError('sin servidor'))
+    assert salud.permitir()
+    # Pool lleno: no se llegó a conectar, el backend sigue caído pero sin prueba en curso
+    salud.cancelar_prueba()
+    assert not salud.disponible()
+    assert salud.permitir()
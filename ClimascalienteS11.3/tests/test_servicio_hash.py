@@ -0,0 +1,62 @@
+"""Método por omisión y rehash en segundo plano de ServicioHash"""
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from servicio_hash import ServicioHash
+
+HASH_PBKDF2 = generate_password_hash('123456', method='pbkdf2:sha256:1000')
+
+
+def test_scrypt_es_el_metodo_por_omision():
+    servicio = ServicioHash(procesos=0)
+    assert servicio.generar('123456').startswith('scrypt:')
+
+
+def test_no_rehace_un_hash_con_los_parametros_actuales():
+    servicio = ServicioHash(metodo='pbkdf2:sha256:1000', procesos=0)
+    guardados = []
+    assert servicio.rehacer_en_fondo(HASH_PBKDF2, '123456', guardados.append) is False
+    assert guardados == []
+
+
+def test_rehace_en_el_hilo_sin_pool():
+    servicio = ServicioHash(metodo='pbkdf2:sha256:2000', procesos=0)
+    guardados = []
+    assert servicio.rehacer_en_fondo(HASH_PBKDF2, '123456', guardados.append) is True
+    assert guardados[0].startswith('pbkdf2:sha256:2000$')
+    assert check_password_hash(guardados[0], '123456')
+    assert servicio.estadisticas()['rehechos'] == 1
+
+
+def test_rehace_en_el_pool_sin_esperar_el_resultado():
+    servicio = ServicioHash(metodo='pbkdf2:sha256:2000', procesos=1)
+    guardado = threading.Event()
+    nuevos = []
+
+    def guardar(nuevo):
+        nuevos.append(nuevo)
+        guardado.set()
+
+    try:
+        assert servicio.rehacer_en_fondo(HASH_PBKDF2, '123456', guardar) is True
+        assert guardado.wait(timeout=60)
+    finally:
+        servicio._executor.shutdown()
+    assert check_password_hash(nuevos[0], '123456')
+    assert servicio.estadisticas()['rehechos'] == 1
+    assert servicio.estadisticas()['pendientes'] == 0
+
+
+def test_con_la_cola_llena_se_omite_sin_esperar_cupo(monkeypatch):
+    servicio = ServicioHash(metodo='pbkdf2:sha256:2000', procesos=1, max_pendientes=1, espera_maxima=5)
+    # Sin pool real: el único cupo ya está ocupado por otra tarea
+    monkeypatch.setattr(servicio, '_obtener_executor', lambda: None)
+    assert servicio._cupo.acquire(blocking=False)
+    inicio = time.monotonic()
+    guardados = []
+    assert servicio.rehacer_en_fondo(HASH_PBKDF2, '123456', guardados.append) is False
+    assert guardados == []
+    assert time.monotonic() - inicio < 1
+    assert servicio.estadisticas()['rechazados'] == 1
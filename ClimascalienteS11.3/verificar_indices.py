@@ -0,0 +1,185 @@
+"""Revisa con EXPLAIN que las consultas de la aplicación usen índices.
+
+Aplica las migraciones y corre EXPLAIN de cada consulta que hace la app
+(las de repositorio.py a través de sus métodos y las del caché del
+catálogo) contra la base de datos configurada (DATABASE_URL o DB_*). Termina con
+código 1 si alguna lee la tabla completa y además ordena en memoria, o
+si lee la tabla completa en una búsqueda que debería ir por índice.
+
+- PostgreSQL: se desactiva enable_seqscan en la transacción; si aun así
+  aparece un Seq Scan es que ningún índice sirve para esa consulta.
+- MySQL: se insertan filas de prueba para que el optimizador no prefiera
+  leer la tabla completa. Todo se deshace al final (ROLLBACK).
+
+Uso: python verificar_indices.py
+"""
+import json
+import sys
+
+import app
+from repositorio import Datos, USUARIOS_TOTAL
+
+FILAS_PRUEBA = 2000
+
+# Consultas de SQL directo en app.py: (nombre, sql, parámetros, lectura_completa)
+# lectura_completa=True: se espera leer toda la tabla, solo se exige no ordenar en memoria
+CONSULTAS = [
+    ('versiones del catálogo', 'SELECT tabla, version, actualizado FROM versiones_catalogo', (), True),
+    ('versión de una tabla', 'SELECT version FROM versiones_catalogo WHERE tabla = %s', ('frases_dia',), False),
+    ('subir versión', 'UPDATE versiones_catalogo SET version = version + 1, actualizado = %s WHERE tabla = %s',
+     (0, 'frases_dia'), False),
+]
+
+# Métodos de los repositorios: (nombre, llamada, lectura_completa)
+LLAMADAS = [
+    ('login', lambda datos: datos.usuarios.por_username('admin'), False),
+    ('usuario por id', lambda datos: datos.usuarios.por_id(1), False),
+    ('registro: usuario o email existente', lambda datos: datos.usuarios.existe('admin', 'admin@sistema.com'), False),
+    ('rehash de contraseña', lambda datos: datos.usuarios.cambiar_hash(1, 'x', 'y'), False),
+    ('editar usuario', lambda datos: datos.usuarios.actualizar(1, 'a', 'a@b.mx', 'user', 'x'), False),
+    ('eliminar usuario', lambda datos: datos.usuarios.eliminar(1), False),
+    ('total de usuarios', lambda datos: datos.uno(USUARIOS_TOTAL), True),
+    ('dashboard: primera página', lambda datos: datos.usuarios.pagina('', None, None, 25), False),
+    ('dashboard: página siguiente', lambda datos: datos.usuarios.pagina('', 1000, None, 25), False),
+    ('dashboard: página anterior', lambda datos: datos.usuarios.pagina('', None, 10, 25), False),
+    ('dashboard: búsqueda por id', lambda datos: datos.usuarios.pagina('42', None, None, 25), False),
+    ('dashboard: búsqueda por prefijo', lambda datos: datos.usuarios.pagina('adm', None, None, 25), False),
+    ('dashboard: prefijo, página siguiente', lambda datos: datos.usuarios.pagina('adm', 1000, None, 25), False),
+    ('catálogo: emergencias', lambda datos: datos.emergencias.activas(), False),
+    ('admin: emergencias', lambda datos: datos.emergencias.todas(), True),
+    ('emergencia por id', lambda datos: datos.emergencias.por_id(1), False),
+    ('eliminar emergencia', lambda datos: datos.emergencias.eliminar(1), False),
+    ('catálogo: consejos', lambda datos: datos.consejos.activos(), False),
+    ('admin: consejos', lambda datos: datos.consejos.todos(), True),
+    ('consejo por id', lambda datos: datos.consejos.por_id(1), False),
+    ('eliminar consejo', lambda datos: datos.consejos.eliminar(1), False),
+    ('catálogo: frase publicada', lambda datos: datos.frases.publicada(0), False),
+    ('catálogo: siguiente frase programada', lambda datos: datos.frases.siguiente(0), False),
+    ('admin: frases', lambda datos: datos.frases.todas(), True),
+    ('publicar frase en cola: última programada', lambda datos: datos.frases.fin_de_la_cola(), False),
+    ('eliminar frase', lambda datos: datos.frases.eliminar(1), False),
+    ('archivar frases vencidas', lambda datos: datos.frases.archivar_vencidas(0, 500), False),
+    ('historial: registrar observación', lambda datos: datos.historial.registrar('calvillo', 0, app.CLIMA_EJEMPLO), False),
+    ('historial: resúmenes de un año', lambda datos: datos.historial.rango('calvillo', 'dia', 0, 366 * 86400), False),
+    ('ciudades activas', lambda datos: datos.ciudades.activas(), True),
+]
+
+
+class DatosExplain(Datos):
+    """Repositorios que en lugar de ejecutar guardan el plan de cada consulta"""
+
+    def __init__(self, conexion, cursor):
+        super().__init__(conexion, preparar=False)
+        self._cursor_explain = cursor
+        self.planes = []
+
+    def todos(self, consulta, parametros=()):
+        self.planes.append(explicar(self._cursor_explain, self.postgresql,
+                                    consulta.para(self.postgresql), parametros))
+        return []
+
+    def uno(self, consulta, parametros=()):
+        self.todos(consulta, parametros)
+        return None
+
+    def ejecutar(self, consulta, parametros=()):
+        self.todos(consulta, parametros)
+        return 0
+
+
+def explicar(cursor, postgresql, sql, parametros=()):
+    if postgresql:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, parametros)
+        plan = cursor.fetchone()[0]
+        return plan if isinstance(plan, list) else json.loads(plan)
+    cursor.execute('EXPLAIN ' + sql, parametros)
+    return cursor.fetchall()
+
+
+def _nodos_postgresql(nodo):
+    yield nodo
+    for hijo in nodo.get('Plans', []):
+        yield from _nodos_postgresql(hijo)
+
+
+def analizar(plan, postgresql):
+    """Devuelve (tablas leídas completas, hay ordenamiento en memoria)"""
+    if postgresql:
+        nodos = list(_nodos_postgresql(plan[0]['Plan']))
+        completas = [n.get('Relation Name') for n in nodos if n['Node Type'] == 'Seq Scan']
+        ordena = any(n['Node Type'] == 'Sort' for n in nodos)
+        return completas, ordena
+    completas = [fila['table'] for fila in plan if fila.get('type') == 'ALL']
+    ordena = any('Using filesort' in (fila.get('Extra') or '') for fila in plan)
+    return completas, ordena
+
+
+def sembrar_mysql(cursor):
+    # Filas de prueba: la mitad inactivas, para que los filtros sean selectivos
+    cursor.executemany(
+        'INSERT INTO numeros_emergencia (nombre, numero, icono, categoria, activo) VALUES (%s, %s, %s, %s, %s)',
+        [(f'Prueba {i}', '000', '-', f'cat{i % 20}', i % 2 == 0) for i in range(FILAS_PRUEBA)])
+    cursor.executemany(
+        'INSERT INTO consejos_clima (titulo, descripcion, icono, activo) VALUES (%s, %s, %s, %s)',
+        [(f'Prueba {i}', '-', '-', i % 2 == 0) for i in range(FILAS_PRUEBA)])
+    cursor.executemany(
+        'INSERT INTO frases_dia (frase, activa, publica, expira) VALUES (%s, %s, %s, %s)',
+        [(f'Prueba {i}', i % 2 == 0, i, i) for i in range(FILAS_PRUEBA)])
+    cursor.executemany(
+        'INSERT INTO usuarios (username, email, password) VALUES (%s, %s, %s)',
+        [(f'explain{i}', f'explain{i}@prueba.mx', '-') for i in range(FILAS_PRUEBA)])
+    cursor.executemany(
+        'INSERT INTO clima_resumenes (ciudad, periodo, inicio, muestras, temp_min, temp_max, temp_suma, '
+        'humedad_min, humedad_max, humedad_suma, viento_min, viento_max, viento_suma) '
+        'VALUES (%s, %s, %s, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0)',
+        [(f'prueba{i % 20}', 'dia', i) for i in range(FILAS_PRUEBA)])
+
+
+def consultas_de_la_app(conexion, cursor):
+    """Planes de las consultas de los repositorios, llamando a sus métodos"""
+    planes = []
+    for nombre, llamar, lectura_completa in LLAMADAS:
+        explain = DatosExplain(conexion, cursor)
+        llamar(explain)
+        for plan in explain.planes:
+            planes.append((nombre, plan, lectura_completa))
+    return planes
+
+
+def main():
+    if not app.migrar_base_de_datos():
+        print("❌ No se pudo conectar o migrar la base de datos")
+        return 2
+
+    fallas = 0
+    with app.obtener_conexion() as conexion:
+        postgresql = app.es_postgresql(conexion)
+        cursor = conexion.cursor() if postgresql else conexion.cursor(dictionary=True)
+        try:
+            if postgresql:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            else:
+                sembrar_mysql(cursor)
+
+            planes = consultas_de_la_app(conexion, cursor)
+            for nombre, sql, parametros, lectura_completa in CONSULTAS:
+                planes.append((nombre, explicar(cursor, postgresql, sql, parametros), lectura_completa))
+
+            for nombre, plan, lectura_completa in planes:
+                completas, ordena = analizar(plan, postgresql)
+                if completas and (ordena or not lectura_completa):
+                    fallas += 1
+                    detalle = 'lee toda la tabla' + (' y ordena en memoria' if ordena else '')
+                    print(f"❌ {nombre}: {detalle} ({', '.join(completas)})")
+                else:
+                    print(f"✓ {nombre}")
+        finally:
+            conexion.rollback()
+            cursor.close()
+
+    print(f"\n{len(planes) - fallas} de {len(planes)} consultas usan índices")
+    return 1 if fallas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())